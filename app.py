@@ -8,10 +8,16 @@ import hashlib
 # Add src to path so we can import our modules
 sys.path.append(str(Path(__file__).parent / 'src'))
 
+from checklist import available_checklists, DEFAULT_CHECKLIST
+from models import ComplianceResult
+from jobs import JobQueue, start_workers, QUEUED, DONE, FAILED
 from pdf_extractor import extract_text_from_pdf
-from analyzer import HandbookAnalyzer
-from report_generator import ReportGenerator
-from checklist import get_checklist
+from normalize import normalize_text, format_savings
+from analyzer import plan_analysis
+from budget import Budget
+from tracing import start_metrics_server
+
+POLL_SECONDS = 1
 
 # Page config
 st.set_page_config(
@@ -86,6 +92,42 @@ def check_password():
 if not check_password():
     st.stop()
 
+@st.cache_resource
+def get_job_queue():
+    """
+    Open the job queue and start its workers once per server process.
+    
+    Set JOB_WORKERS=0 when workers run separately (python src/jobs.py).
+    """
+    queue = JobQueue()
+    workers = int(os.getenv("JOB_WORKERS", "4"))
+    if workers > 0:
+        start_workers(workers, str(queue.path))
+    return queue
+
+queue = get_job_queue()
+
+@st.cache_resource
+def get_metrics_server():
+    """Serve Prometheus metrics from the shared trace file when METRICS_PORT is set."""
+    port = os.getenv("METRICS_PORT")
+    return start_metrics_server(int(port)) if port else None
+
+get_metrics_server()
+
+@st.cache_data(max_entries=8, show_spinner="📏 Reading handbook to estimate cost...")
+def extract_upload(pdf_bytes):
+    """
+    Extract and normalize an upload once per file so the estimate doesn't
+    re-parse it on every rerun; the worker normalizes the same way. Client
+    uploads stay out of the on-disk text store and OCR cache (see the
+    privacy note).
+    """
+    handbook_text, page_map = extract_text_from_pdf(pdf_bytes, store=False, ocr_cache=False)
+    if not handbook_text:
+        return None, None, None
+    return normalize_text(page_map)
+
 # If password is correct, show the main app
 st.title("📋 California Employee Handbook Compliance Checker")
 st.markdown("### Powered by Axiom Legal Workflow")
@@ -120,122 +162,124 @@ if uploaded_file is not None:
         help="This will appear on the report"
     )
     
-    # Analyze button
-    if st.button("🔍 Analyze Handbook", type="primary"):
+    checklists = available_checklists()
+    checklist = st.selectbox(
+        "Compliance Checklist",
+        checklists,
+        index=[c.id for c in checklists].index(DEFAULT_CHECKLIST),
+        format_func=lambda c: f"{c.title} ({len(c.items)} items)"
+    )
+    
+    # Estimate before anything is sent; the worker re-checks the budget
+    # when it picks the job up
+    handbook_text, page_map, savings = extract_upload(uploaded_file.getvalue())
+    plan = None
+    if not handbook_text:
+        st.error("❌ Could not extract text from PDF. Please make sure it's a valid PDF file.")
+    else:
+        budget = Budget.from_env()
+        plan = plan_analysis(handbook_text, checklist, budget, page_map)
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Estimated Cost", f"${plan['cost']:.2f}")
+        col2.metric("Estimated Time", f"~{int(plan['seconds']) + 1}s")
+        col3.metric("Input Tokens", f"~{plan['input_tokens']:,}")
+        st.caption(f"🧹 Boilerplate removed: {format_savings(savings)}")
+        if budget.per_day is not None:
+            st.caption(f"${budget.remaining_today():.2f} of today's ${budget.per_day:.2f} budget left")
+        if not plan['allowed']:
+            st.error(f"💸 Over budget: {plan['reason']}")
+        elif plan['reason']:
+            st.warning(f"✂️ {plan['reason']} (only the most relevant pages are analyzed)")
+    
+    # Analyze button: queue the job; the workers do the rest
+    if st.button("🔍 Analyze Handbook", type="primary", disabled=not (plan and plan['allowed'])):
+        job_id = queue.submit(uploaded_file.getvalue(), handbook_name, checklist.key)
+        st.query_params["job"] = job_id
+        st.rerun()
+
+@st.fragment(run_every=POLL_SECONDS)
+def show_progress(job_id):
+    """
+    Render an unfinished job's progress.
+
+    Only this fragment reruns every POLL_SECONDS, so the rest of the page
+    (sidebar, footer) renders once; when the job finishes, the whole page
+    reruns to show the result.
+    """
+    
+    job = queue.get(job_id)
+    if job is None or job['status'] in (DONE, FAILED):
+        st.rerun()
+    
+    st.progress(job['progress'])
+    if job['status'] == QUEUED:
+        st.text(f"⏳ Queued (position {job['position']})...")
+    else:
+        st.text(job['message'])
+    
+    # Each checklist item appears as soon as Claude finishes writing it
+    for item in job['items']:
+        risk_icon = "🔴" if 'High' in item['risk'] else "🟠" if 'Medium' in item['risk'] else "🟢"
+        st.markdown(f"{risk_icon} **{item['number']}. {item['title']}** — {item['status']} · {item['risk']} risk")
+
+def show_job(job_id):
+    """Render a job's progress, polling until it finishes."""
+    
+    job = queue.get(job_id)
+    if job is None:
+        st.warning("⚠️ This analysis is no longer available. Finished reports are kept for 24 hours.")
+        del st.query_params["job"]
+        return
+    
+    st.markdown("---")
+    st.markdown(f"#### {job['handbook_name']}")
+    st.caption(f"Job {job_id[:8]} · checklist {job['checklist']}")
+    
+    if job['status'] == FAILED:
+        st.error(f"❌ Error during analysis: {job['error']}")
+        return
+    
+    if job['status'] != DONE:
+        # Polling only re-reads one row; the work happens in the job workers
+        show_progress(job_id)
+        return
+    
+    result = ComplianceResult.from_json(job['result'])
+    
+    st.progress(100)
+    st.success("🎉 Report generated successfully!")
+    
+    # Download button
+    st.download_button(
+        label="📥 Download Compliance Report",
+        data=queue.get_report(job_id),
+        file_name=f"{job['handbook_name']}_compliance_report.pdf",
+        mime="application/pdf",
+        type="primary"
+    )
+    
+    # Show preview of analysis
+    with st.expander("📄 View Analysis Summary"):
+        col1, col2, col3 = st.columns(3)
         
-        # Create progress indicators
-        progress_bar = st.progress(0)
-        status_text = st.empty()
+        with col1:
+            st.metric("Compliance Grade", result.grade)
         
-        try:
-            # Step 1: Save uploaded file
-            status_text.text("📄 Saving PDF...")
-            progress_bar.progress(10)
-            
-            # Save to temp location
-            temp_pdf_path = Path("temp_upload.pdf")
-            with open(temp_pdf_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            
-            # Step 2: Extract text
-            status_text.text("📖 Extracting text from PDF...")
-            progress_bar.progress(25)
-            
-            handbook_text, page_map = extract_text_from_pdf(str(temp_pdf_path))
-            
-            if not handbook_text:
-                st.error("❌ Error: Could not extract text from PDF. Please make sure it's a valid PDF file.")
-                st.stop()
-            
-            # Step 3: Get checklist
-            status_text.text("📋 Loading compliance checklist...")
-            progress_bar.progress(40)
-            
-            checklist = get_checklist()
-            
-            # Step 4: Analyze with AI
-            status_text.text("🤖 Analyzing with AI (this may take 30-60 seconds)...")
-            progress_bar.progress(50)
-            
-            # Get API key from environment
-            api_key = os.getenv("ANTHROPIC_API_KEY")
-            
-            if not api_key:
-                st.error("❌ Error: ANTHROPIC_API_KEY not set. Please contact Axiom Legal Workflow.")
-                st.stop()
-            
-            analyzer = HandbookAnalyzer(api_key)
-            analysis = analyzer.analyze_handbook(handbook_text)
-            
-            if not analysis:
-                st.error("❌ Error: Analysis failed. Please try again.")
-                st.stop()
-            
-            progress_bar.progress(75)
-            
-            # Step 5: Generate report
-            status_text.text("📊 Generating professional PDF report...")
-            
-            output_path = Path("output") / f"{handbook_name}_compliance_report.pdf"
-            output_path.parent.mkdir(exist_ok=True)
-            
-            generator = ReportGenerator()
-            generator.generate_report(
-                analysis_text=analysis,
-                handbook_name=handbook_name,
-                output_path=str(output_path)
-            )
-            
-            progress_bar.progress(100)
-            status_text.text("✅ Analysis complete!")
-            
-            # Step 6: Provide download
-            st.success("🎉 Report generated successfully!")
-            
-            # Read the generated PDF
-            with open(output_path, "rb") as pdf_file:
-                pdf_bytes = pdf_file.read()
-            
-            # Download button
-            st.download_button(
-                label="📥 Download Compliance Report",
-                data=pdf_bytes,
-                file_name=f"{handbook_name}_compliance_report.pdf",
-                mime="application/pdf",
-                type="primary"
-            )
-            
-            # Show preview of analysis
-            with st.expander("📄 View Analysis Summary"):
-                # Extract key stats from analysis
-                import re
-                
-                grade_match = re.search(r'(?:Overall Compliance Grade|Grade)[:\s]*\*?\*?\s*([A-F])', analysis, re.IGNORECASE)
-                compliant_match = re.search(r'Compliant Items[:\s]*\*?\*?\s*(\d+)', analysis, re.IGNORECASE)
-                noncompliant_match = re.search(r'Non-Compliant Items[:\s]*\*?\*?\s*(\d+)', analysis, re.IGNORECASE)
-                
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    st.metric("Compliance Grade", grade_match.group(1) if grade_match else "N/A")
-                
-                with col2:
-                    st.metric("Compliant Items", compliant_match.group(1) if compliant_match else "0")
-                
-                with col3:
-                    st.metric("Non-Compliant Items", noncompliant_match.group(1) if noncompliant_match else "0")
-                
-                st.text_area("Full Analysis", analysis, height=400)
-            
-            # Cleanup
-            if temp_pdf_path.exists():
-                temp_pdf_path.unlink()
-                
-        except Exception as e:
-            st.error(f"❌ Error during analysis: {str(e)}")
-            st.exception(e)
-            progress_bar.progress(0)
-            status_text.text("")
+        with col2:
+            st.metric("Compliant Items", result.compliant)
+        
+        with col3:
+            st.metric("Non-Compliant Items", result.noncompliant)
+        
+        st.text_area("Full Analysis", job['analysis'], height=400)
+    
+    if st.button("🔄 Analyze another handbook"):
+        del st.query_params["job"]
+        st.rerun()
+
+# The job id lives in the URL, so a browser refresh picks the job back up
+if "job" in st.query_params:
+    show_job(st.query_params["job"])
 
 # Sidebar
 with st.sidebar:
@@ -256,7 +300,8 @@ with st.sidebar:
     st.markdown("### 🔒 Privacy")
     st.markdown("""
     Your handbook is analyzed securely and not stored permanently. 
-    All data is processed locally and deleted after analysis.
+    Uploaded PDFs are deleted as soon as analysis finishes; reports are 
+    kept for 24 hours so you can download them again.
     """)
 
 # Footer
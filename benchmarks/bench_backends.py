@@ -0,0 +1,110 @@
+"""
+Compare PDF text-extraction backends on the sample handbooks.
+
+For every installed backend (see src/extract_backends.py) reports
+pages/second and how closely its text matches a reference backend: word
+agreement over the whole handbook and the pages that differ most. Use it
+to pick the fastest engine whose text is still acceptable.
+
+Usage:
+    python benchmarks/bench_backends.py [--backends pypdf2 pdfium] [--reference pypdf2] [--repeat 3]
+"""
+
+import argparse
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+# Add src to path so we can import our modules
+sys.path.append(str(Path(__file__).parent.parent / 'src'))
+
+from extract_backends import available_backends
+from pdf_extractor import iter_pages, assemble_text
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+WORD = re.compile(r'\w+')
+
+# Pages below this word agreement are listed as fidelity differences
+PAGE_AGREEMENT_THRESHOLD = 0.9
+
+def time_backend(pdf_path, backend, repeat):
+    """Return (best wall time, [(page_num, text)]) over `repeat` runs."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pages = list(iter_pages(str(pdf_path), backend))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, pages
+
+def word_agreement(reference, candidate):
+    """
+    Share of words the two texts have in common (0-1), ignoring case,
+    punctuation, whitespace and order within the text.
+    """
+    ref_words = Counter(word.lower() for word in WORD.findall(reference))
+    cand_words = Counter(word.lower() for word in WORD.findall(candidate))
+    total = max(sum(ref_words.values()), sum(cand_words.values()))
+    if not total:
+        return 1.0
+    return sum((ref_words & cand_words).values()) / total
+
+def main():
+    available = available_backends()
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--backends', nargs='+', default=available)
+    parser.add_argument('--reference', default='pypdf2', help="Backend the others are compared against")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    missing = [name for name in [args.reference] + args.backends if name not in available]
+    if missing:
+        print(f"⚠️  Not installed here, skipping: {', '.join(sorted(set(missing)))}")
+    if args.reference not in available:
+        print(f"❌ Reference backend '{args.reference}' is not available")
+        sys.exit(1)
+    backends = [name for name in args.backends if name in available]
+
+    handbooks = sorted(DATA_DIR.glob('handbook*.pdf'))
+    print(f"🔬 Backends: {', '.join(backends)} (reference: {args.reference}), best of {args.repeat} runs\n")
+
+    header = f"{'Handbook':<16}{'Backend':<10}{'Pages':>7}{'Time':>9}{'Pages/s':>9}{'Chars':>10}{'Agreement':>11}  Worst pages"
+    print(header)
+    print("-" * len(header))
+
+    totals = {name: {'pages': 0, 'seconds': 0.0, 'agreement': []} for name in backends}
+    for pdf_path in handbooks:
+        _, reference = time_backend(pdf_path, args.reference, 1)
+        reference_text, reference_map = assemble_text(reference)
+
+        for name in backends:
+            elapsed, pages = time_backend(pdf_path, name, args.repeat)
+            text, page_map = assemble_text(pages)
+
+            # The page contract must hold for every engine: same [PAGE N] markers
+            assert sorted(page_map) == sorted(reference_map), f"{name} returned different pages for {pdf_path.name}"
+
+            agreement = word_agreement(reference_text, text)
+            page_scores = sorted(
+                (word_agreement(reference_map[page], page_map[page] or ""), page) for page in page_map
+            )
+            worst = ", ".join(f"p{page} {score:.0%}" for score, page in page_scores[:3]
+                              if score < PAGE_AGREEMENT_THRESHOLD) or "-"
+
+            totals[name]['pages'] += len(page_map)
+            totals[name]['seconds'] += elapsed
+            totals[name]['agreement'].append(agreement)
+            print(f"{pdf_path.name:<16}{name:<10}{len(page_map):>7}{elapsed:>8.2f}s{len(page_map) / elapsed:>9.1f}"
+                  f"{len(text):>10,}{agreement:>11.1%}  {worst}")
+
+    print("-" * len(header))
+    for name in backends:
+        total = totals[name]
+        mean_agreement = sum(total['agreement']) / len(total['agreement'])
+        print(f"{'TOTAL':<16}{name:<10}{total['pages']:>7}{total['seconds']:>8.2f}s"
+              f"{total['pages'] / total['seconds']:>9.1f}{'':>10}{mean_agreement:>11.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark serial vs. process-pool PDF extraction on the sample handbooks.
+
+Usage:
+    python benchmarks/bench_extraction.py [--workers 1 2 4] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add src to path so we can import our modules
+sys.path.append(str(Path(__file__).parent.parent / 'src'))
+
+from pdf_extractor import extract_text_from_pdf
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+
+def time_extraction(pdf_path, workers, repeat):
+    """Return (best wall time, text, page_map) over `repeat` runs."""
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        # Always parse: a text-store hit would time a file read, and OCR is pinned off
+        text, page_map = extract_text_from_pdf(str(pdf_path), workers=workers, ocr=False, store=False)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, text, page_map
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({2, max(cpus, 2)}))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    handbooks = sorted(DATA_DIR.glob('handbook*.pdf'))
+    print(f"🖥️  {cpus} CPU(s), best of {args.repeat} runs\n")
+
+    header = f"{'Handbook':<16}{'Pages':>7}{'Serial':>10}"
+    for workers in args.workers:
+        header += f"{f'{workers}w':>10}{'Speedup':>9}"
+    print(header)
+    print("-" * len(header))
+
+    totals = {workers: 0.0 for workers in [1] + args.workers}
+    for pdf_path in handbooks:
+        serial, serial_text, page_map = time_extraction(pdf_path, 1, args.repeat)
+        totals[1] += serial
+        row = f"{pdf_path.name:<16}{len(page_map):>7}{serial:>9.2f}s"
+
+        for workers in args.workers:
+            elapsed, text, _ = time_extraction(pdf_path, workers, args.repeat)
+            totals[workers] += elapsed
+            # Parallel output must match the serial path byte for byte
+            assert text == serial_text, f"Output mismatch for {pdf_path.name} with {workers} workers"
+            row += f"{elapsed:>9.2f}s{serial / elapsed:>8.2f}x"
+        print(row)
+
+    print("-" * len(header))
+    row = f"{'Total':<16}{'':>7}{totals[1]:>9.2f}s"
+    for workers in args.workers:
+        row += f"{totals[workers]:>9.2f}s{totals[1] / totals[workers]:>8.2f}x"
+    print(row)
+
+if __name__ == "__main__":
+    main()
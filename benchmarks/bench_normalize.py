@@ -0,0 +1,65 @@
+"""
+Report how much text normalization saves on the sample handbooks.
+
+For every handbook: characters and estimated input tokens before and
+after normalize_text(), with and without dropping contents/index pages,
+and how long normalization takes next to extraction.
+
+Usage:
+    python benchmarks/bench_normalize.py [--backend pypdf2]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add src to path so we can import our modules
+sys.path.append(str(Path(__file__).parent.parent / 'src'))
+
+from normalize import normalize_text
+from pdf_extractor import extract_text_from_pdf
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+
+def saved(before, after):
+    return 1 - after / before if before else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--backend', help="Extraction backend (default: $EXTRACT_BACKEND or pypdf2)")
+    args = parser.parse_args()
+
+    header = (f"{'Handbook':<16}{'Pages':>6}{'Chars':>10}{'Tokens':>9}{'Normalized':>12}{'Saved':>7}"
+              f"{'-TOC':>10}{'Saved':>7}{'Dropped':>9}{'Time':>8}")
+    print(header)
+    print("-" * len(header))
+
+    totals = {'before': 0, 'after': 0, 'after_toc': 0}
+    for pdf_path in sorted(DATA_DIR.glob('handbook*.pdf')):
+        _, page_map = extract_text_from_pdf(str(pdf_path), ocr=False, backend=args.backend)
+        if page_map is None:
+            print(f"{pdf_path.name:<16} extraction failed")
+            continue
+
+        start = time.perf_counter()
+        _, _, stats = normalize_text(page_map)
+        elapsed = time.perf_counter() - start
+        _, _, toc_stats = normalize_text(page_map, drop_toc=True)
+
+        before, after, after_toc = stats['tokens_before'], stats['tokens_after'], toc_stats['tokens_after']
+        totals['before'] += before
+        totals['after'] += after
+        totals['after_toc'] += after_toc
+        print(f"{pdf_path.name:<16}{len(page_map):>6}{stats['chars_before']:>10,}{before:>9,}{after:>12,}"
+              f"{saved(before, after):>7.1%}{after_toc:>10,}{saved(before, after_toc):>7.1%}"
+              f"{len(toc_stats['pages_dropped']):>9}{elapsed * 1000:>6.0f}ms")
+
+    print("-" * len(header))
+    print(f"{'TOTAL':<16}{'':>6}{'':>10}{totals['before']:>9,}{totals['after']:>12,}"
+          f"{saved(totals['before'], totals['after']):>7.1%}{totals['after_toc']:>10,}"
+          f"{saved(totals['before'], totals['after_toc']):>7.1%}")
+    print("\nTokens are estimated at ~4 characters per token (prompts.estimate_tokens).")
+
+if __name__ == "__main__":
+    main()
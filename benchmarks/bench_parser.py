@@ -0,0 +1,92 @@
+"""
+Micro-benchmark: legacy backtracking regex vs. the line-oriented analysis parser.
+
+On well-formed input the legacy regex runs entirely inside the C regex
+engine and is a few milliseconds faster; the line parser's advantage is that
+it stays linear and keeps items whose fields drift or are mislabeled.
+
+Usage:
+    python benchmarks/bench_parser.py [--items 500] [--repeat 20]
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+# Add src to path so we can import our modules
+sys.path.append(str(Path(__file__).parent.parent / 'src'))
+
+from analysis_parser import parse_items_with_errors
+
+ANALYSIS_PATH = Path(__file__).parent.parent / 'output' / 'analysis_results.txt'
+
+# The single DOTALL pattern ReportGenerator used before the state-machine parser
+LEGACY_PATTERN = r'###\s*(\d+)\.\s*(.+?)\s*\((.+?)\)\s*-\s*\*\*Status\*\*:\s*(.+?)\s*-\s*\*\*Pages\*\*:\s*(.+?)\s*-\s*\*\*Assessment\*\*:\s*(.+?)\s*-\s*\*\*Risk Level\*\*:\s*(.+?)\s*-\s*\*\*Recommendation\*\*:\s*(.+?)\s*-\s*\*\*Legal Citation\*\*:\s*(.+?)(?=\n###|\n---|\n##|\Z)'
+
+def legacy_parse(text):
+    # Compiled per call, as the old _parse_analysis did via re.finditer
+    return list(re.finditer(LEGACY_PATTERN, text, re.DOTALL))
+
+def synthetic_analysis(count, drift=0.0, seed=7):
+    """Build a `count`-item analysis; `drift` is the share of items with shuffled fields."""
+    rng = random.Random(seed)
+    parts = ["## COMPLIANCE CHECKLIST ANALYSIS\n"]
+    for number in range(1, count + 1):
+        fields = [
+            ("Status", rng.choice(["Present", "Missing", "Partially Present"])),
+            ("Pages", f"Pages {number}-{number + 2}"),
+            ("Assessment", "Compliant. " + "Policy text reviewed in detail. " * rng.randint(2, 12)),
+            ("Risk Level", rng.choice(["Low", "Medium", "High"])),
+            ("Recommendation", "Review annually. " * rng.randint(1, 4)),
+            ("Legal Citation", f"Labor Code §{1000 + number}"),
+        ]
+        if rng.random() < drift:
+            rng.shuffle(fields)
+        parts.append(f"### {number}. Synthetic Policy {number} (Labor Code §{1000 + number})")
+        parts.extend(f"- **{name}**: {value}" for name, value in fields)
+        parts.append("")
+    parts.append("---\n\n## COMPLIANCE SCORECARD\n\n- **Overall Compliance Grade**: B\n")
+    return "\n".join(parts)
+
+def bench(func, text, repeat):
+    """Return (best seconds per call, result of last call)."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def report(label, text, repeat):
+    legacy_s, legacy_items = bench(legacy_parse, text, repeat)
+    new_s, (items, errors) = bench(parse_items_with_errors, text, repeat)
+    print(f"{label:<30}{len(text) / 1024:>8.1f} KB"
+          f"{legacy_s * 1000:>10.2f} ms{len(legacy_items):>6}"
+          f"{new_s * 1000:>10.2f} ms{len(items):>6}{legacy_s / new_s:>9.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'Input':<30}{'Size':>11}{'Legacy':>13}{'Items':>6}{'New':>13}{'Items':>6}{'Speedup':>9}")
+    print("-" * 88)
+
+    if ANALYSIS_PATH.exists():
+        report(ANALYSIS_PATH.name, ANALYSIS_PATH.read_text(encoding='utf-8'), args.repeat)
+
+    report(f"synthetic {args.items} items", synthetic_analysis(args.items), args.repeat)
+    report(f"synthetic {args.items}, 20% drift", synthetic_analysis(args.items, drift=0.2), args.repeat)
+
+    # One unrecognised field label sends the legacy lazy groups backtracking
+    # across the rest of the document; runtime grows exponentially with item count
+    renamed = synthetic_analysis(3).replace("**Legal Citation**", "**Citation**")
+    report("synthetic 3, renamed field", renamed, 1)
+
+if __name__ == "__main__":
+    main()
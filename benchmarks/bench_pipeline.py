@@ -0,0 +1,275 @@
+"""
+Benchmark the full extract -> analyze -> parse -> report pipeline offline.
+
+Runs main.py's steps over data/handbook*.pdf with the Anthropic client
+replaced by a local fake that replays a recorded analysis
+(output/analysis_results.txt) after a configurable latency, and reports
+per-stage wall time, CPU time, peak RSS and throughput. Results can be
+saved as a JSON baseline and later runs compared against it. A baseline
+records the machine and run settings it was taken with, and --compare
+refuses a baseline whose settings differ; baselines are machine-specific,
+so they are kept out of the repository.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--latency 0.5] [--repeat 3]
+    python benchmarks/bench_pipeline.py --save-baseline benchmarks/pipeline_baseline.json
+    python benchmarks/bench_pipeline.py --compare benchmarks/pipeline_baseline.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, so peak RSS isn't reported
+    resource = None
+
+# Add src to path so we can import our modules
+sys.path.append(str(Path(__file__).parent.parent / 'src'))
+
+from pdf_extractor import extract_text_from_pdf
+from analyzer import HandbookAnalyzer
+from budget import Budget
+from models import ComplianceResult
+from prompts import estimate_tokens
+from report_generator import ReportGenerator
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+RESPONSE_PATH = Path(__file__).parent.parent / 'output' / 'analysis_results.txt'
+
+STAGES = ('extract', 'analyze', 'parse', 'report')
+
+# Differences smaller than these are noise, whatever the relative change
+MIN_REGRESSION = {'wall_s': 0.05, 'cpu_s': 0.05, 'peak_rss_mb': 5.0}
+
+# Baseline metadata that must match for timings to be comparable
+SETTINGS = ('python', 'platform', 'cpus', 'handbooks', 'pages', 'latency_s', 'repeat', 'workers')
+
+class FakeMessages:
+    """Stands in for client.messages: replays one recorded response."""
+
+    def __init__(self, response, latency):
+        self.response = response
+        self.latency = latency
+        self.calls = 0
+
+    def create(self, model, max_tokens, system, messages, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+
+        system_tokens = sum(estimate_tokens(block['text']) for block in system)
+        usage = type('Usage', (), {
+            'input_tokens': estimate_tokens(messages[0]['content']),
+            'cache_creation_input_tokens': 0 if self.calls > 1 else system_tokens,
+            'cache_read_input_tokens': system_tokens if self.calls > 1 else 0,
+            'output_tokens': estimate_tokens(self.response),
+        })()
+        text = type('Block', (), {'type': 'text', 'text': self.response})()
+        return type('Message', (), {'content': [text], 'usage': usage})()
+
+class FakeClient:
+    def __init__(self, response, latency):
+        self.messages = FakeMessages(response, latency)
+
+def load_response(path):
+    if path.exists():
+        return path.read_text(encoding='utf-8')
+
+    from bench_parser import synthetic_analysis
+    return synthetic_analysis(20)
+
+def peak_rss_mb():
+    """High-water mark of this process's resident memory, in MB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def cpu_seconds():
+    """CPU time of this process plus any finished child processes."""
+    total = time.process_time()
+    if resource is not None:
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        total += children.ru_utime + children.ru_stime
+    return total
+
+@contextlib.contextmanager
+def measure(stats, stage):
+    """Add a stage's wall and CPU time to stats and record the RSS high-water mark."""
+    wall, cpu = time.perf_counter(), cpu_seconds()
+    yield
+    stats[stage]['wall_s'] += time.perf_counter() - wall
+    stats[stage]['cpu_s'] += cpu_seconds() - cpu
+    stats[stage]['peak_rss_mb'] = peak_rss_mb()
+
+def run_pipeline(handbooks, analyzer, out_dir, workers):
+    """Run every handbook through the pipeline once; returns (stats, pages)."""
+    stats = {stage: {'wall_s': 0.0, 'cpu_s': 0.0, 'peak_rss_mb': None} for stage in STAGES}
+    pages = 0
+
+    for pdf_path in handbooks:
+        with measure(stats, 'extract'):
+            # Always parse: a text-store hit would time a file read, and OCR is pinned off
+            handbook_text, page_map = extract_text_from_pdf(str(pdf_path), workers=workers, ocr=False, store=False)
+        pages += len(page_map)
+
+        with measure(stats, 'analyze'):
+            analysis = analyzer.analyze_handbook(handbook_text)
+
+        with measure(stats, 'parse'):
+            result = ComplianceResult.from_markdown(analysis)
+
+        with measure(stats, 'report'):
+            ReportGenerator().generate_report(
+                handbook_name=pdf_path.stem,
+                output_path=str(Path(out_dir) / f"{pdf_path.stem}_compliance_report.pdf"),
+                result=result
+            )
+
+    return stats, pages
+
+def summarize(runs, handbook_count, pages):
+    """Best (minimum) wall and CPU time per stage over the runs, plus throughput."""
+    summary = {}
+    for stage in STAGES:
+        wall = min(run[stage]['wall_s'] for run in runs)
+        summary[stage] = {
+            'wall_s': round(wall, 4),
+            'cpu_s': round(min(run[stage]['cpu_s'] for run in runs), 4),
+            'peak_rss_mb': runs[-1][stage]['peak_rss_mb'] and round(runs[-1][stage]['peak_rss_mb'], 1),
+            'handbooks_per_s': round(handbook_count / wall, 2) if wall else None,
+        }
+    summary['extract']['pages_per_s'] = round(pages / summary['extract']['wall_s'], 1)
+
+    wall = sum(summary[stage]['wall_s'] for stage in STAGES)
+    summary['total'] = {
+        'wall_s': round(wall, 4),
+        'cpu_s': round(sum(summary[stage]['cpu_s'] for stage in STAGES), 4),
+        'peak_rss_mb': summary['report']['peak_rss_mb'],
+        'handbooks_per_s': round(handbook_count / wall, 2),
+    }
+    return summary
+
+def print_summary(summary):
+    header = f"{'Stage':<10}{'Wall':>10}{'CPU':>10}{'Peak RSS':>12}{'Handbooks/s':>14}  Share"
+    print(header)
+    print("-" * len(header))
+    total = summary['total']['wall_s']
+    for stage in STAGES + ('total',):
+        row = summary[stage]
+        rss = f"{row['peak_rss_mb']:.0f} MB" if row['peak_rss_mb'] is not None else "n/a"
+        print(f"{stage:<10}{row['wall_s']:>9.3f}s{row['cpu_s']:>9.3f}s{rss:>12}"
+              f"{row['handbooks_per_s']:>14.2f}  {row['wall_s'] / total:>5.0%}")
+    print(f"\n📖 Extraction: {summary['extract']['pages_per_s']:.0f} pages/s")
+
+def compare(summary, baseline, tolerance):
+    """Print stage-by-stage changes against a baseline; returns the regressions found."""
+    regressions = []
+    print(f"\n📏 Compared with baseline from {baseline['meta']['created']} "
+          f"(regression = more than {tolerance:.0%} slower/larger)\n")
+    for stage in STAGES + ('total',):
+        changes = []
+        for metric, floor in MIN_REGRESSION.items():
+            old = baseline['stages'].get(stage, {}).get(metric)
+            new = summary[stage][metric]
+            if not old or new is None:
+                continue
+            ratio = new / old
+            flag = ""
+            if ratio > 1 + tolerance and new - old > floor:
+                flag = " ⚠️"
+                regressions.append(f"{stage} {metric}: {old} -> {new}")
+            changes.append(f"{metric} {ratio:>5.2f}x{flag}")
+        print(f"{stage:<10}" + "   ".join(changes))
+    return regressions
+
+def run_settings(args, handbooks, pages):
+    """Machine and run settings a baseline is only comparable under."""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'handbooks': [path.name for path in handbooks],
+        'pages': pages,
+        'latency_s': args.latency,
+        'repeat': args.repeat,
+        'workers': args.workers,
+    }
+
+def settings_mismatch(baseline, settings):
+    """Descriptions of the settings that differ from the baseline's (empty if comparable)."""
+    return [
+        f"{name}: baseline {baseline['meta'].get(name)!r}, this run {settings[name]!r}"
+        for name in SETTINGS
+        if baseline['meta'].get(name) != settings[name]
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.5,
+                        help="Seconds the fake client waits before each response (default: 0.5)")
+    parser.add_argument('--response', type=Path, default=RESPONSE_PATH,
+                        help="Recorded analysis to replay (default: output/analysis_results.txt)")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs over all handbooks; the best is kept")
+    parser.add_argument('--workers', type=int, default=1, help="Extraction worker processes")
+    parser.add_argument('--save-baseline', type=Path, metavar='PATH', help="Write the results as a baseline")
+    parser.add_argument('--compare', type=Path, metavar='PATH', help="Compare against a saved baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Allowed slowdown before --compare fails (default: 0.2)")
+    args = parser.parse_args()
+
+    handbooks = sorted(DATA_DIR.glob('handbook*.pdf'))
+    response = load_response(args.response)
+
+    # No cache (every run does the work), no budget ledger, no network
+    analyzer = HandbookAnalyzer("offline", cache=False, budget=Budget())
+    analyzer.client = FakeClient(response, args.latency)
+
+    print(f"🖥️  {os.cpu_count() or 1} CPU(s), {len(handbooks)} handbooks, best of {args.repeat} runs, "
+          f"{args.latency:.2f}s fake API latency\n")
+
+    runs = []
+    pages = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(args.repeat):
+            with contextlib.redirect_stdout(io.StringIO()):
+                stats, pages = run_pipeline(handbooks, analyzer, tmp, args.workers)
+            runs.append(stats)
+
+    summary = summarize(runs, len(handbooks), pages)
+    print_summary(summary)
+    settings = run_settings(args, handbooks, pages)
+
+    if args.save_baseline:
+        baseline = {
+            'meta': {'created': time.strftime("%Y-%m-%d %H:%M:%S"), **settings},
+            'stages': summary,
+        }
+        args.save_baseline.write_text(json.dumps(baseline, indent=2) + "\n", encoding='utf-8')
+        print(f"\n💾 Baseline saved to {args.save_baseline}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding='utf-8'))
+        mismatch = settings_mismatch(baseline, settings)
+        if mismatch:
+            print(f"\n❌ Not comparable with {args.compare}; save a new baseline on this machine:")
+            for line in mismatch:
+                print(f"   {line}")
+            sys.exit(2)
+        regressions = compare(summary, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s): " + "; ".join(regressions))
+            sys.exit(1)
+        print("\n✅ No regressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark PDF report rendering in a tight loop (reports/second).
+
+Compares the old per-report setup (a fresh stylesheet for every
+ReportGenerator, output written to disk) against the shared stylesheet
+rendering to a file and straight into memory, then measures how
+ReportGenerator.render_many() scales across worker processes.
+
+Usage:
+    python benchmarks/bench_report.py [--reports 50] [--workers 1 2 4]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add src to path so we can import our modules
+sys.path.append(str(Path(__file__).parent.parent / 'src'))
+
+import report_generator
+from models import ComplianceResult
+from report_generator import ReportGenerator
+
+ANALYSIS_PATH = Path(__file__).parent.parent / 'output' / 'analysis_results.txt'
+
+def load_result():
+    if ANALYSIS_PATH.exists():
+        return ComplianceResult.from_markdown(ANALYSIS_PATH.read_text(encoding='utf-8'))
+
+    from bench_parser import synthetic_analysis
+    return ComplianceResult.from_markdown(synthetic_analysis(20))
+
+def fresh_styles_to_file(result, path):
+    generator = ReportGenerator()
+    generator.styles = report_generator._build_styles()
+    generator.generate_report(handbook_name="Benchmark Handbook", output_path=path, result=result)
+
+def shared_styles_to_file(result, path):
+    ReportGenerator().generate_report(handbook_name="Benchmark Handbook", output_path=path, result=result)
+
+def shared_styles_to_bytes(result, path):
+    ReportGenerator().generate_report_bytes(handbook_name="Benchmark Handbook", result=result)
+
+def run(func, result, reports, path):
+    """Return reports/second over `reports` renders (progress output suppressed)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        func(result, path)  # warm-up
+        start = time.perf_counter()
+        for _ in range(reports):
+            func(result, path)
+        elapsed = time.perf_counter() - start
+    return reports / elapsed
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--reports', type=int, default=50)
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, 2, max(cpus, 2)}))
+    args = parser.parse_args()
+
+    result = load_result()
+
+    start = time.perf_counter()
+    for _ in range(20):
+        report_generator._build_styles()
+    style_ms = (time.perf_counter() - start) / 20 * 1000
+
+    print(f"📄 {result.total} items per report, {args.reports} reports per run")
+    print(f"🎨 Building the stylesheet: {style_ms:.2f} ms\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / 'report.pdf')
+        baseline = None
+        for label, func in (("fresh styles → file", fresh_styles_to_file),
+                            ("shared styles → file", shared_styles_to_file),
+                            ("shared styles → bytes", shared_styles_to_bytes)):
+            rate = run(func, result, args.reports, path)
+            baseline = baseline or rate
+            print(f"{label:<24}{rate:>8.1f} reports/s{rate / baseline:>8.2f}x")
+
+        print(f"\n🖥️  render_many() on {cpus} CPU(s)\n")
+        jobs = [(f"handbook{index}", result) for index in range(args.reports)]
+        baseline = None
+        for workers in args.workers:
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                ReportGenerator.render_many(jobs, tmp, workers=workers)
+                elapsed = time.perf_counter() - start
+            rate = args.reports / elapsed
+            baseline = baseline or rate
+            print(f"{workers:>2} worker(s)             {rate:>8.1f} reports/s{rate / baseline:>8.2f}x")
+
+if __name__ == "__main__":
+    main()
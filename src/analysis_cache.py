@@ -0,0 +1,189 @@
+import hashlib
+import json
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from prompts import (
+    get_system_blocks, get_handbook_message, get_excerpt_message,
+    get_selected_pages_message, get_compliance_tool
+)
+from tracing import span
+
+DEFAULT_CACHE_PATH = "output/analysis_cache.db"
+
+class AnalysisCache:
+    """
+    Persistent on-disk cache of Claude analyses.
+
+    Entries are content-addressed: the key is a SHA-256 over the extracted
+    handbook text, the checklist body, the prompts and tool schema the
+    analysis mode sends, and the model name, so changing any of them
+    naturally misses the cache.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=200 * 1024 * 1024, max_age_days=90):
+        """
+        Args:
+            path: SQLite file holding the cache
+            max_bytes: Total size of stored analyses before LRU eviction kicks in
+            max_age_days: Entries older than this are dropped on the next write
+        """
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_days * 24 * 60 * 60
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    analysis TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS stats (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        # A fresh connection per call keeps the cache safe to share between
+        # Streamlit sessions, which run on different threads.
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def prompt_templates(mode="markdown"):
+        """
+        Everything an analysis mode sends besides the handbook and checklist.
+
+        Rendered with placeholders, so any edit to the prompt wording or the
+        tool schema invalidates previous entries. Markdown and structured
+        analyses of oversized handbooks fall back to per-chunk excerpt
+        messages, so those are part of their templates too.
+
+        Args:
+            mode: 'markdown', 'structured' or 'retrieval'
+        """
+        markdown_system = get_system_blocks("{checklist_items}")
+        excerpt = get_excerpt_message("{excerpt_text}", "{first_page}", "{last_page}")
+
+        if mode == "markdown":
+            parts = [markdown_system, get_handbook_message("{handbook_text}"), excerpt]
+        elif mode == "structured":
+            parts = [get_system_blocks("{checklist_items}", structured=True), get_handbook_message("{handbook_text}"),
+                     get_compliance_tool(), markdown_system, excerpt]
+        elif mode == "retrieval":
+            parts = [markdown_system, get_selected_pages_message("{excerpt_text}", ["{pages}"])]
+        else:
+            raise ValueError(f"Unknown analysis mode '{mode}'")
+        return json.dumps(parts, sort_keys=True)
+
+    @staticmethod
+    def make_key(handbook_text, checklist, model, mode="markdown"):
+        """Build the cache key for one analysis request in the given mode."""
+
+        template = AnalysisCache.prompt_templates(mode)
+
+        digest = hashlib.sha256()
+        for part in (handbook_text, checklist, template, model):
+            encoded = part.encode("utf-8")
+            # Length-prefix each part so boundaries can't be shifted around
+            digest.update(len(encoded).to_bytes(8, "big"))
+            digest.update(encoded)
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the cached analysis for key, or None on a miss."""
+
+        now = time.time()
+        with span('cache_lookup') as s, closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT analysis, created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row and now - row[1] <= self.max_age_seconds:
+                conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+                self._bump(conn, "hits")
+                s.set(cache_hit=True)
+                return row[0]
+
+            self._bump(conn, "misses")
+            s.set(cache_hit=False)
+            return None
+
+    def put(self, key, analysis):
+        """Store an analysis and evict old or excess entries."""
+
+        now = time.time()
+        size = len(analysis.encode("utf-8"))
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, analysis, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, analysis, size, now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        """Drop expired entries, then least recently used ones until under max_bytes."""
+
+        expired = conn.execute(
+            "DELETE FROM entries WHERE created < ?", (now - self.max_age_seconds,)
+        ).rowcount
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        evicted = 0
+        if total > self.max_bytes:
+            for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed ASC").fetchall():
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                total -= size
+                evicted += 1
+
+        if expired or evicted:
+            self._bump(conn, "evictions", expired + evicted)
+
+    @staticmethod
+    def _bump(conn, name, amount=1):
+        conn.execute(
+            "INSERT INTO stats (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount)
+        )
+
+    def stats(self):
+        """Return hit/miss/eviction counters plus current entry count and size."""
+
+        with closing(self._connect()) as conn, conn:
+            counters = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+
+        return {
+            'hits': counters.get('hits', 0),
+            'misses': counters.get('misses', 0),
+            'evictions': counters.get('evictions', 0),
+            'entries': entries,
+            'bytes': size
+        }
+
+    def clear(self):
+        """Remove all cached analyses (counters are kept)."""
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM entries")
+
+# Test function
+if __name__ == "__main__":
+    cache = AnalysisCache()
+    stats = cache.stats()
+
+    print(f"📦 Analysis cache: {cache.path}")
+    print(f"   Entries: {stats['entries']} ({stats['bytes'] / 1024:.1f} KB)")
+    print(f"   Hits: {stats['hits']}, Misses: {stats['misses']}, Evictions: {stats['evictions']}")
@@ -0,0 +1,343 @@
+import re
+
+# Line patterns, compiled once. Parsing walks the analysis line by line, so
+# the cost is linear in its length and fields may appear in any order.
+ITEM_HEADER = re.compile(r'^#{3}\s*(\d+)\.\s*(.*)$')
+TRAILING_CODE = re.compile(r'^(.*?)\s*\(([^()]*)\)\s*$')
+FIELD_LINE = re.compile(r'^[-*•]\s+\**([A-Za-z][A-Za-z /()]*?)\**\s*:\s*\**\s*(.*)$')
+SECTION_END = re.compile(r'^(?:#{1,2}(?!#)|#{3}(?!\s*\d+\.))')
+
+PAGE_RANGE = re.compile(r'(\d+)\s*(?:[-–]\s*(\d+))?')
+
+RISK_RANK = {'low': 0, 'medium': 1, 'high': 2}
+
+# Scorecard and critical-issues sections
+GRADE = re.compile(r'(?:Overall Compliance Grade|Grade)\**[:\s]*\**\s*([A-F])', re.IGNORECASE)
+CRITICAL_SECTION = re.compile(r'##\s*SUMMARY OF CRITICAL ISSUES.*?\n(.*?)(?=\n##|\Z)', re.DOTALL | re.IGNORECASE)
+CRITICAL_ISSUE = re.compile(r'\d+\.\s*\*\*(.+?)\*\*\s*[-:]?\s*(.+?)(?=\n\d+\.|\n##|\Z)', re.DOTALL)
+
+# Field labels the model uses (lowercased) -> item keys
+FIELD_NAMES = {
+    'status': 'status',
+    'pages': 'pages',
+    'page': 'pages',
+    'page(s)': 'pages',
+    'assessment': 'assessment',
+    'risk level': 'risk',
+    'risk': 'risk',
+    'recommendation': 'recommendation',
+    'recommendations': 'recommendation',
+    'legal citation': 'citation',
+    'citation': 'citation',
+}
+
+ITEM_FIELDS = ('status', 'pages', 'assessment', 'risk', 'recommendation', 'citation')
+MISSING_VALUE = "Not specified"
+
+class AnalysisParser:
+    """
+    Line-oriented state machine that turns analysis markdown into items.
+    
+    States are "outside an item" and "inside an item, appending to field F".
+    An item header opens an item, "- **Field**: value" lines set fields,
+    other non-blank lines continue the current field, and any other heading
+    or "---" rule closes the item. Missing or duplicate fields don't drop
+    the item; they are recorded in `errors` instead.
+    """
+    
+    def __init__(self):
+        self.errors = []
+        self._item = None
+        self._field = None
+    
+    def feed_line(self, line):
+        """
+        Consume one line (without its newline).
+        
+        Returns:
+            dict: The item this line completed, or None
+        """
+        text = line.strip()
+        if not text:
+            return None
+        
+        # Dispatch on the first character so most lines hit at most one regex
+        first = text[0]
+        if first == '#':
+            header = ITEM_HEADER.match(text)
+            if header:
+                completed = self.finish()
+                self._start_item(header.group(1), header.group(2))
+                return completed
+            if self._item is not None and SECTION_END.match(text):
+                return self.finish()
+        
+        if self._item is None:
+            return None
+        
+        if first in '-*•':
+            if text.startswith('---'):
+                return self.finish()
+            
+            field = FIELD_LINE.match(text)
+            if field:
+                key = FIELD_NAMES.get(field.group(1).strip().lower())
+                if key:
+                    if key in self._item['_seen']:
+                        self._error(f"duplicate field '{key}' ignored")
+                        self._field = None
+                    else:
+                        self._item['_seen'].add(key)
+                        self._item[key] = field.group(2)
+                        self._field = key
+                    return None
+        
+        # Wrapped text belongs to whichever field is being written
+        if self._field:
+            self._item[self._field] += " " + text if self._item[self._field] else text
+        return None
+    
+    def finish(self):
+        """Close the open item, if any, and return it."""
+        if self._item is None:
+            return None
+        
+        item = self._item
+        self._item = None
+        self._field = None
+        
+        seen = item.pop('_seen')
+        for key in ITEM_FIELDS:
+            if key not in seen:
+                self._error(f"missing field '{key}'", item['number'])
+                item[key] = MISSING_VALUE
+            else:
+                item[key] = item[key].strip() or MISSING_VALUE
+        return item
+    
+    def _start_item(self, number, heading):
+        heading = heading.replace('**', '').strip()
+        code_match = TRAILING_CODE.match(heading)
+        if code_match:
+            title, code = code_match.group(1), code_match.group(2).strip()
+        else:
+            title, code = heading, ""
+            self._error("no legal code in header", number)
+        
+        self._item = {'number': number, 'title': title.strip(), 'code': code, '_seen': set()}
+        self._field = None
+    
+    def _error(self, message, number=None):
+        if number is None:
+            number = self._item['number'] if self._item else None
+        self.errors.append({'number': number, 'message': message})
+
+def parse_items_with_errors(analysis_text):
+    """
+    Parse every checklist item in a complete analysis.
+    
+    Returns:
+        tuple: (items, errors) where errors lists per-item problems as
+               {'number': ..., 'message': ...}
+    """
+    parser = AnalysisParser()
+    items = []
+    for line in analysis_text.splitlines():
+        item = parser.feed_line(line)
+        if item:
+            items.append(item)
+    
+    item = parser.finish()
+    if item:
+        items.append(item)
+    return items, parser.errors
+
+def parse_items(analysis_text):
+    """Parse every checklist item in a complete analysis."""
+    return parse_items_with_errors(analysis_text)[0]
+
+class IncrementalAnalysisParser:
+    """
+    Parse checklist items out of a streamed analysis as they complete.
+    
+    Complete lines are fed to an AnalysisParser as they arrive; an item is
+    emitted once the line after it (the next header or a "---" rule) is in.
+    """
+    
+    def __init__(self):
+        self._parser = AnalysisParser()
+        self._chunks = []
+        self._partial_line = ""
+    
+    @property
+    def text(self):
+        """All text received so far."""
+        return "".join(self._chunks)
+    
+    @property
+    def errors(self):
+        return self._parser.errors
+    
+    def feed(self, chunk):
+        """
+        Add streamed text.
+        
+        Returns:
+            list: Items completed by this chunk (possibly empty)
+        """
+        self._chunks.append(chunk)
+        lines = (self._partial_line + chunk).split("\n")
+        
+        # The last piece may be an unfinished line; keep it for next time
+        self._partial_line = lines.pop()
+        
+        items = []
+        for line in lines:
+            item = self._parser.feed_line(line.rstrip("\r"))
+            if item:
+                items.append(item)
+        return items
+    
+    def close(self):
+        """Flush the last item once the stream has ended."""
+        items = []
+        if self._partial_line:
+            item = self._parser.feed_line(self._partial_line)
+            self._partial_line = ""
+            if item:
+                items.append(item)
+        
+        item = self._parser.finish()
+        if item:
+            items.append(item)
+        return items
+
+def parse_pages(pages_text):
+    """
+    Turn a Pages field like "Pages 14-15, 17" into a sorted list of ints.
+    
+    "Not found" and other text without numbers yields an empty list.
+    """
+    pages = set()
+    for match in PAGE_RANGE.finditer(pages_text):
+        start = int(match.group(1))
+        end = int(match.group(2)) if match.group(2) else start
+        if end < start or end - start > 1000:
+            end = start
+        pages.update(range(start, end + 1))
+    return sorted(pages)
+
+def format_pages(pages):
+    """Inverse of parse_pages: [14, 15, 17] -> "Pages 14-15, 17"."""
+    if not pages:
+        return "Not found"
+    
+    ranges = []
+    pages = sorted(set(pages))
+    start = prev = pages[0]
+    for page in pages[1:] + [None]:
+        if page is not None and page == prev + 1:
+            prev = page
+            continue
+        ranges.append(str(start) if start == prev else f"{start}-{prev}")
+        if page is not None:
+            start = prev = page
+    
+    label = "Page" if len(pages) == 1 else "Pages"
+    return f"{label} {', '.join(ranges)}"
+
+def risk_rank(risk_text):
+    """Order risk levels Low < Medium < High (unknown counts as Low)."""
+    risk_lower = risk_text.lower()
+    for level in ('high', 'medium', 'low'):
+        if level in risk_lower:
+            return RISK_RANK[level]
+    return 0
+
+def classify_item(item):
+    """Return 'compliant', 'partial' or 'noncompliant' for a parsed item."""
+    status_lower = item['status'].lower()
+    assessment_lower = item['assessment'].lower()
+    
+    # Check status and assessment for compliance
+    if 'present' in status_lower and 'compliant' in assessment_lower and 'non-compliant' not in assessment_lower and 'partially' not in assessment_lower:
+        return 'compliant'
+    elif 'missing' in status_lower or 'non-compliant' in assessment_lower:
+        return 'noncompliant'
+    return 'partial'
+
+def compliance_grade(compliant, total):
+    """Letter grade from the share of fully compliant items."""
+    if not total:
+        return 'N/A'
+    rate = compliant / total * 100
+    for cutoff, grade in ((90, 'A'), (80, 'B'), (70, 'C'), (60, 'D')):
+        if rate >= cutoff:
+            return grade
+    return 'F'
+
+def parse_grade(analysis_text):
+    """Find the overall letter grade in a markdown analysis ('N/A' if absent)."""
+    match = GRADE.search(analysis_text)
+    return match.group(1).upper() if match else 'N/A'
+
+def parse_critical_issues(analysis_text):
+    """Return the SUMMARY OF CRITICAL ISSUES entries as {'title', 'description'} dicts."""
+    section = CRITICAL_SECTION.search(analysis_text)
+    if not section:
+        return []
+    return [
+        {'title': match.group(1).strip(), 'description': match.group(2).strip()}
+        for match in CRITICAL_ISSUE.finditer(section.group(1))
+    ]
+
+def format_analysis(items, title="COMPLIANCE CHECKLIST ANALYSIS", grade=None, critical_issues=None):
+    """
+    Render parsed items back into the markdown shape the model produces,
+    including the critical-issues and scorecard sections.
+    
+    Args:
+        items: Item dicts as returned by parse_items()
+        title: Heading for the item section
+        grade: Overall grade; derived from the compliant share if omitted
+        critical_issues: {'title', 'description'} dicts; defaults to the
+                         High-risk items
+    """
+    parts = [f"## {title}\n"]
+    for item in sorted(items, key=lambda item: int(item['number'])):
+        parts.append(
+            f"### {item['number']}. {item['title']} ({item['code']})\n"
+            f"- **Status**: {item['status']}\n"
+            f"- **Pages**: {item['pages']}\n"
+            f"- **Assessment**: {item['assessment']}\n"
+            f"- **Risk Level**: {item['risk']}\n"
+            f"- **Recommendation**: {item['recommendation']}\n"
+            f"- **Legal Citation**: {item['citation']}\n"
+        )
+    
+    counts = {'compliant': 0, 'partial': 0, 'noncompliant': 0}
+    for item in items:
+        counts[classify_item(item)] += 1
+    
+    if critical_issues is None:
+        critical_issues = [
+            {'title': item['title'], 'description': item['recommendation']}
+            for item in items if risk_rank(item['risk']) == RISK_RANK['high']
+        ]
+    if grade is None:
+        grade = compliance_grade(counts['compliant'], len(items))
+    
+    parts.append("## SUMMARY OF CRITICAL ISSUES\n")
+    for idx, issue in enumerate(critical_issues, 1):
+        parts.append(f"{idx}. **{issue['title']}** - {issue['description']}")
+    
+    parts.append(
+        "\n---\n\n"
+        "## COMPLIANCE SCORECARD\n\n"
+        f"- **Compliant Items**: {counts['compliant']}\n"
+        f"- **Partially Compliant Items**: {counts['partial']}\n"
+        f"- **Non-Compliant Items**: {counts['noncompliant']}\n"
+        f"- **Total Items Reviewed**: {len(items)}\n"
+        f"- **Overall Compliance Grade**: {grade}\n"
+    )
+    return "\n".join(parts)
@@ -1,47 +1,471 @@
 import anthropic
+import json
 import os
+import threading
 import time
-from prompts import get_compliance_prompt
-from checklist import get_checklist
+from concurrent.futures import ThreadPoolExecutor
+from prompts import (
+    get_system_blocks, get_handbook_message, get_excerpt_message,
+    get_selected_pages_message, get_compliance_tool, estimate_tokens,
+    COMPLIANCE_TOOL_NAME
+)
+from checklist import load_checklist, format_checklist
+from analysis_cache import AnalysisCache
+from analysis_parser import IncrementalAnalysisParser, parse_items, format_analysis
+from chunking import split_pages, chunk_pages, merge_findings
+from pdf_extractor import assemble_text
+from retrieval import PageIndex, select_pages
+from models import ComplianceResult, ResultValidationError
+from budget import Budget, BudgetExceededError, estimate_requests, output_token_limit, usage_cost
+from tracing import span, traced, propagate, current_span
+
+MODEL = "claude-sonnet-4-20250514"
+
+# Handbooks larger than this are analyzed in chunks (map-reduce) so the
+# prompt, checklist and response still fit in the model's context window
+MAX_SINGLE_PASS_TOKENS = 150000
+CHUNK_TOKENS = 30000
+
+# Retrieval mode: pages sent per checklist item, and items per request
+RETRIEVAL_TOP_K = 3
+RETRIEVAL_GROUP_SIZE = 10
+
+USAGE_FIELDS = (
+    'input_tokens',
+    'cache_creation_input_tokens',
+    'cache_read_input_tokens',
+    'output_tokens'
+)
+
+def new_usage():
+    """Empty token-usage counters."""
+    return {field: 0 for field in USAGE_FIELDS}
+
+def usage_from_message(message):
+    """Read token usage (including prompt-cache counts) off an API response."""
+    usage = getattr(message, 'usage', None)
+    return {field: getattr(usage, field, None) or 0 for field in USAGE_FIELDS}
+
+def format_usage(usage):
+    """One-line summary of cached vs. uncached input tokens."""
+    total_input = usage['input_tokens'] + usage['cache_creation_input_tokens'] + usage['cache_read_input_tokens']
+    hit_rate = usage['cache_read_input_tokens'] / total_input * 100 if total_input else 0
+    return (f"{total_input:,} input tokens ({usage['cache_read_input_tokens']:,} cache read, "
+            f"{usage['cache_creation_input_tokens']:,} cache write, {usage['input_tokens']:,} uncached; "
+            f"{hit_rate:.0f}% cached), {usage['output_tokens']:,} output tokens, ${usage_cost(usage, MODEL):.2f}")
+
+def build_retrieval_requests(page_map, items, top_k=RETRIEVAL_TOP_K, group_size=RETRIEVAL_GROUP_SIZE):
+    """
+    Group checklist items and pick each group's pages.
+    
+    Returns:
+        list: (system_blocks, prompt, group) per request
+    """
+    groups = [items[i:i + group_size] for i in range(0, len(items), group_size)]
+    index = PageIndex(page_map)
+    
+    requests = []
+    for group in groups:
+        pages = select_pages(index, group, top_k)
+        excerpt, _ = assemble_text((page, page_map[page]) for page in pages)
+        requests.append((
+            get_system_blocks(format_checklist(group)),
+            get_selected_pages_message(excerpt, pages),
+            group
+        ))
+    return requests
+
+def _system_text(blocks):
+    return "".join(block['text'] for block in blocks)
+
+def estimate_retrieval(requests, concurrency=4):
+    """Estimate retrieval requests already built by build_retrieval_requests()."""
+    return estimate_requests(
+        [(_system_text(system), prompt, len(group)) for system, prompt, group in requests],
+        MODEL, 'retrieval', concurrency
+    )
+
+def estimate_analysis(handbook_text, checklist, mode, page_map=None, top_k=RETRIEVAL_TOP_K,
+                      group_size=RETRIEVAL_GROUP_SIZE, concurrency=4, items=None):
+    """
+    Estimate tokens, cost and latency of an analysis before sending it.
+    
+    Builds the same prompts the analyzer would send, so no API call or
+    client is needed.
+    
+    Args:
+        handbook_text: Extracted text from handbook PDF
+        checklist: Checklist from the registry
+        mode: 'full', 'structured', 'chunked' or 'retrieval' (needs page_map)
+        items: Retrieval mode only: estimate just these checklist items
+        
+    Returns:
+        dict: See budget.estimate_requests()
+    """
+    
+    item_count = len(checklist.items)
+    if mode == 'retrieval':
+        items = list(checklist.items if items is None else items)
+        return estimate_retrieval(build_retrieval_requests(page_map, items, top_k, group_size), concurrency)
+    elif mode == 'chunked':
+        system = _system_text(get_system_blocks(checklist.text))
+        requests = [
+            (system, get_excerpt_message(chunk['text'], chunk['first_page'], chunk['last_page']), item_count)
+            for chunk in chunk_pages(split_pages(handbook_text), CHUNK_TOKENS)
+        ]
+    elif mode == 'structured':
+        # The tool schema is sent with the request and billed as input
+        system = _system_text(get_system_blocks(checklist.text, structured=True)) + json.dumps(get_compliance_tool())
+        requests = [(system, get_handbook_message(handbook_text), item_count)]
+    else:
+        requests = [(_system_text(get_system_blocks(checklist.text)), get_handbook_message(handbook_text), item_count)]
+    
+    return estimate_requests(requests, MODEL, mode, concurrency)
+
+def plan_analysis(handbook_text, checklist, budget, page_map=None, retrieval=False, structured=False):
+    """
+    Estimate an analysis and check it against a budget before sending.
+    
+    The mode is the one the analyzer would pick (chunked when the handbook
+    is too large for one request). If that is over budget and page_map is
+    available, the cheaper retrieval mode is tried instead.
+    
+    Args:
+        handbook_text: Extracted text from handbook PDF
+        checklist: Checklist from the registry
+        budget: Budget to check against
+        page_map: {page_num: text}, needed for retrieval mode
+        retrieval: Plan a retrieval-mode analysis
+        structured: Plan a structured (tool-use) analysis
+        
+    Returns:
+        dict: The estimate (see budget.estimate_requests()) plus 'allowed'
+              and 'reason' (why it was trimmed or refused, else None)
+    """
+    
+    if retrieval:
+        mode = 'retrieval'
+    elif estimate_tokens(handbook_text) > MAX_SINGLE_PASS_TOKENS:
+        mode = 'chunked'
+    else:
+        mode = 'structured' if structured else 'full'
+    
+    estimate = estimate_analysis(handbook_text, checklist, mode, page_map)
+    reason = budget.check(estimate)
+    if reason is None:
+        return {**estimate, 'allowed': True, 'reason': None}
+    
+    if mode != 'retrieval' and page_map:
+        trimmed = estimate_analysis(handbook_text, checklist, 'retrieval', page_map)
+        if budget.check(trimmed) is None:
+            return {**trimmed, 'allowed': True, 'reason': f"{reason}; using retrieval mode instead"}
+    
+    return {**estimate, 'allowed': False, 'reason': reason}
 
 class HandbookAnalyzer:
-    def __init__(self, api_key):
-        """Initialize the analyzer with Anthropic API key."""
+    def __init__(self, api_key, cache=None, checklist=None, budget=None):
+        """
+        Initialize the analyzer with Anthropic API key.
+        
+        Args:
+            api_key: Anthropic API key
+            cache: Optional AnalysisCache; defaults to the shared on-disk cache.
+                   Pass False to disable caching.
+            checklist: Optional Checklist (or item subset) from the checklist
+                       registry; defaults to the default checklist
+            budget: Optional Budget; defaults to Budget.from_env()
+        """
         self.client = anthropic.Anthropic(api_key=api_key)
+        self.cache = AnalysisCache() if cache is None else cache
+        self.checklist = checklist or load_checklist()
+        self.budget = Budget.from_env() if budget is None else budget
+        
+        # Token usage across every call made by this analyzer
+        self.usage = new_usage()
+        self.cost = 0.0
+        self.last_usage = None
+        self._usage_lock = threading.Lock()
+    
+    def plan(self, handbook_text, page_map=None, retrieval=False, structured=False):
+        """Estimate an analysis and check it against this analyzer's budget (see plan_analysis)."""
+        return plan_analysis(handbook_text, self.checklist, self.budget, page_map, retrieval, structured)
     
-    def analyze_handbook(self, handbook_text):
+    @traced('analyze', mode='full')
+    def analyze_handbook(self, handbook_text, on_item=None):
         """
         Analyze handbook for CA employment law compliance.
         
         Args:
             handbook_text: Extracted text from handbook PDF
+            on_item: Optional callback receiving each parsed checklist item
+                     as soon as it is complete. When given, the response is
+                     streamed instead of returned in one piece.
             
         Returns:
             str: Analysis results from Claude
+            
+        Raises:
+            BudgetExceededError: The estimate is over this analyzer's budget
         """
         
         # Get the checklist
-        checklist = get_checklist()
+        checklist = self.checklist.text
         
-        # Create the prompt
-        prompt = get_compliance_prompt(handbook_text, checklist)
+        # Re-uploads of an unchanged handbook are served from the cache
+        cache_key = None
+        if self.cache:
+            cache_key = self.cache.make_key(handbook_text, checklist, MODEL)
+            cached = self.cache.get(cache_key)
+            if cached:
+                print("⚡ Loaded analysis from cache")
+                if on_item:
+                    for item in parse_items(cached):
+                        on_item(item)
+                return cached
         
-        print("🤖 Sending to Claude for analysis...")
+        if estimate_tokens(handbook_text) > MAX_SINGLE_PASS_TOKENS:
+            analysis = self.analyze_handbook_chunked(handbook_text, checklist)
+            if analysis and on_item:
+                for item in parse_items(analysis):
+                    on_item(item)
+        else:
+            with self.budget.reserve(estimate_analysis(handbook_text, self.checklist, 'full')):
+                analysis = self._run_analysis(handbook_text, checklist, on_item)
+        
+        if analysis and cache_key:
+            self.cache.put(cache_key, analysis)
+        
+        return analysis
+    
+    @traced('analyze', mode='structured')
+    def analyze_handbook_structured(self, handbook_text):
+        """
+        Analyze a handbook and return a typed, validated result.
+        
+        The model is forced to answer through the record_compliance_analysis
+        tool, so the result arrives as JSON matching the tool's schema rather
+        than markdown that has to be scraped.
+        
+        Args:
+            handbook_text: Extracted text from handbook PDF
+            
+        Returns:
+            ComplianceResult, or None if the call failed or the output was invalid
+            
+        Raises:
+            BudgetExceededError: The estimate is over this analyzer's budget
+        """
+        
+        checklist = self.checklist.text
+        
+        cache_key = None
+        if self.cache:
+            cache_key = self.cache.make_key(handbook_text, checklist, MODEL, mode="structured")
+            cached = self.cache.get(cache_key)
+            if cached:
+                try:
+                    result = ComplianceResult.from_json(cached)
+                    print("⚡ Loaded analysis from cache")
+                    return result
+                except (ResultValidationError, ValueError, KeyError):
+                    pass  # written by an older schema; re-run and overwrite
+        
+        # Too large for one request: fall back to map-reduce over chunks
+        if estimate_tokens(handbook_text) > MAX_SINGLE_PASS_TOKENS:
+            analysis = self.analyze_handbook_chunked(handbook_text, checklist)
+            return ComplianceResult.from_markdown(analysis) if analysis else None
+        
+        with span('prompt_build'):
+            system = get_system_blocks(checklist, structured=True)
+            prompt = get_handbook_message(handbook_text)
+        
+        print("🤖 Sending to Claude for structured analysis...")
         print(f"📄 Analyzing {len(handbook_text)} characters of handbook text...")
         
+        estimate = estimate_analysis(handbook_text, self.checklist, 'structured')
         try:
-            # Call Claude API
-            message = self.client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=4000,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
+            max_tokens = max(8000, output_token_limit(len(self.checklist.items)))
+            with self.budget.reserve(estimate), span('api_call', structured=True, max_tokens=max_tokens):
+                message = self.client.messages.create(
+                    model=MODEL,
+                    max_tokens=max_tokens,
+                    system=system,
+                    tools=[get_compliance_tool()],
+                    tool_choice={"type": "tool", "name": COMPLIANCE_TOOL_NAME},
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ]
+                )
+                self._record_usage(message)
+            
+            tool_input = next(
+                block.input for block in message.content
+                if block.type == "tool_use" and block.name == COMPLIANCE_TOOL_NAME
             )
+            result = ComplianceResult.from_tool_input(tool_input)
             
-            # Extract the response
-            analysis = message.content[0].text
+        except BudgetExceededError:
+            raise
+        except StopIteration:
+            print("❌ Claude did not return a structured result")
+            return None
+        except ResultValidationError as e:
+            print(f"❌ Structured result failed validation: {e}")
+            return None
+        except Exception as e:
+            print(f"❌ Error calling Claude API: {e}")
+            return None
+        
+        print(f"✅ Analysis complete! {result.total} items, grade {result.grade}")
+        if cache_key:
+            self.cache.put(cache_key, result.to_json())
+        return result
+    
+    @traced('map_reduce')
+    def analyze_handbook_chunked(self, handbook_text, checklist=None,
+                                 max_chunk_tokens=CHUNK_TOKENS, concurrency=4):
+        """
+        Map-reduce analysis for handbooks that exceed the context budget.
+        
+        The text is split on [PAGE N] boundaries into token-budgeted chunks,
+        each chunk is checked against the full checklist in parallel, and the
+        per-chunk findings are merged into the usual markdown analysis.
+        
+        Args:
+            handbook_text: Extracted text from handbook PDF
+            checklist: Checklist text (defaults to this analyzer's checklist)
+            max_chunk_tokens: Approximate token budget per chunk
+            concurrency: Maximum chunks analyzed at once
+            
+        Returns:
+            str: Merged analysis in the format ReportGenerator parses, or None
+                 if any chunk failed
+            
+        Raises:
+            BudgetExceededError: The estimate is over this analyzer's budget
+        """
+        
+        if checklist is None:
+            checklist = self.checklist.text
+        
+        with span('prompt_build') as s:
+            chunks = chunk_pages(split_pages(handbook_text), max_chunk_tokens)
+            system = get_system_blocks(checklist)
+            s.set(requests=len(chunks))
+        
+        print(f"🧩 Splitting handbook into {len(chunks)} chunks of ~{max_chunk_tokens:,} tokens...")
+        
+        def analyze_chunk(chunk):
+            prompt = get_excerpt_message(chunk['text'], chunk['first_page'], chunk['last_page'])
+            try:
+                return self._request(system, prompt, None, set())
+            except Exception as e:
+                print(f"❌ Error analyzing pages {chunk['first_page']}-{chunk['last_page']}: {e}")
+                return None
+        
+        estimate = estimate_analysis(handbook_text, self.checklist, 'chunked', concurrency=concurrency)
+        with self.budget.reserve(estimate), ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            results = list(executor.map(propagate(analyze_chunk), chunks))
+        
+        if not results or any(result is None for result in results):
+            return None
+        
+        merged = merge_findings([parse_items(result) for result in results])
+        print(f"✅ Merged findings for {len(merged)} items from {len(chunks)} chunks")
+        return format_analysis(merged)
+    
+    @traced('analyze', mode='retrieval')
+    def analyze_handbook_retrieval(self, page_map, top_k=RETRIEVAL_TOP_K,
+                                   group_size=RETRIEVAL_GROUP_SIZE, concurrency=4, items=None):
+        """
+        Analyze using only the pages most relevant to each checklist item.
+        
+        A BM25 index over page_map picks the top-k pages for every item;
+        items are analyzed in groups, each group seeing only the union of its
+        items' pages with their original [PAGE N] markers.
+        
+        Args:
+            page_map: {page_num: text} from extract_text_from_pdf()
+            top_k: Pages retrieved per checklist item
+            group_size: Checklist items per request
+            concurrency: Maximum groups analyzed at once
+            items: Checklist items to analyze (from Checklist.items);
+                   defaults to this analyzer's checklist
+            
+        Returns:
+            str: Merged analysis in the format ReportGenerator parses, or None
+                 if any group failed
+            
+        Raises:
+            BudgetExceededError: The estimate is over this analyzer's budget
+        """
+        
+        checklist = self.checklist.text
+        handbook_text, _ = assemble_text(sorted(page_map.items()))
+        
+        cache_key = None
+        if self.cache:
+            variant = f"{MODEL}:retrieval:k={top_k}:group={group_size}"
+            if items is not None:
+                variant += ":items=" + ",".join(str(item['number']) for item in items)
+            cache_key = self.cache.make_key(handbook_text, checklist, variant, mode="retrieval")
+            cached = self.cache.get(cache_key)
+            if cached:
+                print("⚡ Loaded analysis from cache")
+                return cached
+        
+        if items is None:
+            items = list(self.checklist.items)
+        with span('prompt_build') as s:
+            requests = build_retrieval_requests(page_map, items, top_k, group_size)
+            s.set(requests=len(requests))
+        
+        sent_tokens = sum(estimate_tokens(prompt) for _, prompt, _ in requests)
+        full_tokens = estimate_tokens(handbook_text)
+        print(f"🔎 Retrieval: sending ~{sent_tokens:,} of ~{full_tokens:,} handbook tokens "
+              f"({sent_tokens / max(full_tokens, 1):.0%}) across {len(requests)} requests")
+        
+        def analyze_group(request):
+            system, prompt, group = request
+            try:
+                result = self._request(system, prompt, None, set(), len(group))
+            except Exception as e:
+                print(f"❌ Error analyzing items {group[0]['number']}-{group[-1]['number']}: {e}")
+                return None
             
+            # Ignore anything the model reported outside its assigned items
+            wanted = {str(item['number']) for item in group}
+            return [item for item in parse_items(result) if item['number'] in wanted]
+        
+        estimate = estimate_retrieval(requests, concurrency)
+        with self.budget.reserve(estimate), ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            results = list(executor.map(propagate(analyze_group), requests))
+        
+        if any(result is None for result in results):
+            return None
+        
+        analysis = format_analysis(merge_findings(results))
+        if cache_key:
+            self.cache.put(cache_key, analysis)
+        return analysis
+    
+    def _run_analysis(self, handbook_text, checklist, on_item=None):
+        """Send the handbook to Claude and return the raw analysis text."""
+        
+        # Static instructions go in a cacheable system prefix; only the
+        # handbook text changes between requests
+        with span('prompt_build'):
+            system = get_system_blocks(checklist)
+            prompt = get_handbook_message(handbook_text)
+        
+        print("🤖 Sending to Claude for analysis...")
+        print(f"📄 Analyzing {len(handbook_text)} characters of handbook text...")
+        
+        # Item numbers already handed to on_item, so a retry doesn't repeat them
+        emitted = set()
+        
+        try:
+            analysis = self._request(system, prompt, on_item, emitted)
             print("✅ Analysis complete!")
             return analysis
             
@@ -49,20 +473,14 @@ class HandbookAnalyzer:
             # Check if it's a rate limit error
             if "rate_limit" in str(e).lower() or "429" in str(e):
                 print("⏳ Rate limit hit. Waiting 60 seconds...")
+                if current_span():
+                    current_span().set(retries=1)
                 time.sleep(60)
                 print("🔄 Retrying...")
                 
                 # Retry the API call
                 try:
-                    message = self.client.messages.create(
-                        model="claude-sonnet-4-20250514",
-                        max_tokens=4000,
-                        messages=[
-                            {"role": "user", "content": prompt}
-                        ]
-                    )
-                    
-                    analysis = message.content[0].text
+                    analysis = self._request(system, prompt, on_item, emitted)
                     print("✅ Analysis complete!")
                     return analysis
                     
@@ -73,6 +491,64 @@ class HandbookAnalyzer:
                 # If it's a different error, just report it
                 print(f"❌ Error calling Claude API: {e}")
                 return None
+    
+    def _request(self, system, prompt, on_item, emitted, item_count=None):
+        """Make one API call, streaming items to on_item if it is set."""
+        
+        # Room for the expected response instead of a fixed cap, so large
+        # checklists aren't truncated
+        max_tokens = output_token_limit(item_count or len(self.checklist.items))
+        
+        if not on_item:
+            with span('api_call', streamed=False, max_tokens=max_tokens):
+                message = self.client.messages.create(
+                    model=MODEL,
+                    max_tokens=max_tokens,
+                    system=system,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ]
+                )
+                self._record_usage(message)
+            return message.content[0].text
+        
+        parser = IncrementalAnalysisParser()
+        
+        def emit(items):
+            for item in items:
+                if item['number'] not in emitted:
+                    emitted.add(item['number'])
+                    on_item(item)
+        
+        with span('api_call', streamed=True, max_tokens=max_tokens), self.client.messages.stream(
+            model=MODEL,
+            max_tokens=max_tokens,
+            system=system,
+            messages=[
+                {"role": "user", "content": prompt}
+            ]
+        ) as stream:
+            for chunk in stream.text_stream:
+                emit(parser.feed(chunk))
+            self._record_usage(stream.get_final_message())
+        
+        emit(parser.close())
+        return parser.text
+    
+    def _record_usage(self, message):
+        """Track cached vs. uncached input tokens and cost for this call and in total."""
+        
+        usage = usage_from_message(message)
+        cost = usage_cost(usage, MODEL)
+        if current_span():
+            current_span().set(**usage, cost=round(cost, 6))
+        with self._usage_lock:
+            self.last_usage = usage
+            self.cost += cost
+            for field in USAGE_FIELDS:
+                self.usage[field] += usage[field]
+        self.budget.record(cost)
+        print(f"💾 {format_usage(usage)}")
 
 # Test function
 if __name__ == "__main__":
@@ -0,0 +1,335 @@
+import anthropic
+import asyncio
+import random
+import time
+from prompts import get_system_blocks, get_handbook_message, get_excerpt_message, estimate_tokens
+from checklist import load_checklist
+from analysis_cache import AnalysisCache
+from analysis_parser import parse_items, format_analysis
+from analyzer import (
+    MODEL, MAX_SINGLE_PASS_TOKENS, CHUNK_TOKENS, USAGE_FIELDS, new_usage, usage_from_message, estimate_analysis
+)
+from chunking import split_pages, chunk_pages, merge_findings
+from budget import Budget, BudgetExceededError, output_token_limit, usage_cost
+from tracing import span, current_span
+
+# Status codes worth retrying: rate limited, overloaded, or transient server errors
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+class TokenBucketLimiter:
+    """
+    Client-side limiter for requests-per-minute and tokens-per-minute.
+
+    Both buckets refill continuously. A request waits until there is room for
+    one request and its estimated input tokens, so a burst of submissions is
+    spread out instead of tripping 429s on the server.
+    """
+
+    def __init__(self, requests_per_minute=50, tokens_per_minute=40000):
+        self.rpm = requests_per_minute
+        self.tpm = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    async def acquire(self, tokens):
+        """Wait until one request of `tokens` input tokens may be sent."""
+
+        # A single request larger than the whole bucket could never fit
+        tokens = min(tokens, self.tpm)
+
+        # Holding the lock while sleeping keeps waiters first-come, first-served
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+
+                wait = max(
+                    (1 - self._requests) * 60 / self.rpm,
+                    (tokens - self._tokens) * 60 / self.tpm
+                )
+                await asyncio.sleep(max(wait, 0.01))
+
+    def penalize(self, seconds):
+        """Drain the buckets after a 429 so other tasks back off too."""
+
+        self._refill()
+        self._requests = min(self._requests, -seconds * self.rpm / 60)
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of total requests.
+
+    Every request deposits `ratio` tokens and every retry spends one, so a
+    sustained outage can't multiply traffic; `min_retries` covers quiet periods.
+    """
+
+    def __init__(self, ratio=0.2, min_retries=10):
+        self.ratio = ratio
+        self._balance = float(min_retries)
+        self._max_balance = float(min_retries) * 2
+
+    def record_request(self):
+        self._balance = min(self._max_balance, self._balance + self.ratio)
+
+    def try_spend(self):
+        if self._balance >= 1:
+            self._balance -= 1
+            return True
+        return False
+
+def retry_after_seconds(error):
+    """Return the server-requested delay from a retry-after header, if any."""
+
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except (TypeError, ValueError):
+        # HTTP-date form or garbage: fall back to our own backoff
+        pass
+    return None
+
+def is_retryable(error):
+    """True for rate limits, overload and connection/timeout errors."""
+
+    if isinstance(error, (anthropic.APIConnectionError, anthropic.APITimeoutError)):
+        return True
+    return getattr(error, 'status_code', None) in RETRYABLE_STATUS
+
+def backoff_delay(attempt, base=2.0, cap=60.0):
+    """Full-jitter exponential backoff for the given 0-based attempt."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+class AsyncHandbookAnalyzer:
+    def __init__(self, api_key=None, client=None, cache=None,
+                 requests_per_minute=50, tokens_per_minute=40000,
+                 max_retries=6, retry_budget=None, checklist=None, budget=None):
+        """
+        Initialize the async analyzer.
+
+        Args:
+            api_key: Anthropic API key (ignored if client is given)
+            client: Optional pre-built async client, e.g. a local stub
+            cache: Optional AnalysisCache; pass False to disable caching
+            requests_per_minute: Org request limit to pace against
+            tokens_per_minute: Org input-token limit to pace against
+            max_retries: Attempts per analysis after the first
+            retry_budget: Optional shared RetryBudget
+            checklist: Optional Checklist from the registry (default checklist if omitted)
+            budget: Optional Budget; defaults to Budget.from_env()
+        """
+        # Retries are handled here so they share the limiter and budget
+        self.client = client or anthropic.AsyncAnthropic(api_key=api_key, max_retries=0)
+        self.cache = AnalysisCache() if cache is None else cache
+        self.checklist = checklist or load_checklist()
+        self.budget = Budget.from_env() if budget is None else budget
+        self.limiter = TokenBucketLimiter(requests_per_minute, tokens_per_minute)
+        self.max_retries = max_retries
+        self.retry_budget = retry_budget or RetryBudget()
+        self.stats = {'requests': 0, 'retries': 0, 'rate_limited': 0, 'failures': 0}
+        self.usage = new_usage()
+        self.cost = 0.0
+
+    async def analyze_handbook(self, handbook_text):
+        """
+        Analyze one handbook without blocking the event loop.
+
+        Handbooks over MAX_SINGLE_PASS_TOKENS are map-reduced over chunks,
+        as HandbookAnalyzer does.
+
+        Args:
+            handbook_text: Extracted text from handbook PDF
+
+        Returns:
+            str: Analysis results from Claude, or None on failure
+        """
+
+        checklist = self.checklist.text
+
+        cache_key = None
+        if self.cache:
+            cache_key = self.cache.make_key(handbook_text, checklist, MODEL)
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached:
+                return cached
+
+        chunked = estimate_tokens(handbook_text) > MAX_SINGLE_PASS_TOKENS
+        estimate = estimate_analysis(handbook_text, self.checklist, 'chunked' if chunked else 'full')
+        try:
+            reservation = await asyncio.to_thread(self.budget.hold, estimate)
+        except BudgetExceededError as e:
+            print(f"💸 Skipping analysis: {e}")
+            return None
+
+        # Each handbook is its own task, so its spend settles its own reservation
+        with self.budget.settle(reservation):
+            if chunked:
+                analysis = await self._analyze_chunked(handbook_text, checklist)
+            else:
+                with span('prompt_build'):
+                    system = get_system_blocks(checklist)
+                    prompt = get_handbook_message(handbook_text)
+                with span('api_call', streamed=False):
+                    analysis = await self._call_with_retries(system, prompt)
+
+        if analysis and cache_key:
+            await asyncio.to_thread(self.cache.put, cache_key, analysis)
+
+        return analysis
+
+    async def _analyze_chunked(self, handbook_text, checklist):
+        """Map-reduce over page chunks, concurrently; None if any chunk failed."""
+        with span('prompt_build') as s:
+            chunks = chunk_pages(split_pages(handbook_text), CHUNK_TOKENS)
+            system = get_system_blocks(checklist)
+            prompts = [get_excerpt_message(chunk['text'], chunk['first_page'], chunk['last_page']) for chunk in chunks]
+            s.set(requests=len(chunks))
+
+        with span('api_call', streamed=False, chunks=len(chunks)):
+            results = await asyncio.gather(*(self._call_with_retries(system, prompt) for prompt in prompts))
+
+        if not results or any(result is None for result in results):
+            return None
+        return format_analysis(merge_findings([parse_items(result) for result in results]))
+
+    async def _call_with_retries(self, system, prompt):
+        # Cached prefix tokens don't count toward the input-token limit
+        tokens = estimate_tokens(prompt)
+        self.retry_budget.record_request()
+
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire(tokens)
+            self.stats['requests'] += 1
+
+            try:
+                message = await self.client.messages.create(
+                    model=MODEL,
+                    max_tokens=output_token_limit(len(self.checklist.items)),
+                    system=system,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ]
+                )
+                usage = usage_from_message(message)
+                for field in USAGE_FIELDS:
+                    self.usage[field] += usage[field]
+                cost = usage_cost(usage, MODEL)
+                self.cost += cost
+                if current_span():
+                    current_span().set(**usage, cost=round(cost, 6))
+                await asyncio.to_thread(self.budget.record, cost)
+                return message.content[0].text
+
+            except Exception as e:
+                if not is_retryable(e):
+                    print(f"❌ Error calling Claude API: {e}")
+                    break
+
+                if attempt == self.max_retries or not self.retry_budget.try_spend():
+                    print(f"❌ Giving up after {attempt + 1} attempts: {e}")
+                    break
+
+                delay = retry_after_seconds(e)
+                if getattr(e, 'status_code', None) == 429:
+                    self.stats['rate_limited'] += 1
+                    # Everyone sharing this limiter should back off, not just us
+                    self.limiter.penalize(delay or backoff_delay(attempt))
+                if delay is None:
+                    delay = backoff_delay(attempt)
+
+                self.stats['retries'] += 1
+                if current_span():
+                    current_span().set(retries=attempt + 1)
+                await asyncio.sleep(delay)
+
+        self.stats['failures'] += 1
+        return None
+
+    async def analyze_many(self, handbook_texts):
+        """
+        Analyze many handbooks concurrently on one event loop.
+
+        Returns:
+            list: Analyses (or None for failures) in the same order as the input
+        """
+        return await asyncio.gather(*(self.analyze_handbook(text) for text in handbook_texts))
+
+# Test function
+if __name__ == "__main__":
+    # Burst of 20 submissions against a local stub that rate-limits like the API
+
+    class _StubRateLimitError(Exception):
+        status_code = 429
+
+        def __init__(self, retry_after):
+            super().__init__("rate_limit_error")
+            self.response = type('Response', (), {'headers': {'retry-after': str(retry_after)}})()
+
+    class _StubMessages:
+        def __init__(self, latency, capacity):
+            self.latency = latency
+            self.capacity = capacity
+            self.in_flight = 0
+
+        async def create(self, **kwargs):
+            if self.in_flight >= self.capacity:
+                raise _StubRateLimitError(retry_after=0.5)
+            self.in_flight += 1
+            try:
+                await asyncio.sleep(self.latency * random.uniform(0.8, 1.2))
+            finally:
+                self.in_flight -= 1
+            text = type('Block', (), {'text': "### 1. Stub Item (Code)"})()
+            return type('Message', (), {'content': [text]})()
+
+    class _StubClient:
+        def __init__(self, latency=1.0, capacity=8):
+            self.messages = _StubMessages(latency, capacity)
+
+    async def run_burst(count=20):
+        analyzer = AsyncHandbookAnalyzer(
+            client=_StubClient(),
+            cache=False,
+            requests_per_minute=600,
+            tokens_per_minute=2_000_000
+        )
+
+        latencies = []
+
+        async def timed(text):
+            start = time.perf_counter()
+            result = await analyzer.analyze_handbook(text)
+            latencies.append(time.perf_counter() - start)
+            return result
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(timed(f"[PAGE 1]\n\nHandbook {i}") for i in range(count)))
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+        print(f"✅ {sum(r is not None for r in results)}/{count} analyses in {elapsed:.2f}s "
+              f"({count / elapsed:.1f}/s)")
+        print(f"⏱️  p50 {p50:.2f}s, p95 {p95:.2f}s, max {latencies[-1]:.2f}s")
+        print(f"📊 {analyzer.stats}")
+
+    print("🧪 Running a burst of 20 analyses against a stubbed client...")
+    asyncio.run(run_burst())
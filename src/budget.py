@@ -0,0 +1,324 @@
+"""
+Pre-flight token, cost and latency estimates, and spend budgets.
+
+Estimates use the same prompt builders as the analyzer and the ~4
+characters/token heuristic from prompts.estimate_tokens(), so they are
+close but not exact; actual spend is recorded from each response's usage.
+
+Against a daily limit, a run reserves its estimate in the ledger before
+it starts, so concurrent runs can't each see the same remaining budget;
+the reservation is settled to the actual cost as responses come in.
+"""
+
+import contextvars
+import math
+import os
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+from pathlib import Path
+from prompts import estimate_tokens
+
+# USD per million tokens
+PRICING = {
+    'claude-sonnet-4-20250514': {'input': 3.00, 'cache_write': 3.75, 'cache_read': 0.30, 'output': 15.00},
+}
+
+# Output size of the markdown/tool response, measured on sample analyses
+# (~110 tokens per item plus the critical-issues and scorecard sections)
+OUTPUT_TOKENS_PER_ITEM = 150
+OUTPUT_TOKENS_OVERHEAD = 400
+MIN_OUTPUT_TOKENS = 4000
+MAX_OUTPUT_TOKENS = 16000
+
+# Rough throughput for latency predictions
+INPUT_TOKENS_PER_SECOND = 10000
+OUTPUT_TOKENS_PER_SECOND = 50
+REQUEST_OVERHEAD_SECONDS = 1.5
+
+DEFAULT_LEDGER_PATH = "output/spend.db"
+
+# Reservations left behind by a crashed run stop counting after this long
+RESERVATION_TTL_SECONDS = 6 * 60 * 60
+
+# Ledger reservation the current run's spend is settled against (None
+# without a daily limit, _NO_RUN outside any run). Context variables follow
+# tracing.propagate() onto pool threads and asyncio tasks, so concurrent
+# handbooks sharing one Budget each settle their own
+_NO_RUN = object()
+_active_reservation = contextvars.ContextVar('budget_reservation', default=_NO_RUN)
+
+class BudgetExceededError(RuntimeError):
+    """Raised when an analysis would exceed the per-job or per-day budget."""
+
+def expected_output_tokens(item_count):
+    return item_count * OUTPUT_TOKENS_PER_ITEM + OUTPUT_TOKENS_OVERHEAD
+
+def output_token_limit(item_count):
+    """max_tokens for a response covering item_count items, with ~2x headroom."""
+    return min(MAX_OUTPUT_TOKENS, max(MIN_OUTPUT_TOKENS, 2 * expected_output_tokens(item_count)))
+
+def usage_cost(usage, model):
+    """Dollar cost of a usage dict (see analyzer.USAGE_FIELDS)."""
+    prices = PRICING[model]
+    return (
+        usage['input_tokens'] * prices['input']
+        + usage['cache_creation_input_tokens'] * prices['cache_write']
+        + usage['cache_read_input_tokens'] * prices['cache_read']
+        + usage['output_tokens'] * prices['output']
+    ) / 1_000_000
+
+def estimate_requests(requests, model, mode, concurrency=4):
+    """
+    Estimate tokens, cost and wall time for a set of API requests.
+
+    Args:
+        requests: (system_text, message_text, item_count) per request
+        model: Model name (a PRICING key)
+        mode: Label for the analysis mode ('full', 'chunked', 'retrieval')
+        concurrency: Requests in flight at once
+
+    Returns:
+        dict: 'mode', 'requests', 'input_tokens', 'output_tokens', 'cost'
+              and 'seconds'
+
+    The system prompt is a cached prefix: the first request with a given
+    system text pays the cache-write price and later ones the read price.
+    """
+    prices = PRICING[model]
+    seen_systems = set()
+    input_tokens = output_tokens = 0
+    cost = 0.0
+    latencies = []
+
+    for system_text, message_text, item_count in requests:
+        system_tokens = estimate_tokens(system_text)
+        message_tokens = estimate_tokens(message_text)
+        response_tokens = expected_output_tokens(item_count)
+
+        system_price = prices['cache_read'] if system_text in seen_systems else prices['cache_write']
+        seen_systems.add(system_text)
+        cost += (system_tokens * system_price + message_tokens * prices['input']
+                 + response_tokens * prices['output']) / 1_000_000
+
+        input_tokens += system_tokens + message_tokens
+        output_tokens += response_tokens
+        latencies.append(REQUEST_OVERHEAD_SECONDS
+                         + (system_tokens + message_tokens) / INPUT_TOKENS_PER_SECOND
+                         + response_tokens / OUTPUT_TOKENS_PER_SECOND)
+
+    if latencies:
+        lanes = min(len(latencies), max(1, concurrency))
+        seconds = max(max(latencies), sum(latencies) / lanes)
+    else:
+        seconds = 0.0
+
+    return {
+        'mode': mode,
+        'requests': len(requests),
+        'input_tokens': input_tokens,
+        'output_tokens': output_tokens,
+        'cost': cost,
+        'seconds': seconds,
+    }
+
+def format_estimate(estimate):
+    """One-line summary, e.g. "~57,000 input + ~3,400 output tokens in 1 request ≈ $0.22, ~70s"."""
+    plural = "" if estimate['requests'] == 1 else "s"
+    return (f"~{estimate['input_tokens']:,} input + ~{estimate['output_tokens']:,} output tokens "
+            f"in {estimate['requests']} {estimate['mode']} request{plural} ≈ ${estimate['cost']:.2f}, "
+            f"~{math.ceil(estimate['seconds'])}s")
+
+class SpendLedger:
+    """Per-day spend and open reservations, shared by every process on the box through SQLite."""
+
+    def __init__(self, path=DEFAULT_LEDGER_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS spend (
+                    day TEXT PRIMARY KEY,
+                    cost REAL NOT NULL,
+                    requests INTEGER NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS reservations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    day TEXT NOT NULL,
+                    amount REAL NOT NULL,
+                    created REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def _today():
+        return time.strftime("%Y-%m-%d")
+
+    def _committed(self, conn, day):
+        """Spend plus still-open reservations for a day."""
+        spent = conn.execute("SELECT cost FROM spend WHERE day = ?", (day,)).fetchone()
+        reserved = conn.execute(
+            "SELECT COALESCE(SUM(amount), 0) FROM reservations WHERE day = ? AND created > ?",
+            (day, time.time() - RESERVATION_TTL_SECONDS)
+        ).fetchone()[0]
+        return (spent[0] if spent else 0.0) + reserved
+
+    def reserve(self, amount, limit):
+        """
+        Atomically reserve `amount` if today's spend and reservations leave room under `limit`.
+
+        Returns:
+            tuple: (reservation id or None if refused, what was left before reserving)
+        """
+        conn = self._connect()
+        try:
+            # IMMEDIATE takes the write lock before reading, so two runs
+            # can't both fit into the same remaining budget
+            conn.execute("BEGIN IMMEDIATE")
+            day = self._today()
+            remaining = max(0.0, limit - self._committed(conn, day))
+            reservation = None
+            if amount <= remaining:
+                reservation = conn.execute(
+                    "INSERT INTO reservations (day, amount, created) VALUES (?, ?, ?)", (day, amount, time.time())
+                ).lastrowid
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return reservation, remaining
+
+    def release(self, reservation):
+        """Drop what is left of a reservation once its run is over."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM reservations WHERE id = ?", (reservation,))
+
+    def record(self, cost, reservation=None):
+        """Add actual spend, settling it against a reservation in the same transaction."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO spend (day, cost, requests) VALUES (?, ?, 1) "
+                "ON CONFLICT(day) DO UPDATE SET cost = cost + excluded.cost, requests = requests + 1",
+                (self._today(), cost)
+            )
+            if reservation is not None:
+                conn.execute(
+                    "UPDATE reservations SET amount = MAX(0, amount - ?) WHERE id = ?", (cost, reservation)
+                )
+
+    def spent_today(self):
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT cost FROM spend WHERE day = ?", (self._today(),)).fetchone()
+        return row[0] if row else 0.0
+
+    def committed_today(self):
+        """Today's spend plus the open reservations of runs in flight."""
+        with closing(self._connect()) as conn, conn:
+            return self._committed(conn, self._today())
+
+class Budget:
+    """
+    Per-job and per-day spending limits in USD (None means unlimited).
+
+    Configure with ANALYSIS_JOB_BUDGET_USD and ANALYSIS_DAILY_BUDGET_USD, or
+    pass limits directly.
+    """
+
+    def __init__(self, per_job=None, per_day=None, ledger=None):
+        self.per_job = per_job
+        self.per_day = per_day
+        self.ledger = ledger if ledger is not None else (SpendLedger() if per_day is not None else None)
+
+    @classmethod
+    def from_env(cls):
+        def limit(name):
+            value = os.getenv(name)
+            return float(value) if value else None
+        return cls(per_job=limit("ANALYSIS_JOB_BUDGET_USD"), per_day=limit("ANALYSIS_DAILY_BUDGET_USD"))
+
+    def remaining_today(self):
+        """Today's budget not yet spent or reserved by runs in flight (None if unlimited)."""
+        if self.per_day is None:
+            return None
+        return max(0.0, self.per_day - self.ledger.committed_today())
+
+    def _daily_reason(self, estimate, remaining):
+        return (f"estimated ${estimate['cost']:.2f} exceeds the ${remaining:.2f} left "
+                f"of today's ${self.per_day:.2f} budget")
+
+    def check(self, estimate):
+        """
+        Return why the estimate is over budget, or None if it fits.
+
+        Only a forecast: use reserve() around the run itself.
+        """
+        if self.per_job is not None and estimate['cost'] > self.per_job:
+            return f"estimated ${estimate['cost']:.2f} exceeds the ${self.per_job:.2f} per-job budget"
+
+        remaining = self.remaining_today()
+        if remaining is not None and estimate['cost'] > remaining:
+            return self._daily_reason(estimate, remaining)
+        return None
+
+    def hold(self, estimate):
+        """
+        Check the estimate and reserve it against today's budget in one step.
+
+        Returns:
+            Reservation id to pass to settle(), or None without a daily limit
+
+        Raises:
+            BudgetExceededError: Over the per-job budget, or today's budget
+                                 has less left than the estimate
+        """
+        if self.per_job is not None and estimate['cost'] > self.per_job:
+            raise BudgetExceededError(
+                f"estimated ${estimate['cost']:.2f} exceeds the ${self.per_job:.2f} per-job budget"
+            )
+        if self.per_day is None:
+            return None
+
+        reservation, remaining = self.ledger.reserve(estimate['cost'], self.per_day)
+        if reservation is None:
+            raise BudgetExceededError(self._daily_reason(estimate, remaining))
+        return reservation
+
+    @contextmanager
+    def settle(self, reservation):
+        """Settle spend recorded inside the block against a held reservation, then release it."""
+        token = _active_reservation.set(reservation)
+        try:
+            yield reservation
+        finally:
+            _active_reservation.reset(token)
+            if reservation is not None:
+                self.ledger.release(reservation)
+
+    @contextmanager
+    def reserve(self, estimate):
+        """
+        Hold the estimate for the duration of a run (see hold() and settle()).
+
+        Inside another run's block this holds nothing more: an entry point
+        called by another (a structured analysis falling back to chunks) is
+        already covered by the outer run's reservation.
+
+        Raises:
+            BudgetExceededError: The estimate no longer fits
+        """
+        active = _active_reservation.get()
+        if active is not _NO_RUN:
+            yield active
+            return
+
+        with self.settle(self.hold(estimate)) as reservation:
+            yield reservation
+
+    def record(self, cost):
+        if self.ledger is not None:
+            reservation = _active_reservation.get()
+            self.ledger.record(cost, None if reservation is _NO_RUN else reservation)
@@ -1,119 +1,177 @@
 """
-California Employment Law Compliance Checklist
-20 core requirements for employee handbooks
+Compliance checklist registry.
+
+Checklists live in data/checklists/ as text files: a short header (id,
+version, jurisdiction, title), a "---" line, then the checklist body that
+is sent to Claude. Every file is read and parsed into structured items
+once per process, on first use.
 """
 
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+CHECKLIST_DIR = Path(__file__).parent.parent / 'data' / 'checklists'
+DEFAULT_CHECKLIST = "ca-core"
+
+ITEM_HEADER = re.compile(r'^\s*(\d+)\.\s+\*\*(.+?)\*\*\s*(?:\((.+?)\))?\s*(?:-\s*(.+?))?\s*$')
+BULLET = re.compile(r'^\s+-\s+(.+?)\s*$')
+HEADER_FIELDS = ('id', 'version', 'jurisdiction', 'title')
+
+@dataclass(frozen=True)
+class Checklist:
+    id: str
+    version: str
+    jurisdiction: str
+    title: str
+    text: str
+    items: tuple
+
+    @property
+    def key(self):
+        """Versioned id, e.g. "ca-core@2026.1"."""
+        return f"{self.id}@{self.version}"
+
+    def select(self, numbers):
+        """
+        Return a checklist with only the given item numbers.
+
+        Items keep their original numbers, so findings from a subset run
+        line up with full runs.
+        """
+        wanted = set(numbers)
+        unknown = wanted - {item['number'] for item in self.items}
+        if unknown:
+            raise ValueError(f"Checklist {self.key} has no item(s) {sorted(unknown)}")
+
+        items = tuple(item for item in self.items if item['number'] in wanted)
+        return Checklist(self.id, self.version, self.jurisdiction, self.title, format_checklist(items), items)
+
+def _read_checklist(path):
+    header, separator, body = path.read_text(encoding='utf-8').partition("\n---\n")
+    if not separator:
+        raise ValueError(f"{path}: expected a header followed by a '---' line")
+
+    meta = {}
+    for line in header.splitlines():
+        name, _, value = line.partition(":")
+        meta[name.strip().lower()] = value.strip()
+
+    missing = [name for name in HEADER_FIELDS if not meta.get(name)]
+    if missing:
+        raise ValueError(f"{path}: header is missing {', '.join(missing)}")
+
+    text = body.strip("\n")
+    return Checklist(
+        id=meta['id'],
+        version=meta['version'],
+        jurisdiction=meta['jurisdiction'],
+        title=meta['title'],
+        text=text,
+        items=tuple(get_checklist_items(text))
+    )
+
+@lru_cache(maxsize=None)
+def _registry():
+    """
+    {id: Checklist} for every checklist file, loaded once per process.
+
+    Each checklist is indexed as "id@version"; the bare id points to its
+    latest version.
+    """
+    checklists = {}
+    for path in sorted(CHECKLIST_DIR.glob('*.md')):
+        checklist = _read_checklist(path)
+        checklists[checklist.key] = checklist
+
+        latest = checklists.get(checklist.id)
+        if latest is None or _version_key(checklist.version) > _version_key(latest.version):
+            checklists[checklist.id] = checklist
+    return checklists
+
+def _version_key(version):
+    return tuple(int(part) if part.isdigit() else part for part in version.split('.'))
+
+def available_checklists():
+    """Return the latest version of every registered checklist, sorted by id."""
+    registry = _registry()
+    return [registry[name] for name in sorted(registry) if '@' not in name]
+
+def load_checklist(checklist_id=DEFAULT_CHECKLIST, items=None):
+    """
+    Look up a checklist by id ("ca-core") or versioned id ("ca-core@2026.1").
+
+    Args:
+        checklist_id: Registered checklist id
+        items: Optional item numbers to keep (see Checklist.select)
+
+    Raises:
+        ValueError: Unknown id or item number
+    """
+    try:
+        checklist = _registry()[checklist_id]
+    except KeyError:
+        available = ", ".join(checklist.id for checklist in available_checklists())
+        raise ValueError(f"Unknown checklist '{checklist_id}' (available: {available})") from None
+    return checklist.select(items) if items else checklist
+
 def get_checklist():
     """
-    Returns the CA employment law compliance checklist.
+    Returns the default CA employment law compliance checklist.
     """
-    
-    checklist = """
-# CALIFORNIA EMPLOYMENT LAW COMPLIANCE CHECKLIST (20 Core Items)
-
-1. **At-Will Employment Disclaimer** (Labor Code §2922)
-   - Clear statement that employment is at-will
-   - Can be terminated by either party at any time
-   - Only authorized person can modify in writing
-
-2. **Equal Employment Opportunity Policy** (Gov. Code §12940)
-   - Prohibits discrimination based on all protected classes
-   - Includes: race, color, religion, sex, gender identity, sexual orientation, age, disability, medical condition, genetic information, marital status, military status, reproductive health decisions
-
-3. **Anti-Harassment Policy** (Gov. Code §12940)
-   - Definitions of harassment (sexual and all protected classes)
-   - Examples of prohibited conduct
-   - Clear statement it will not be tolerated
-
-4. **Harassment Complaint Procedure** (Gov. Code §12950)
-   - Multiple reporting channels
-   - Investigation process
-   - Confidentiality provisions
-   - Anti-retaliation statement
-
-5. **Meal Break Policy** (Labor Code §512)
-   - 30-minute unpaid meal break before end of 5th hour
-   - Second meal break before end of 10th hour
-   - Waiver provisions
-   - Premium pay for violations
-
-6. **Rest Break Policy** (Labor Code §226.7)
-   - 10-minute paid rest break per 4 hours worked
-   - Timing requirements
-   - Premium pay for violations
-
-7. **Overtime Policy** (Labor Code §510)
-   - Time-and-a-half after 8 hours/day or 40 hours/week
-   - Double-time after 12 hours/day
-   - 7th day overtime rules
-
-8. **Paid Sick Leave** (Labor Code §246)
-   - Accrual requirements (1 hour per 30 hours worked)
-   - Usage rights (employee, family member, designated person)
-   - Covered reasons including safe time
-
-9. **California Family Rights Act (CFRA)** (Gov. Code §12945.2)
-   - 12 weeks protected leave for eligible employees
-   - Covered reasons: bonding, serious health condition, military exigency
-   - Job restoration rights
-
-10. **Pregnancy Disability Leave (PDL)** (Gov. Code §12945)
-    - Up to 4 months leave for pregnancy-related disability
-    - Reasonable accommodation requirements
-    - No minimum service requirement
-
-11. **Wage Statement Requirements** (Labor Code §226)
-    - Required information on pay stubs
-    - Sick leave balance disclosure
-    - Employee access to records
-
-12. **Personnel Records Access** (Labor Code §1198.5)
-    - Employee right to inspect personnel files
-    - Timing requirements (within 30 days)
-    - Representative designation rights
-
-13. **Expense Reimbursement** (Labor Code §2802)
-    - Reimbursement for necessary business expenses
-    - Covers mileage, cell phone, tools, supplies
-
-14. **PAGA Notice** (Labor Code §2699)
-    - Notice of Private Attorneys General Act rights
-    - Employee right to file representative claims
-
-15. **Lactation Accommodation** (Labor Code §1031)
-    - Break time for expressing milk
-    - Private space requirements
-    - Anti-retaliation protections
-
-16. **Whistleblower Protection** (Labor Code §1102.5)
-    - Protection for reporting legal violations
-    - Covers internal and external reporting
-    - Anti-retaliation provisions
-
-17. **Anti-Retaliation Policy** (Labor Code §98.6)
-    - Prohibition on retaliation for exercising rights
-    - Covers wage complaints, leave requests, complaints
-
-18. **AI/Automated Decision Systems Policy** (SB 1001 - effective 2026)
-    - Disclosure of AI use in employment decisions
-    - Transparency requirements
-    - Employee rights regarding automated systems
-
-19. **Emergency Contact Designation** (SB 294 - effective 2026)
-    - Allow employees to designate emergency contacts
-    - Notification procedures during emergencies
-    - Confidentiality protections
-
-20. **Workers' Rights Notice** (SB 294 - effective 2026)
-    - Comprehensive notice of employee rights
-    - Wage/hour protections
-    - Safety and anti-discrimination rights
-"""
-    
-    return checklist
+    return load_checklist().text
+
+def get_checklist_items(checklist=None):
+    """
+    Parse the checklist into structured items.
+
+    Args:
+        checklist: Checklist text (defaults to the memoized default checklist)
+
+    Returns:
+        list: dicts with 'number', 'title', 'code', 'note' and 'bullets'
+    """
+    if checklist is None:
+        return list(load_checklist().items)
+
+    items = []
+    for line in checklist.splitlines():
+        header = ITEM_HEADER.match(line)
+        if header:
+            items.append({
+                'number': int(header.group(1)),
+                'title': header.group(2).strip(),
+                'code': (header.group(3) or "").strip(),
+                'note': (header.group(4) or "").strip(),
+                'bullets': []
+            })
+            continue
+
+        bullet = BULLET.match(line)
+        if bullet and items:
+            items[-1]['bullets'].append(bullet.group(1))
+
+    return items
+
+def format_checklist(items):
+    """Render structured items back into checklist text (e.g. for a subset)."""
+
+    blocks = []
+    for item in items:
+        header = f"{item['number']}. **{item['title']}**"
+        if item['code']:
+            header += f" ({item['code']})"
+        if item.get('note'):
+            header += f" - {item['note']}"
+        lines = [header] + [f"   - {bullet}" for bullet in item['bullets']]
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
 
 # Test function
 if __name__ == "__main__":
-    checklist = get_checklist()
-    print(checklist)
-    print(f"\n✅ Checklist loaded: {len(checklist)} characters")
\ No newline at end of file
+    for checklist in available_checklists():
+        print(f"📋 {checklist.key:<28} {checklist.jurisdiction:<4} {len(checklist.items):>3} items  {checklist.title}")
+
+    checklist = load_checklist()
+    print(f"\n✅ Default checklist {checklist.key}: {len(checklist.text)} characters")
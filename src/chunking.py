@@ -0,0 +1,110 @@
+import re
+from analysis_parser import parse_pages, format_pages, risk_rank
+from pdf_extractor import page_marker
+from prompts import estimate_tokens
+
+PAGE_MARKER = re.compile(r'\[PAGE (\d+)\]')
+
+# Status ranking for merging: a policy found in any chunk is present
+STATUS_RANK = {'missing': 0, 'partial': 1, 'present': 2}
+
+def split_pages(handbook_text):
+    """
+    Recover {page_num: text} from marked-up handbook text.
+
+    Inverse of pdf_extractor.assemble_text(); text before the first marker
+    is dropped.
+    """
+    page_map = {}
+    matches = list(PAGE_MARKER.finditer(handbook_text))
+    for match, following in zip(matches, matches[1:] + [None]):
+        end = following.start() if following else len(handbook_text)
+        page_map[int(match.group(1))] = handbook_text[match.end():end].strip("\n")
+    return page_map
+
+def chunk_pages(page_map, max_tokens=30000):
+    """
+    Group consecutive pages into chunks of at most ~max_tokens each.
+
+    Chunks never split a page, so a single oversized page becomes its own
+    chunk. Each chunk keeps the [PAGE N] markers so citations stay accurate.
+
+    Returns:
+        list: dicts with 'first_page', 'last_page' and 'text'
+    """
+    chunks = []
+    parts = []
+    tokens = 0
+    first_page = None
+    last_page = None
+
+    for page_num in sorted(page_map):
+        page_text = page_marker(page_num) + page_map[page_num]
+        page_tokens = estimate_tokens(page_text)
+
+        if parts and tokens + page_tokens > max_tokens:
+            chunks.append({'first_page': first_page, 'last_page': last_page, 'text': "".join(parts)})
+            parts, tokens, first_page = [], 0, None
+
+        if first_page is None:
+            first_page = page_num
+        last_page = page_num
+        parts.append(page_text)
+        tokens += page_tokens
+
+    if parts:
+        chunks.append({'first_page': first_page, 'last_page': last_page, 'text': "".join(parts)})
+    return chunks
+
+def status_rank(status_text):
+    """Order statuses Missing < Partial < Present."""
+    status_lower = status_text.lower()
+    if 'missing' in status_lower or 'not present' in status_lower:
+        return STATUS_RANK['missing']
+    if 'partial' in status_lower:
+        return STATUS_RANK['partial']
+    if 'present' in status_lower:
+        return STATUS_RANK['present']
+    return STATUS_RANK['missing']
+
+def merge_findings(chunk_items):
+    """
+    Merge per-chunk findings into one finding per checklist item.
+
+    Args:
+        chunk_items: List of per-chunk item lists (from parse_items)
+
+    Returns:
+        list: Merged items, sorted by item number
+
+    A policy present in any chunk is present overall. Pages are the union of
+    every chunk's citations. Risk is the worst case among chunks that found
+    the policy, fully or partially; "Missing" verdicts from chunks that simply didn't contain it
+    only count when no chunk found it at all. The assessment and
+    recommendation come from the chunk with the strongest, riskiest finding.
+    """
+    by_number = {}
+    for items in chunk_items:
+        for item in items:
+            by_number.setdefault(item['number'], []).append(item)
+
+    merged = []
+    for number, findings in by_number.items():
+        best_status = max(status_rank(f['status']) for f in findings)
+        relevant = [f for f in findings if status_rank(f['status']) == best_status]
+        primary = max(relevant, key=lambda f: risk_rank(f['risk']))
+        found = [f for f in findings if status_rank(f['status']) > STATUS_RANK['missing']] or findings
+        risk = max((f['risk'] for f in found), key=risk_rank)
+
+        pages = set()
+        for finding in findings:
+            pages.update(parse_pages(finding['pages']))
+
+        merged.append({
+            **primary,
+            'number': number,
+            'risk': risk,
+            'pages': format_pages(pages)
+        })
+
+    return sorted(merged, key=lambda item: int(item['number']))
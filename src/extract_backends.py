@@ -0,0 +1,158 @@
+"""
+Pluggable PDF text-extraction backends.
+
+Every backend honors the same contract: page_count(stream) and
+pages(stream, start, stop) yielding (page_num, text) with 1-indexed page
+numbers, so the [PAGE N] markers, page_map and the process-pool sharding
+in pdf_extractor work the same whichever engine reads the PDF.
+
+Built in (all but PyPDF2 are optional installs):
+    pypdf2   PyPDF2.PdfReader (default; what every cached analysis used)
+    pypdf    pypdf.PdfReader, PyPDF2's maintained successor
+    pdfminer pdfminer.six layout analysis
+    pdfium   pypdfium2 (Chromium's PDFium), usually the fastest
+
+Pick one with EXTRACT_BACKEND or the `backend` argument of
+extract_text_from_pdf(); compare them with benchmarks/bench_backends.py.
+
+The optional libraries are imported only when their backend is used, so
+importing this module (and every extraction worker process) doesn't pay
+for engines it never runs.
+"""
+
+import importlib.util
+import os
+import PyPDF2
+
+DEFAULT_EXTRACT_BACKEND = "pypdf2"
+
+def _installed(module):
+    """True if a module can be imported, without importing it."""
+    try:
+        return importlib.util.find_spec(module) is not None
+    except ImportError:  # a parent package is missing
+        return False
+
+class PyPDF2Backend:
+    name = "pypdf2"
+
+    @staticmethod
+    def available():
+        return True
+
+    def page_count(self, stream):
+        return len(PyPDF2.PdfReader(stream).pages)
+
+    def pages(self, stream, start=0, stop=None):
+        reader = PyPDF2.PdfReader(stream)
+        stop = len(reader.pages) if stop is None else stop
+        for index in range(start, stop):
+            yield index + 1, reader.pages[index].extract_text()
+
+class PypdfBackend:
+    name = "pypdf"
+
+    @staticmethod
+    def available():
+        return _installed("pypdf")
+
+    def page_count(self, stream):
+        import pypdf
+        return len(pypdf.PdfReader(stream).pages)
+
+    def pages(self, stream, start=0, stop=None):
+        import pypdf
+        reader = pypdf.PdfReader(stream)
+        stop = len(reader.pages) if stop is None else stop
+        for index in range(start, stop):
+            yield index + 1, reader.pages[index].extract_text()
+
+class PdfminerBackend:
+    name = "pdfminer"
+
+    @staticmethod
+    def available():
+        return _installed("pdfminer")
+
+    def page_count(self, stream):
+        from pdfminer.pdfpage import PDFPage
+        return sum(1 for _ in PDFPage.get_pages(stream))
+
+    def pages(self, stream, start=0, stop=None):
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LTTextContainer
+
+        if stop is None:
+            stop = self.page_count(stream)
+            stream.seek(0)
+        for index, layout in zip(range(start, stop), extract_pages(stream, page_numbers=range(start, stop))):
+            text = "".join(element.get_text() for element in layout if isinstance(element, LTTextContainer))
+            yield index + 1, text
+
+class PdfiumBackend:
+    name = "pdfium"
+
+    @staticmethod
+    def available():
+        return _installed("pypdfium2")
+
+    def page_count(self, stream):
+        import pypdfium2
+        document = pypdfium2.PdfDocument(stream)
+        try:
+            return len(document)
+        finally:
+            document.close()
+
+    def pages(self, stream, start=0, stop=None):
+        import pypdfium2
+        document = pypdfium2.PdfDocument(stream)
+        try:
+            stop = len(document) if stop is None else stop
+            for index in range(start, stop):
+                page = document[index]
+                textpage = page.get_textpage()
+                try:
+                    # PDFium ends lines with \r\n; match the other engines
+                    yield index + 1, textpage.get_text_range().replace("\r\n", "\n")
+                finally:
+                    textpage.close()
+                    page.close()
+        finally:
+            document.close()
+
+_BACKENDS = {
+    backend.name: backend
+    for backend in (PyPDF2Backend, PypdfBackend, PdfminerBackend, PdfiumBackend)
+}
+
+def register_backend(name, factory):
+    """
+    Make an extraction backend selectable by name.
+
+    factory() must return an object with available(), page_count(stream)
+    and pages(stream, start=0, stop=None). Worker processes look backends
+    up by name, so register them when your module is imported.
+    """
+    _BACKENDS[name] = factory
+
+def available_backends():
+    """Names of the backends usable in this environment."""
+    return [name for name, factory in _BACKENDS.items() if factory.available()]
+
+def get_backend(name=None):
+    """
+    Return the named (or $EXTRACT_BACKEND, or default) backend.
+
+    Raises:
+        ValueError: Unknown backend, or its library isn't installed
+    """
+    name = name or os.getenv("EXTRACT_BACKEND", DEFAULT_EXTRACT_BACKEND)
+    try:
+        factory = _BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown extraction backend '{name}' (available: {', '.join(_BACKENDS)})") from None
+    if not factory.available():
+        raise ValueError(f"Extraction backend '{name}' is not installed "
+                         f"(available here: {', '.join(available_backends())})")
+    return factory()
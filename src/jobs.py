@@ -0,0 +1,394 @@
+"""
+Background job queue for handbook analyses.
+
+Uploads are queued in SQLite and processed by a pool of worker processes,
+so the Streamlit script thread only submits a job and polls its status.
+Jobs survive browser refreshes (the UI finds them again by id) and worker
+restarts (jobs whose worker stopped sending heartbeats are re-queued).
+
+Run workers alongside the app, or let app.py start them:
+    python src/jobs.py --workers 4
+"""
+
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from contextlib import closing
+from pathlib import Path
+from tracing import traced, current_span
+
+DEFAULT_QUEUE_PATH = "output/jobs.db"
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Columns returned by JobQueue.get(); the PDF and report blobs are fetched separately
+JOB_FIELDS = (
+    'id', 'status', 'handbook_name', 'checklist', 'progress', 'message', 'items',
+    'analysis', 'result', 'error', 'created', 'started', 'finished'
+)
+
+# A running job's worker refreshes its heartbeat this often; a job whose
+# heartbeat is older than HEARTBEAT_TIMEOUT is treated as orphaned
+HEARTBEAT_INTERVAL = 15
+HEARTBEAT_TIMEOUT = 120
+
+# Idle workers re-queue orphaned jobs and purge old ones at most this often
+MAINTENANCE_INTERVAL = 60
+
+class JobQueue:
+    """
+    SQLite-backed queue of analysis jobs.
+
+    Every method opens its own connection, so one JobQueue can be shared
+    by Streamlit sessions (threads) and worker processes alike.
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        with closing(self._connect()) as conn, conn:
+            # WAL lets status polls read while a worker is writing
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    handbook_name TEXT NOT NULL,
+                    checklist TEXT NOT NULL,
+                    pdf BLOB,
+                    progress INTEGER NOT NULL DEFAULT 0,
+                    message TEXT NOT NULL DEFAULT '',
+                    items TEXT NOT NULL DEFAULT '[]',
+                    analysis TEXT,
+                    result TEXT,
+                    report BLOB,
+                    error TEXT,
+                    worker INTEGER,
+                    heartbeat REAL,
+                    created REAL NOT NULL,
+                    started REAL,
+                    finished REAL
+                )
+            """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if 'heartbeat' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def submit(self, pdf_bytes, handbook_name, checklist):
+        """
+        Queue a handbook for analysis.
+
+        Args:
+            pdf_bytes: The uploaded PDF
+            handbook_name: Name shown on the report
+            checklist: Checklist key from the registry, e.g. "ca-core@2026.1"
+
+        Returns:
+            str: Job id to poll with get()
+        """
+        job_id = uuid.uuid4().hex
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, handbook_name, checklist, pdf, message, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, handbook_name, checklist, pdf_bytes, "Waiting for a worker...", time.time())
+            )
+        return job_id
+
+    def get(self, job_id):
+        """Return the job as a dict (without the PDF or report), or None."""
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                f"SELECT {', '.join(JOB_FIELDS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        job = dict(zip(JOB_FIELDS, row))
+        job['items'] = json.loads(job['items'])
+        if job['status'] == QUEUED:
+            job['position'] = self._position(job)
+        return job
+
+    def _position(self, job):
+        """1-based place in line among queued jobs."""
+        with closing(self._connect()) as conn, conn:
+            ahead = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND created < ?", (QUEUED, job['created'])
+            ).fetchone()[0]
+        return ahead + 1
+
+    def get_report(self, job_id):
+        """Return the finished report's PDF bytes, or None."""
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT report FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def claim(self, worker_id):
+        """
+        Atomically take the oldest queued job for a worker.
+
+        Returns:
+            dict: 'id', 'handbook_name', 'checklist' and 'pdf', or None if
+                  the queue is empty
+        """
+        conn = self._connect()
+        try:
+            # IMMEDIATE takes the write lock up front so two workers can't
+            # both select the same job
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, handbook_name, checklist, pdf FROM jobs WHERE status = ? ORDER BY created LIMIT 1",
+                (QUEUED,)
+            ).fetchone()
+            if row:
+                now = time.time()
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker = ?, started = ?, heartbeat = ?, message = ? WHERE id = ?",
+                    (RUNNING, worker_id, now, now, "Starting...", row[0])
+                )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+        if row is None:
+            return None
+        return dict(zip(('id', 'handbook_name', 'checklist', 'pdf'), row))
+
+    def update(self, job_id, progress, message, items=None):
+        """Record progress (0-100), a status line and, optionally, the items so far."""
+        with closing(self._connect()) as conn, conn:
+            if items is None:
+                conn.execute(
+                    "UPDATE jobs SET progress = ?, message = ?, heartbeat = ? WHERE id = ?",
+                    (progress, message, time.time(), job_id)
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET progress = ?, message = ?, items = ?, heartbeat = ? WHERE id = ?",
+                    (progress, message, json.dumps(items), time.time(), job_id)
+                )
+
+    def heartbeat(self, job_id):
+        """Mark a running job's worker as alive."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("UPDATE jobs SET heartbeat = ? WHERE id = ? AND status = ?", (time.time(), job_id, RUNNING))
+
+    def complete(self, job_id, analysis, result_json, report_bytes):
+        """Store the finished analysis and report; the uploaded PDF is dropped."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, progress = 100, message = ?, analysis = ?, result = ?, "
+                "report = ?, pdf = NULL, finished = ? WHERE id = ?",
+                (DONE, "Analysis complete!", analysis, result_json, report_bytes, time.time(), job_id)
+            )
+
+    def fail(self, job_id, error):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, progress = 0, message = ?, error = ?, pdf = NULL, finished = ? "
+                "WHERE id = ?",
+                (FAILED, "Analysis failed", error, time.time(), job_id)
+            )
+
+    def requeue_orphaned(self, timeout=HEARTBEAT_TIMEOUT):
+        """
+        Put running jobs whose worker stopped sending heartbeats back in the
+        queue; returns how many.
+
+        Heartbeats rather than pids, which can't be probed portably and get
+        reused once the worker is gone.
+        """
+        with closing(self._connect()) as conn, conn:
+            return conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, progress = 0, message = ? "
+                "WHERE status = ? AND pdf IS NOT NULL AND COALESCE(heartbeat, started, 0) < ?",
+                (QUEUED, "Re-queued after a worker stopped", RUNNING, time.time() - timeout)
+            ).rowcount
+
+    def purge(self, max_age_hours=24):
+        """Delete finished jobs (and their reports) older than max_age_hours."""
+        with closing(self._connect()) as conn, conn:
+            return conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished < ?",
+                (DONE, FAILED, time.time() - max_age_hours * 60 * 60)
+            ).rowcount
+
+    def counts(self):
+        """Return {status: number of jobs}."""
+        with closing(self._connect()) as conn, conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+@traced('job')
+def run_job(queue, job):
+    """
+    Run the full pipeline for one claimed job, recording progress as it goes.
+
+    Mirrors the steps of the interactive app: extract and normalize, check the estimate
+    against the budget, analyze (streaming items into the job as they
+    complete), parse once, render the report.
+    """
+    # Imported here so `python src/jobs.py --help` and the app's import of
+    # this module don't pay for the PDF and API libraries
+    from pdf_extractor import extract_text_from_pdf
+    from normalize import normalize_text
+    from analyzer import HandbookAnalyzer
+    from budget import BudgetExceededError, format_estimate
+    from checklist import load_checklist
+    from models import ComplianceResult
+    from report_generator import ReportGenerator
+
+    job_id = job['id']
+    current_span().set(job_id=job_id, checklist=job['checklist'])
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        raise RuntimeError("ANTHROPIC_API_KEY not set")
+
+    queue.update(job_id, 10, "📖 Extracting text from PDF...")
+    # Client uploads are never written to the text store or OCR cache
+    handbook_text, page_map = extract_text_from_pdf(job['pdf'], store=False, ocr_cache=False)
+    if not handbook_text:
+        raise ValueError("Could not extract text from PDF. Please make sure it's a valid PDF file.")
+    handbook_text, page_map, _ = normalize_text(page_map)
+
+    checklist = load_checklist(job['checklist'])
+    total_items = len(checklist.items) or 20
+    items_done = []
+
+    def on_item(item):
+        items_done.append({key: item[key] for key in ('number', 'title', 'status', 'risk')})
+        queue.update(
+            job_id, 25 + min(50, 50 * len(items_done) // total_items),
+            f"🤖 Analyzing with AI... {len(items_done)}/{total_items} items reviewed",
+            items_done
+        )
+
+    analyzer = HandbookAnalyzer(api_key, checklist=checklist)
+    plan = analyzer.plan(handbook_text, page_map)
+    if not plan['allowed']:
+        raise BudgetExceededError(f"Over budget: {plan['reason']}")
+
+    queue.update(job_id, 25, f"🤖 Analyzing with AI ({format_estimate(plan)})...")
+    if plan['mode'] == 'retrieval':
+        analysis = analyzer.analyze_handbook_retrieval(page_map)
+    else:
+        analysis = analyzer.analyze_handbook(handbook_text, on_item=on_item)
+    if not analysis:
+        raise RuntimeError("Analysis failed. Please try again.")
+
+    queue.update(job_id, 80, "📊 Generating professional PDF report...")
+    result = ComplianceResult.from_markdown(analysis)
+    report = ReportGenerator().generate_report_bytes(
+        analysis_text=analysis,
+        handbook_name=job['handbook_name'],
+        result=result
+    )
+    queue.complete(job_id, analysis, result.to_json(), report)
+
+def _send_heartbeats(queue, job_id, done, interval=HEARTBEAT_INTERVAL):
+    """Refresh a job's heartbeat every `interval` seconds until `done` is set."""
+    while not done.wait(interval):
+        try:
+            queue.heartbeat(job_id)
+        except sqlite3.Error:
+            pass  # a busy database only delays this beat
+
+def _maintain(queue, worker_id=None):
+    """Re-queue orphaned jobs and purge expired ones, reporting what changed."""
+    try:
+        requeued = queue.requeue_orphaned()
+        purged = queue.purge()
+    except sqlite3.Error as e:
+        print(f"⚠️  Queue maintenance skipped: {e}")
+        return
+    if requeued or purged:
+        prefix = f"[{worker_id}] " if worker_id else ""
+        print(f"🧹 {prefix}Re-queued {requeued} stale job(s), purged {purged} old job(s)")
+
+def worker_loop(queue_path=DEFAULT_QUEUE_PATH, poll_interval=1.0):
+    """
+    Worker process body: claim and run jobs until terminated.
+
+    While idle, also re-queues jobs orphaned by a crashed worker and purges
+    expired ones, so a long-running server doesn't depend on a restart.
+    """
+    queue = JobQueue(queue_path)
+    worker_id = os.getpid()
+    last_maintenance = 0.0
+    while True:
+        job = queue.claim(worker_id)
+        if job is None:
+            if time.monotonic() - last_maintenance >= MAINTENANCE_INTERVAL:
+                last_maintenance = time.monotonic()
+                _maintain(queue, worker_id)
+            time.sleep(poll_interval)
+            continue
+
+        print(f"⚙️  [{worker_id}] Job {job['id'][:8]}: {job['handbook_name']}")
+        # Long API calls report no progress, so a thread keeps the job's
+        # heartbeat fresh while it runs
+        done = threading.Event()
+        beat = threading.Thread(target=_send_heartbeats, args=(queue, job['id'], done), daemon=True)
+        beat.start()
+        try:
+            run_job(queue, job)
+            print(f"✅ [{worker_id}] Job {job['id'][:8]} done")
+        except Exception as e:
+            traceback.print_exc()
+            queue.fail(job['id'], str(e))
+        finally:
+            done.set()
+            beat.join()
+
+def start_workers(workers=None, queue_path=DEFAULT_QUEUE_PATH):
+    """
+    Start worker processes in the background.
+
+    Jobs are mostly waiting on the API, so a handful of workers serves many
+    concurrent users; extra jobs simply wait in the queue. Workers are
+    daemon processes started with "spawn", so they don't inherit the
+    caller's threads (e.g. Streamlit's) and exit with it.
+
+    Returns:
+        list: The started multiprocessing.Process objects
+    """
+    workers = workers or int(os.getenv("JOB_WORKERS", "4"))
+
+    _maintain(JobQueue(queue_path))
+
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for _ in range(workers):
+        process = context.Process(target=worker_loop, args=(queue_path,), daemon=True)
+        process.start()
+        processes.append(process)
+    return processes
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run background analysis workers.")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("JOB_WORKERS", "4")))
+    parser.add_argument("--queue", default=DEFAULT_QUEUE_PATH, help="Job database path")
+    args = parser.parse_args()
+
+    processes = start_workers(args.workers, args.queue)
+    print(f"👷 {len(processes)} workers polling {args.queue} (Ctrl+C to stop)")
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping workers")
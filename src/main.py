@@ -1,17 +1,81 @@
+import argparse
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from pdf_extractor import extract_text_from_pdf
-from analyzer import HandbookAnalyzer
+from normalize import normalize_text, format_savings
+from analyzer import HandbookAnalyzer, format_usage
 from report_generator import ReportGenerator
-def main(pdf_path):
+from models import ComplianceResult
+from checklist import load_checklist, available_checklists, DEFAULT_CHECKLIST
+from analysis_parser import parse_pages
+from revisions import RevisionStore, analyze_revision
+from budget import Budget, BudgetExceededError, format_estimate
+from tracing import traced, current_span
+
+def get_api_key():
+    """Return the Anthropic API key, printing setup help if it's missing."""
+    
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        print("❌ ANTHROPIC_API_KEY environment variable not set!")
+        print("\nSet it with:")
+        print("  Mac/Linux: export ANTHROPIC_API_KEY='your-key'")
+        print("  Windows: set ANTHROPIC_API_KEY=your-key")
+    return api_key
+
+def analyze(analyzer, handbook_text, page_map, retrieval=False):
+    """
+    Run the analysis step and return a ComplianceResult (or None on failure).
+    
+    Full-text runs use structured tool output; retrieval mode produces a
+    merged markdown analysis which is parsed once here. The run is
+    estimated and checked against the budget first; an over-budget run
+    falls back to retrieval mode if that fits. The analyzer reserves the
+    estimate against the daily budget while the run is in flight.
+    
+    Raises:
+        BudgetExceededError: Even the cheapest mode is over budget, or
+                             concurrent runs used up the daily budget
+    """
+    
+    plan = analyzer.plan(handbook_text, page_map, retrieval, structured=True)
+    print(f"💰 Estimate: {format_estimate(plan)}")
+    if not plan['allowed']:
+        raise BudgetExceededError(plan['reason'])
+    if plan['reason']:
+        print(f"✂️  {plan['reason']}")
+    
+    if plan['mode'] != 'retrieval':
+        return analyzer.analyze_handbook_structured(handbook_text)
+    
+    analysis = analyzer.analyze_handbook_retrieval(page_map)
+    return ComplianceResult.from_markdown(analysis) if analysis else None
+
+@traced('pipeline')
+def main(pdf_path, retrieval=False, incremental=False, handbook_id=None, checklist=None, budget=None,
+         normalize=True, drop_toc=False):
     """
     Complete pipeline: Analyze a handbook and generate compliance report.
     
     Args:
         pdf_path: Path to the handbook PDF
+        retrieval: Send only the most relevant pages for each checklist item
+        incremental: Diff against the stored previous revision and re-analyze
+                     only the checklist items whose pages changed
+        handbook_id: Id shared by all revisions (defaults to the file name)
+        checklist: Checklist from the registry (defaults to the default checklist)
+        budget: Budget to enforce (defaults to the environment's limits)
+        normalize: Strip headers, footers, page numbers and extra whitespace
+                   before analyzing
+        drop_toc: Also leave out table-of-contents and index pages
     """
     
+    current_span().set(handbook=Path(pdf_path).stem)
+    
     print("="*60)
     print("📋 AXIOM LEGAL WORKFLOW - Handbook Compliance Checker")
     print("="*60)
@@ -19,34 +83,41 @@ def main(pdf_path):
     
     # Step 1: Extract text from PDF
     print("Step 1/3: Extracting text from PDF...")
-    handbook_text = extract_text_from_pdf(pdf_path)
+    handbook_text, page_map = extract_text_from_pdf(pdf_path)
     
     if not handbook_text:
         print("❌ Failed to extract text from PDF")
         return
     
-    print(f"✅ Extracted {len(handbook_text)} characters")
+    print(f"✅ Extracted {len(handbook_text)} characters from {len(page_map)} pages")
+    if normalize:
+        handbook_text, page_map, savings = normalize_text(page_map, drop_toc)
+        print(f"🧹 Normalized: {format_savings(savings)}")
     print()
     
     # Step 2: Analyze with Claude
     print("Step 2/3: Analyzing compliance with Claude AI...")
     
-    api_key = os.getenv("ANTHROPIC_API_KEY")
+    api_key = get_api_key()
     if not api_key:
-        print("❌ ANTHROPIC_API_KEY environment variable not set!")
-        print("\nSet it with:")
-        print("  Mac/Linux: export ANTHROPIC_API_KEY='your-key'")
-        print("  Windows: set ANTHROPIC_API_KEY=your-key")
         return
     
-    analyzer = HandbookAnalyzer(api_key)
-    analysis = analyzer.analyze_handbook(handbook_text)
+    analyzer = HandbookAnalyzer(api_key, checklist=checklist, budget=budget)
+    try:
+        if incremental:
+            handbook_id = handbook_id or Path(pdf_path).stem
+            result = analyze_revision(analyzer, RevisionStore(), handbook_id, page_map)
+        else:
+            result = analyze(analyzer, handbook_text, page_map, retrieval)
+    except BudgetExceededError as e:
+        print(f"💸 Refusing to analyze: {e}")
+        return
     
-    if not analysis:
+    if not result:
         print("❌ Failed to analyze handbook")
         return
     
-    print("✅ Analysis complete")
+    print(f"✅ Analysis complete (${analyzer.cost:.2f})")
     print()
     
     # Step 3: Generate PDF report
@@ -57,9 +128,9 @@ def main(pdf_path):
     
     generator = ReportGenerator()
     generator.generate_report(
-        analysis_text=analysis,
         handbook_name=handbook_name,
-        output_path=output_path
+        output_path=output_path,
+        result=result
     )
     
     print()
@@ -68,17 +139,230 @@ def main(pdf_path):
     print(f"📄 Report saved to: {output_path}")
     print("="*60)
 
+@traced('pipeline')
+def process_handbook(pdf_path, analyzer, api_slots, output_dir="output", retrieval=False, normalize=True,
+                     drop_toc=False):
+    """
+    Run extract -> analyze -> report for one handbook in batch mode.
+    
+    Args:
+        pdf_path: Path to the handbook PDF
+        analyzer: Shared HandbookAnalyzer
+        api_slots: Semaphore bounding concurrent API calls
+        output_dir: Directory for the generated report
+        retrieval: Use retrieval mode instead of sending the full text
+        normalize: Strip extraction boilerplate before analyzing
+        drop_toc: Also leave out table-of-contents and index pages
+        
+    Returns:
+        dict: Per-file status and stage timings
+    """
+    
+    handbook_name = Path(pdf_path).stem
+    current_span().set(handbook=handbook_name)
+    result = {
+        'name': handbook_name,
+        'status': 'failed',
+        'pages': 0,
+        'extract_s': 0.0,
+        'wait_s': 0.0,
+        'analyze_s': 0.0,
+        'report_s': 0.0,
+        'output_path': None,
+        'error': None
+    }
+    
+    try:
+        start = time.perf_counter()
+        handbook_text, page_map = extract_text_from_pdf(str(pdf_path))
+        result['extract_s'] = time.perf_counter() - start
+        
+        if not handbook_text:
+            result['error'] = "text extraction failed"
+            return result
+        result['pages'] = len(page_map)
+        print(f"📖 [{handbook_name}] Extracted {len(page_map)} pages")
+        if normalize:
+            handbook_text, page_map, savings = normalize_text(page_map, drop_toc)
+            print(f"🧹 [{handbook_name}] Normalized: {format_savings(savings)}")
+        
+        # Only `concurrency` handbooks talk to the API at once; the rest wait
+        # here with their text already extracted
+        start = time.perf_counter()
+        with api_slots:
+            result['wait_s'] = time.perf_counter() - start
+            start = time.perf_counter()
+            analysis = analyze(analyzer, handbook_text, page_map, retrieval)
+            result['analyze_s'] = time.perf_counter() - start
+        
+        if not analysis:
+            result['error'] = "analysis failed"
+            return result
+        print(f"🤖 [{handbook_name}] Analysis complete")
+        
+        start = time.perf_counter()
+        output_path = str(Path(output_dir) / f"{handbook_name}_compliance_report.pdf")
+        ReportGenerator().generate_report(
+            handbook_name=handbook_name,
+            output_path=output_path,
+            result=analysis
+        )
+        result['report_s'] = time.perf_counter() - start
+        result['output_path'] = output_path
+        result['status'] = 'ok'
+        
+    except Exception as e:
+        result['error'] = str(e)
+    
+    return result
+
+def print_summary(results, elapsed):
+    """Print the per-file summary table for a batch run."""
+    
+    print()
+    print("="*86)
+    print(f"{'Handbook':<24}{'Status':<8}{'Pages':>6}{'Extract':>10}{'Queued':>10}{'Analyze':>10}{'Report':>10}  Output")
+    print("-"*86)
+    for r in results:
+        status = "✅ ok" if r['status'] == 'ok' else "❌ fail"
+        detail = r['output_path'] if r['status'] == 'ok' else r['error']
+        print(f"{r['name'][:23]:<24}{status:<8}{r['pages']:>6}"
+              f"{r['extract_s']:>9.1f}s{r['wait_s']:>9.1f}s{r['analyze_s']:>9.1f}s{r['report_s']:>9.1f}s  {detail}")
+    print("-"*86)
+    
+    succeeded = sum(1 for r in results if r['status'] == 'ok')
+    analyze_times = [r['analyze_s'] for r in results]
+    print(f"{succeeded}/{len(results)} handbooks succeeded in {elapsed:.1f}s "
+          f"(slowest analysis {max(analyze_times):.1f}s, all analyses {sum(analyze_times):.1f}s)")
+    print("="*86)
+
+def run_batch(directory, concurrency=4, output_dir="output", retrieval=False, checklist=None, budget=None,
+              normalize=True, drop_toc=False):
+    """
+    Analyze every PDF in a directory as a concurrent pipeline.
+    
+    Args:
+        directory: Folder containing handbook PDFs
+        concurrency: Maximum number of simultaneous Claude API calls
+        output_dir: Directory for the generated reports
+        retrieval: Use retrieval mode instead of sending the full text
+        checklist: Checklist from the registry (defaults to the default checklist)
+        budget: Budget to enforce for each handbook and the day
+        normalize: Strip extraction boilerplate before analyzing
+        drop_toc: Also leave out table-of-contents and index pages
+        
+    Returns:
+        list: Per-file result dicts, in filename order
+    """
+    
+    pdf_paths = sorted(Path(directory).glob("*.pdf"))
+    if not pdf_paths:
+        print(f"❌ No PDF files found in {directory}")
+        return []
+    
+    api_key = get_api_key()
+    if not api_key:
+        return []
+    
+    print("="*60)
+    print("📋 AXIOM LEGAL WORKFLOW - Batch Compliance Check")
+    print(f"📂 {len(pdf_paths)} handbooks, up to {concurrency} concurrent analyses")
+    print("="*60)
+    print()
+    
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    analyzer = HandbookAnalyzer(api_key, checklist=checklist, budget=budget)
+    api_slots = threading.BoundedSemaphore(concurrency)
+    
+    # A couple of threads beyond the API limit keep extraction and report
+    # rendering for other files running while analyses are in flight
+    workers = min(len(pdf_paths), concurrency + 2)
+    
+    start = time.perf_counter()
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(process_handbook, pdf_path, analyzer, api_slots, output_dir, retrieval,
+                            normalize, drop_toc): pdf_path
+            for pdf_path in pdf_paths
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            if result['status'] == 'ok':
+                print(f"✅ [{result['name']}] Report saved to {result['output_path']}")
+            else:
+                print(f"❌ [{result['name']}] {result['error']}")
+    
+    ordered = [results[pdf_path] for pdf_path in pdf_paths]
+    print_summary(ordered, time.perf_counter() - start)
+    print(f"💾 {format_usage(analyzer.usage)}")
+    return ordered
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python src/main.py <path-to-handbook.pdf>")
-        print("\nExample:")
-        print("  python src/main.py data/handbook1.pdf")
+    parser = argparse.ArgumentParser(
+        description="Analyze employee handbooks for CA compliance.",
+        epilog="Examples:\n"
+               "  python src/main.py data/handbook1.pdf\n"
+               "  python src/main.py --batch data/ --concurrency 4\n"
+               "  python src/main.py data/acme_v3.pdf --incremental --handbook-id acme\n"
+               "  python src/main.py --batch archive/ --checklist ca-core --items 18-20",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("pdf_path", nargs="?", help="Path to a single handbook PDF")
+    parser.add_argument("--batch", metavar="DIR", help="Analyze every PDF in DIR")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Maximum simultaneous API calls in batch mode (default: 4)")
+    parser.add_argument("--retrieval", action="store_true",
+                        help="Send only the most relevant pages for each checklist item")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Re-analyze only the items affected by pages changed since the last revision")
+    parser.add_argument("--handbook-id", help="Id linking revisions of one handbook (default: file name)")
+    parser.add_argument("--checklist", default=DEFAULT_CHECKLIST,
+                        help="Checklist id or id@version (available: "
+                             + ", ".join(c.key for c in available_checklists()) + ")")
+    parser.add_argument("--items", help="Only check these checklist items, e.g. 18-20 or 3,5,7")
+    parser.add_argument("--job-budget", type=float, metavar="USD",
+                        help="Refuse (or trim to retrieval mode) analyses estimated above this cost "
+                             "(default: $ANALYSIS_JOB_BUDGET_USD)")
+    parser.add_argument("--daily-budget", type=float, metavar="USD",
+                        help="Stop analyzing once today's spend reaches this amount "
+                             "(default: $ANALYSIS_DAILY_BUDGET_USD)")
+    parser.add_argument("--raw-text", action="store_true",
+                        help="Analyze the extracted text as it is, without stripping headers, footers and page numbers")
+    parser.add_argument("--drop-toc", action="store_true",
+                        help="Leave table-of-contents and index pages out of the analysis")
+    args = parser.parse_args()
+    
+    budget = Budget.from_env()
+    if args.job_budget is not None or args.daily_budget is not None:
+        budget = Budget(
+            per_job=budget.per_job if args.job_budget is None else args.job_budget,
+            per_day=budget.per_day if args.daily_budget is None else args.daily_budget
+        )
+    
+    try:
+        # "18-20, 3" uses the same range syntax as page citations
+        checklist = load_checklist(args.checklist, parse_pages(args.items) if args.items else None)
+    except ValueError as e:
+        print(f"❌ {e}")
         sys.exit(1)
     
-    pdf_path = sys.argv[1]
+    if args.batch:
+        if not Path(args.batch).is_dir():
+            print(f"❌ Directory not found: {args.batch}")
+            sys.exit(1)
+        results = run_batch(args.batch, concurrency=max(1, args.concurrency), retrieval=args.retrieval,
+                            checklist=checklist, budget=budget, normalize=not args.raw_text, drop_toc=args.drop_toc)
+        sys.exit(0 if results and all(r['status'] == 'ok' for r in results) else 1)
+    
+    if not args.pdf_path:
+        parser.print_help()
+        sys.exit(1)
     
-    if not Path(pdf_path).exists():
-        print(f"❌ File not found: {pdf_path}")
+    if not Path(args.pdf_path).exists():
+        print(f"❌ File not found: {args.pdf_path}")
         sys.exit(1)
     
-    main(pdf_path)
\ No newline at end of file
+    main(args.pdf_path, retrieval=args.retrieval, incremental=args.incremental, handbook_id=args.handbook_id,
+         checklist=checklist, budget=budget, normalize=not args.raw_text, drop_toc=args.drop_toc)
\ No newline at end of file
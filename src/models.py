@@ -0,0 +1,293 @@
+"""
+Typed compliance results shared by the analyzer, report generator and UI.
+
+Items and results are slotted dataclasses (Python 3.10+) with enum fields
+and integer page lists, so a result costs a few hundred bytes per item
+rather than a dict of strings. to_json()/to_msgpack() write a compact positional form that
+round-trips exactly through from_json()/from_msgpack().
+"""
+
+import json
+from dataclasses import dataclass, field
+from enum import Enum
+from tracing import span
+from analysis_parser import (
+    parse_items_with_errors, parse_pages, format_pages, classify_item, risk_rank,
+    parse_grade, parse_critical_issues, format_analysis, compliance_grade, RISK_RANK
+)
+
+try:
+    import msgpack
+except ImportError:  # optional: only needed for to_msgpack()/from_msgpack()
+    msgpack = None
+
+# Bump when the serialized layout changes so stale cache entries are skipped
+SCHEMA_VERSION = 1
+
+class ResultValidationError(ValueError):
+    """Raised when structured model output doesn't match the schema."""
+
+class _Label(str, Enum):
+    """String-valued enum that formats as its label ("Present", not "Status.PRESENT")."""
+
+    def __str__(self):
+        return self.value
+
+    @classmethod
+    def parse(cls, value):
+        """Look up a member by its label, raising ResultValidationError if unknown."""
+        try:
+            return cls(value)
+        except ValueError:
+            allowed = tuple(member.value for member in cls)
+            raise ResultValidationError(f"{value!r} is not one of {allowed}") from None
+
+class Status(_Label):
+    PRESENT = "Present"
+    PARTIAL = "Partially Present"
+    MISSING = "Missing"
+
+    @classmethod
+    def from_text(cls, text):
+        """Normalize a free-text markdown status ("Present (see p. 4)", "Not present")."""
+        text_lower = text.lower()
+        if 'missing' in text_lower or 'not present' in text_lower:
+            return cls.MISSING
+        if 'partial' in text_lower:
+            return cls.PARTIAL
+        if 'present' in text_lower:
+            return cls.PRESENT
+        return cls.MISSING
+
+class Risk(_Label):
+    LOW = "Low"
+    MEDIUM = "Medium"
+    HIGH = "High"
+
+    @classmethod
+    def from_text(cls, text):
+        """Normalize a free-text markdown risk level; unknown text counts as Low."""
+        return _RISK_BY_RANK[risk_rank(text)]
+
+class Compliance(_Label):
+    COMPLIANT = "Compliant"
+    PARTIAL = "Partially Compliant"
+    NONCOMPLIANT = "Non-Compliant"
+
+_RISK_BY_RANK = {RISK_RANK[member.value.lower()]: member for member in Risk}
+
+# Kept for callers that want the plain labels (e.g. the tool schema)
+STATUSES = tuple(member.value for member in Status)
+RISK_LEVELS = tuple(member.value for member in Risk)
+COMPLIANCE_LEVELS = tuple(member.value for member in Compliance)
+
+# classify_item() labels -> Compliance
+_CLASSIFICATION_LABELS = {
+    'compliant': Compliance.COMPLIANT,
+    'partial': Compliance.PARTIAL,
+    'noncompliant': Compliance.NONCOMPLIANT,
+}
+
+@dataclass(slots=True)
+class ComplianceItem:
+    number: int
+    title: str
+    code: str
+    status: Status
+    compliance: Compliance
+    pages: list
+    assessment: str
+    risk: Risk
+    recommendation: str
+    citation: str
+
+    @property
+    def pages_text(self):
+        """Pages formatted for display, e.g. "Pages 14-15, 17"."""
+        return format_pages(self.pages)
+
+    @classmethod
+    def from_parsed(cls, item):
+        """Build from a parse_items() dict."""
+        return cls(
+            number=int(item['number']),
+            title=item['title'],
+            code=item['code'],
+            status=Status.from_text(item['status']),
+            compliance=_CLASSIFICATION_LABELS[classify_item(item)],
+            pages=parse_pages(item['pages']),
+            assessment=item['assessment'],
+            risk=Risk.from_text(item['risk']),
+            recommendation=item['recommendation'],
+            citation=item['citation']
+        )
+
+    @classmethod
+    def from_tool_input(cls, data):
+        """Build from one item of the record_compliance_analysis tool input."""
+        try:
+            number = int(data['number'])
+            return cls(
+                number=number,
+                title=str(data['title']).strip(),
+                code=str(data.get('code', "")).strip(),
+                status=Status.parse(data['status']),
+                compliance=Compliance.parse(data['compliance']),
+                pages=sorted({int(page) for page in data.get('pages', [])}),
+                assessment=str(data['assessment']).strip(),
+                risk=Risk.parse(data['risk_level']),
+                recommendation=str(data['recommendation']).strip(),
+                citation=str(data.get('legal_citation', "")).strip()
+            )
+        except ResultValidationError as e:
+            raise ResultValidationError(f"Item {data.get('number')}: {e}") from None
+        except (KeyError, TypeError, ValueError) as e:
+            raise ResultValidationError(f"Invalid item {data!r}: {e}") from e
+
+    def to_parsed(self):
+        """Inverse of from_parsed(): the string dict shape format_analysis() renders."""
+        return {
+            'number': str(self.number),
+            'title': self.title,
+            'code': self.code,
+            'status': self.status.value,
+            'pages': self.pages_text,
+            'assessment': self.assessment,
+            'risk': self.risk.value,
+            'recommendation': self.recommendation,
+            'citation': self.citation
+        }
+
+    def to_row(self):
+        """Positional form used by the serializers (field order, enums as labels)."""
+        return [
+            self.number, self.title, self.code, self.status.value, self.compliance.value,
+            self.pages, self.assessment, self.risk.value, self.recommendation, self.citation
+        ]
+
+    @classmethod
+    def from_row(cls, row):
+        """Inverse of to_row()."""
+        number, title, code, status, compliance, pages, assessment, risk, recommendation, citation = row
+        return cls(
+            number, title, code, Status(status), Compliance(compliance),
+            list(pages), assessment, Risk(risk), recommendation, citation
+        )
+
+@dataclass(slots=True)
+class ComplianceResult:
+    items: list
+    critical_issues: list = field(default_factory=list)
+    grade: str = "N/A"
+    errors: list = field(default_factory=list)
+
+    def _count(self, compliance):
+        return sum(1 for item in self.items if item.compliance is compliance)
+
+    @property
+    def compliant(self):
+        return self._count(Compliance.COMPLIANT)
+
+    @property
+    def partial(self):
+        return self._count(Compliance.PARTIAL)
+
+    @property
+    def noncompliant(self):
+        return self._count(Compliance.NONCOMPLIANT)
+
+    @property
+    def total(self):
+        return len(self.items)
+
+    @property
+    def compliance_rate(self):
+        """Whole-number percentage of fully compliant items."""
+        return int(self.compliant / self.total * 100) if self.total else 0
+
+    @classmethod
+    def from_markdown(cls, analysis_text):
+        """Parse a markdown analysis (the streamed / legacy format)."""
+        with span('parse', format='markdown') as s:
+            parsed, errors = parse_items_with_errors(analysis_text)
+            s.set(items=len(parsed), errors=len(errors))
+            return cls(
+                items=[ComplianceItem.from_parsed(item) for item in parsed],
+                critical_issues=parse_critical_issues(analysis_text),
+                grade=parse_grade(analysis_text),
+                errors=errors
+            )
+
+    @classmethod
+    def from_tool_input(cls, data):
+        """Validate and build from the record_compliance_analysis tool input."""
+        if not isinstance(data, dict) or not isinstance(data.get('items'), list):
+            raise ResultValidationError("Tool input must be an object with an 'items' list")
+
+        with span('parse', format='tool', items=len(data['items'])):
+            items = sorted(
+                (ComplianceItem.from_tool_input(item) for item in data['items']),
+                key=lambda item: item.number
+            )
+        critical_issues = [
+            {'title': str(issue['title']).strip(), 'description': str(issue['description']).strip()}
+            for issue in data.get('critical_issues', [])
+            if isinstance(issue, dict) and issue.get('title')
+        ]
+
+        result = cls(items=items, critical_issues=critical_issues)
+        result.grade = str(data.get('overall_grade') or "").strip() or compliance_grade(result.compliant, result.total)
+        return result
+
+    def to_markdown(self):
+        """Render in the markdown format, e.g. for display or the basic report."""
+        return format_analysis(
+            [item.to_parsed() for item in self.items],
+            grade=self.grade,
+            critical_issues=self.critical_issues
+        )
+
+    def to_dict(self):
+        """
+        Compact, serializer-neutral form.
+
+        Items are positional rows (see ComplianceItem.to_row) rather than
+        dicts, so field names aren't repeated per item; parse errors are
+        not persisted.
+        """
+        return {
+            'v': SCHEMA_VERSION,
+            'grade': self.grade,
+            'items': [item.to_row() for item in self.items],
+            'critical': [[issue['title'], issue['description']] for issue in self.critical_issues]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Inverse of to_dict()."""
+        if data.get('v') != SCHEMA_VERSION:
+            raise ResultValidationError(f"Unsupported result schema version {data.get('v')!r}")
+        return cls(
+            items=[ComplianceItem.from_row(row) for row in data['items']],
+            critical_issues=[{'title': title, 'description': description} for title, description in data['critical']],
+            grade=data['grade']
+        )
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+    def to_msgpack(self):
+        """Serialize to msgpack bytes (requires the optional msgpack package)."""
+        if msgpack is None:
+            raise RuntimeError("msgpack is not installed; use to_json() or `pip install msgpack`")
+        return msgpack.packb(self.to_dict(), use_bin_type=True)
+
+    @classmethod
+    def from_msgpack(cls, payload):
+        if msgpack is None:
+            raise RuntimeError("msgpack is not installed; use from_json() or `pip install msgpack`")
+        return cls.from_dict(msgpack.unpackb(payload, raw=False))
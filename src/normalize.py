@@ -0,0 +1,230 @@
+"""
+Clean extracted handbook text before it is sent to the model.
+
+PDF extraction keeps everything printed on a page: running headers and
+footers, page numbers, lines broken after a hyphen, runs of
+padding spaces, and dot leaders on table-of-contents pages. None of
+it helps the analysis and all of it is paid for in input tokens.
+normalize_text() strips that boilerplate page by page, so every page
+keeps its original number and the [PAGE N] markers (and therefore the
+citations) stay exact.
+"""
+
+import math
+import re
+from pdf_extractor import assemble_text
+from prompts import estimate_tokens
+
+# A header/footer must repeat on this share of pages (and at least
+# MIN_REPEAT_PAGES) to be stripped; odd/even page headers each reach ~50%
+REPEAT_SHARE = 0.4
+MIN_REPEAT_PAGES = 3
+
+# Words at the top and bottom of a page searched for a running header/footer
+EDGE_WORDS = 16
+
+# Extending a header by one more word must keep this share of its pages;
+# a steeper drop means the extra word is body text that merely starts many
+# pages (a bullet, "The")
+HEADER_CONTINUATION = 0.75
+
+# A page is a table of contents / index when at least this share of its
+# (at least TOC_MIN_LINES) lines end in a page reference
+TOC_LINE_SHARE = 0.6
+TOC_MIN_LINES = 5
+
+WORD = re.compile(r'\S+')
+VOCABULARY_WORD = re.compile(r'\w+')
+NUMBER = re.compile(r'\d+|^[ivxlcdm]+$', re.IGNORECASE)
+PAGE_NUMBER_LINE = re.compile(
+    r'^(?:page|pg\.?)?\s*\|?\s*(?:\d+|[ivxlcdm]+)\s*(?:\|\s*page|of\s+\d+)?$', re.IGNORECASE
+)
+DOT_LEADER = re.compile(r'\s*(?:\.\s?){4,}\s*|\s*…{2,}\s*')
+# A hard hyphen at a line break is either a real compound ("part-\ntime",
+# "at-\nwill") or a word the layout split ("employ-\nment"); the hyphen is
+# dropped only when the joined word appears unhyphenated elsewhere in the
+# document. A soft hyphen (U+00AD) always marks a layout split
+HYPHEN_BREAK = re.compile(r'(\w+)-[ \t]*\n[ \t]*([a-z]\w*)')
+SOFT_HYPHEN_BREAK = re.compile(r'(\w)\u00ad[ \t]*\n[ \t]*(\w)')
+SPACES = re.compile(r'[^\S\n]+')
+BLANK_LINES = re.compile(r'\n{3,}')
+TOC_LINE = re.compile(r'(?:\.{3}|\s)\s*(?:\d+|[ivxlc]+)(?:\s*[-–,]\s*\d+)*\s*$', re.IGNORECASE)
+
+def _mask(word):
+    """Comparison form of a word: page numbers (arabic or roman) all look alike."""
+    return NUMBER.sub('#', word.lower())
+
+def _edge_keys(words):
+    """
+    Masked word prefixes up to EDGE_WORDS, each with the number of words it covers.
+
+    Adjacent numbers count as one, so "2025 3 | Page" and "2025 10 0 | Page"
+    (a split page number) share a prefix.
+    """
+    masked, covered = [], []
+    for word in words[:EDGE_WORDS]:
+        word = _mask(word)
+        if word == '#' and masked and masked[-1] == '#':
+            covered[-1] += 1
+        else:
+            masked.append(word)
+            covered.append((covered[-1] if covered else 0) + 1)
+    return [(tuple(masked[:length]), covered[length - 1]) for length in range(1, len(masked) + 1)]
+
+def _repeated_edge(keys, counts, threshold):
+    """How many of a page's edge words belong to a running header/footer (0 if none)."""
+    length = 0
+    for key, _ in keys:
+        if counts.get(key, 0) < threshold:
+            break
+        length += 1
+
+    # Trim words that only some of the header's pages share
+    while length > 1 and counts[keys[length - 1][0]] < HEADER_CONTINUATION * counts[keys[length - 2][0]]:
+        length -= 1
+
+    # A lone repeated word is only boilerplate if it is a page number
+    if length == 0 or (length == 1 and keys[0][0] != ('#',)):
+        return 0
+    return keys[length - 1][1]
+
+def find_running_edges(pages):
+    """
+    Count of leading and trailing words that are running headers/footers on each page.
+
+    Compares the first and last EDGE_WORDS words of every page with page
+    numbers masked, so "pg. 10 Employee Handbook" and "pg. 11 Employee
+    Handbook" match even where the extractor ran the header into the
+    page's first sentence.
+
+    Args:
+        pages: {page_num: [word, ...]}
+
+    Returns:
+        dict: {page_num: (header_words, footer_words)}
+    """
+    threshold = max(MIN_REPEAT_PAGES, math.ceil(REPEAT_SHARE * len(pages)))
+    heads = {page_num: _edge_keys(words) for page_num, words in pages.items()}
+    tails = {page_num: _edge_keys(words[::-1]) for page_num, words in pages.items()}
+
+    # Count each prefix once per page
+    head_counts, tail_counts = {}, {}
+    for counts, edges in ((head_counts, heads), (tail_counts, tails)):
+        for keys in edges.values():
+            for key, _ in keys:
+                counts[key] = counts.get(key, 0) + 1
+
+    edges = {}
+    for page_num, words in pages.items():
+        header = _repeated_edge(heads[page_num], head_counts, threshold)
+        footer = _repeated_edge(tails[page_num], tail_counts, threshold)
+        edges[page_num] = (header, min(footer, len(words) - header))
+    return edges
+
+def _strip_edges(text, header, footer):
+    """Remove the first `header` and last `footer` words of a page, keeping the rest verbatim."""
+    words = list(WORD.finditer(text))
+    start = words[header - 1].end() if header else 0
+    end = words[len(words) - footer].start() if footer else len(text)
+    return text[start:end]
+
+def _strip_page_numbers(lines):
+    """Drop standalone page-number lines at the top and bottom of a page."""
+    while lines and (not lines[0] or PAGE_NUMBER_LINE.match(lines[0])):
+        lines.pop(0)
+    while lines and (not lines[-1] or PAGE_NUMBER_LINE.match(lines[-1])):
+        lines.pop()
+    return lines
+
+def vocabulary(texts):
+    """Lowercased words of the given texts, for telling split words from compounds at hyphen breaks."""
+    return {word.lower() for text in texts for word in VOCABULARY_WORD.findall(text)}
+
+def _join_hyphen_break(match, words):
+    joined = match.group(1) + match.group(2)
+    return joined if joined.lower() in words else f"{match.group(1)}-{match.group(2)}"
+
+def clean_page(text, words=frozenset()):
+    """
+    Rejoin hyphen breaks, shorten dot leaders, collapse whitespace and drop edge page numbers in one page's text.
+
+    A hard hyphen at a line break is dropped only when the joined word is
+    in words (see vocabulary()); otherwise it is kept as a compound.
+    """
+    text = HYPHEN_BREAK.sub(lambda match: _join_hyphen_break(match, words), text)
+    text = SOFT_HYPHEN_BREAK.sub(r'\1\2', text).replace('\u00ad', '')
+    text = DOT_LEADER.sub(' ... ', text)
+    lines = _strip_page_numbers([SPACES.sub(' ', line).strip() for line in text.split('\n')])
+    return BLANK_LINES.sub('\n\n', '\n'.join(lines))
+
+def is_toc_page(text):
+    """True if most of the page's lines end in page references (contents or index)."""
+    lines = [line for line in text.split('\n') if line.strip()]
+    if len(lines) < TOC_MIN_LINES:
+        return False
+    return sum(1 for line in lines if TOC_LINE.search(line)) >= TOC_LINE_SHARE * len(lines)
+
+def normalize_text(page_map, drop_toc=False):
+    """
+    Strip extraction boilerplate from every page and rebuild the marked-up text.
+
+    Args:
+        page_map: {page_num: text} from extract_text_from_pdf()
+        drop_toc: Also leave out table-of-contents and index pages; their
+                  page numbers are skipped, the others keep theirs
+
+    Returns:
+        tuple: (full_text, page_map, stats) where stats has the character
+               and estimated token counts before and after, the pages
+               dropped and how many pages lost a header or footer
+    """
+    raw = {page_num: page_map[page_num] or "" for page_num in sorted(page_map)}
+    edges = find_running_edges({page_num: WORD.findall(text) for page_num, text in raw.items()})
+    words = vocabulary(raw.values())
+
+    cleaned = []
+    dropped = []
+    for page_num, text in raw.items():
+        text = clean_page(_strip_edges(text, *edges[page_num]), words)
+        if drop_toc and is_toc_page(text):
+            dropped.append(page_num)
+            continue
+        cleaned.append((page_num, text))
+
+    full_text, normalized = assemble_text(cleaned)
+    raw_text, _ = assemble_text(raw.items())
+    stats = {
+        'chars_before': len(raw_text),
+        'chars_after': len(full_text),
+        'tokens_before': estimate_tokens(raw_text),
+        'tokens_after': estimate_tokens(full_text),
+        'pages_dropped': dropped,
+        'edges_stripped': sum(1 for header, footer in edges.values() if header or footer),
+    }
+    return full_text, normalized, stats
+
+def format_savings(stats):
+    """One-line summary of a normalize_text() run."""
+    saved = 1 - stats['chars_after'] / stats['chars_before'] if stats['chars_before'] else 0.0
+    summary = (f"{stats['chars_before']:,} → {stats['chars_after']:,} chars "
+               f"(~{stats['tokens_before'] - stats['tokens_after']:,} tokens, {saved:.0%} saved)")
+    if stats['pages_dropped']:
+        summary += f", {len(stats['pages_dropped'])} contents/index pages dropped"
+    return summary
+
+# Test function
+if __name__ == "__main__":
+    import sys
+    from pdf_extractor import extract_text_from_pdf
+
+    pdf_path = sys.argv[1] if len(sys.argv) > 1 else "data/handbook1.pdf"
+    handbook_text, page_map = extract_text_from_pdf(pdf_path)
+    if not handbook_text:
+        print(f"❌ Failed to extract text from {pdf_path}")
+        sys.exit(1)
+
+    full_text, normalized, stats = normalize_text(page_map, drop_toc=True)
+    print(f"🧹 {format_savings(stats)}")
+    print(f"   Headers/footers stripped on {stats['edges_stripped']} of {len(page_map)} pages")
+    first = next(iter(normalized))
+    print(f"\nPage {first} before:\n{page_map[first][:400]!r}\n\nafter:\n{normalized[first][:400]!r}")
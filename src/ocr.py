@@ -0,0 +1,290 @@
+"""
+OCR fallback for scanned handbook pages.
+
+Pages whose text layer is (nearly) empty but that carry an image are
+treated as scans: the page image is run through an OCR backend, in a
+process pool when several pages need it, and the recognized text is cached
+by image hash so re-runs of the same document cost nothing. Digital pages
+never touch the OCR engine.
+
+OCR is opt-in: extract_text_from_pdf() only runs it when asked to or when
+OCR_BACKEND is set. Backends are pluggable. Tesseract (pytesseract +
+Pillow + the tesseract binary) is built in; register others with
+register_backend() and pick one with OCR_BACKEND or the `backend` argument.
+"""
+
+import functools
+import hashlib
+import io
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from pathlib import Path
+import PyPDF2
+from tracing import span
+
+try:
+    import pytesseract
+    from PIL import Image
+except ImportError:  # optional: only needed for the tesseract backend
+    pytesseract = None
+
+DEFAULT_OCR_CACHE_PATH = "output/ocr_cache.db"
+DEFAULT_BACKEND = "tesseract"
+
+# Pages with fewer non-whitespace characters than this are OCR candidates
+MIN_TEXT_CHARS = 40
+
+# Pages buffered while their scans are OCR'd, so extraction stays streaming
+OCR_WINDOW_PAGES = 32
+
+# Backend instance handed to each OCR worker by _init_ocr_worker()
+_worker_backend = None
+
+@functools.lru_cache(maxsize=None)
+def _tesseract_version():
+    """Installed tesseract version, or None (checked once per process)."""
+    if pytesseract is None:
+        return None
+    try:
+        return str(pytesseract.get_tesseract_version())
+    except Exception:
+        return None  # pytesseract installed, tesseract binary missing
+
+class TesseractBackend:
+    """Local Tesseract via pytesseract."""
+
+    name = "tesseract"
+
+    def __init__(self, lang="eng", config=""):
+        self.lang = lang
+        self.config = config
+
+    @property
+    def version(self):
+        """Engine identity used in cache keys, so an upgrade re-OCRs pages."""
+        return f"{self.name}:{_tesseract_version()}:{self.lang}:{self.config}"
+
+    @staticmethod
+    def available():
+        return _tesseract_version() is not None
+
+    def ocr(self, image_bytes):
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            return pytesseract.image_to_string(image, lang=self.lang, config=self.config)
+
+_BACKENDS = {TesseractBackend.name: TesseractBackend}
+
+def register_backend(name, factory):
+    """
+    Make an OCR backend selectable by name.
+
+    factory() must return an object with `name`, `version`, `available()`
+    and `ocr(image_bytes) -> str`. Instances are sent to worker processes,
+    so they must be picklable (define the class at module level).
+    """
+    _BACKENDS[name] = factory
+
+def get_backend(name=None):
+    """Return the named (or $OCR_BACKEND, or default) backend, or None if it isn't usable here."""
+    name = name or os.getenv("OCR_BACKEND", DEFAULT_BACKEND)
+    try:
+        backend = _BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown OCR backend '{name}' (available: {', '.join(sorted(_BACKENDS))})") from None
+    return backend if backend.available() else None
+
+def needs_ocr(text):
+    """True if a page's extracted text is too thin to be a real text layer."""
+    return len("".join((text or "").split())) < MIN_TEXT_CHARS
+
+def page_image(page):
+    """Bytes of the largest image drawn on a PyPDF2 page (a scan), or None."""
+    try:
+        images = [image.data for image in page.images]
+    except Exception:
+        return None  # unsupported image encoding; leave the page as it is
+    images = [data for data in images if data]
+    return max(images, key=len) if images else None
+
+def image_hash(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest()
+
+class OcrCache:
+    """
+    SQLite cache of OCR text keyed by page-image hash and engine version.
+
+    Same pattern as AnalysisCache: a fresh connection per call, so one
+    instance can be shared by threads and the cache by processes.
+    """
+
+    def __init__(self, path=DEFAULT_OCR_CACHE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    key TEXT PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    created REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def make_key(image_digest, backend):
+        return f"{backend.version}:{image_digest}"
+
+    def get_many(self, keys):
+        """Return {key: text} for the keys that are cached."""
+        if not keys:
+            return {}
+        with closing(self._connect()) as conn, conn:
+            placeholders = ",".join("?" * len(keys))
+            return dict(conn.execute(f"SELECT key, text FROM pages WHERE key IN ({placeholders})", list(keys)))
+
+    def put_many(self, entries):
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO pages (key, text, created) VALUES (?, ?, ?)",
+                [(key, text, time.time()) for key, text in entries.items()]
+            )
+
+def _init_ocr_worker(backend):
+    """Pool initializer: keep this worker's OCR backend."""
+    global _worker_backend
+    _worker_backend = backend
+
+def _ocr_worker(image_bytes):
+    return _worker_backend.ocr(image_bytes)
+
+class PageOcr:
+    """
+    OCRs the scanned pages of one document.
+
+    Holds the document's reader (for page images) and, once more than one
+    page needs OCR at a time, a process pool that is reused across windows.
+    """
+
+    def __init__(self, reader, backend, cache=None, workers=None):
+        self.reader = reader
+        self.backend = backend
+        self.cache = cache
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+        self.stats = {'ocr_pages': 0, 'cache_hits': 0}
+
+    def recognize(self, page_nums):
+        """Return {page_num: text} for the given scanned pages (1-indexed)."""
+        images = {}
+        for page_num in page_nums:
+            image = page_image(self.reader.pages[page_num - 1])
+            if image:
+                images[page_num] = image
+        if not images:
+            return {}
+
+        with span('ocr', pages=len(images), backend=self.backend.name) as s:
+            keys = {
+                page_num: OcrCache.make_key(image_hash(image), self.backend)
+                for page_num, image in images.items()
+            }
+            cached = self.cache.get_many(set(keys.values())) if self.cache else {}
+            texts = {page_num: cached[key] for page_num, key in keys.items() if key in cached}
+
+            # Identical scans (e.g. a repeated form page) are OCR'd once
+            missing = {}
+            for page_num in images:
+                if page_num not in texts:
+                    missing.setdefault(keys[page_num], page_num)
+            if missing:
+                recognized = dict(zip(missing, self._map([images[page_num] for page_num in missing.values()])))
+                if self.cache:
+                    self.cache.put_many(recognized)
+                for page_num, key in keys.items():
+                    texts.setdefault(page_num, recognized.get(key))
+
+            self.stats['ocr_pages'] += len(missing)
+            self.stats['cache_hits'] += len(images) - len(missing)
+            s.set(cache_hits=len(images) - len(missing))
+        return texts
+
+    def _map(self, images):
+        if self.workers == 1 or len(images) == 1:
+            return [self.backend.ocr(image) for image in images]
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_ocr_worker, initargs=(self.backend,)
+            )
+        return list(self._executor.map(_ocr_worker, images))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+def with_ocr(pages, pdf_stream, backend, cache=None, workers=None, window=OCR_WINDOW_PAGES):
+    """
+    Fill in scanned pages of a (page_num, text) stream with OCR text.
+
+    Pages are buffered `window` at a time so the scans in each window are
+    OCR'd together; digital pages pass through untouched.
+
+    Args:
+        pages: Iterable of (page_num, text), e.g. from iter_pages()
+        pdf_stream: Binary stream of the same PDF, for reading page images
+        backend: OCR backend from get_backend()
+        cache: Optional OcrCache
+        workers: OCR worker processes (defaults to the CPU count)
+
+    Yields:
+        tuple: (page_num, text) in the original order
+    """
+    ocr = PageOcr(PyPDF2.PdfReader(pdf_stream), backend, cache, workers)
+    try:
+        buffer = []
+        for page in pages:
+            buffer.append(page)
+            if len(buffer) >= window:
+                yield from _fill_window(buffer, ocr)
+                buffer = []
+        yield from _fill_window(buffer, ocr)
+    finally:
+        ocr.close()
+
+    if ocr.stats['ocr_pages'] or ocr.stats['cache_hits']:
+        print(f"🔍 OCR: {ocr.stats['ocr_pages']} scanned pages recognized, "
+              f"{ocr.stats['cache_hits']} served from cache")
+
+def _fill_window(buffer, ocr):
+    recognized = ocr.recognize([page_num for page_num, text in buffer if needs_ocr(text)])
+    for page_num, text in buffer:
+        ocr_text = recognized.get(page_num)
+        # Keep whichever is fuller: a scan may still carry a stray text layer
+        if ocr_text and len(ocr_text.strip()) > len((text or "").strip()):
+            text = ocr_text
+        yield page_num, text
+
+# Test function
+if __name__ == "__main__":
+    import sys
+
+    backend = get_backend()
+    if backend is None:
+        print(f"❌ OCR backend '{os.getenv('OCR_BACKEND', DEFAULT_BACKEND)}' is not available")
+        print("Install the tesseract binary and `pip install pytesseract pillow`")
+        sys.exit(1)
+
+    pdf_path = sys.argv[1] if len(sys.argv) > 1 else "data/handbook1.pdf"
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        scanned = [num for num, page in enumerate(reader.pages, 1) if needs_ocr(page.extract_text())]
+        print(f"📄 {len(scanned)} of {len(reader.pages)} pages look scanned: {scanned[:20]}")
+        ocr = PageOcr(reader, backend, OcrCache())
+        texts = ocr.recognize(scanned)
+        ocr.close()
+        print(f"✅ Recognized {sum(len(text) for text in texts.values())} characters")
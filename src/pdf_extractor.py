@@ -1,39 +1,295 @@
-import PyPDF2
+import io
+import mmap
+import os
+import sqlite3
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
 from pathlib import Path
+from tracing import span
+from extract_backends import get_backend as get_extract_backend
+from ocr import OcrCache, get_backend, needs_ocr, with_ocr
+from text_store import TextStore, pdf_digest
 
-def extract_text_from_pdf(pdf_path):
+# In-memory PDF handed to each extraction worker by _init_extract_worker()
+_worker_pdf = None
+
+def page_marker(page_num):
+    """Return the marker inserted before each page in the full text."""
+    return f"\n\n[PAGE {page_num}]\n\n"
+
+def _is_path(source):
+    return isinstance(source, (str, os.PathLike))
+
+@contextmanager
+def _pdf_stream(source):
+    """
+    Open a PDF source as a binary stream.
+    
+    Paths are opened from disk; bytes are wrapped in a BytesIO, which shares
+    the bytes object's buffer rather than copying it; bytearray/memoryview
+    are copied once; file-like objects (e.g. a Streamlit UploadedFile) are
+    rewound and used as they are.
+    """
+    if _is_path(source):
+        with open(source, 'rb') as file:
+            yield file
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source)
+    else:
+        source.seek(0)
+        yield source
+
+def _pdf_bytes(source):
+    """Whole PDF as bytes, for shipping an in-memory source to worker processes."""
+    if isinstance(source, bytes):
+        return source
+    if isinstance(source, (bytearray, memoryview)):
+        return bytes(source)
+    if hasattr(source, 'getvalue'):
+        return source.getvalue()
+    source.seek(0)
+    return source.read()
+
+def iter_pages(pdf_path, backend=None):
+    """
+    Lazily yield the text of each page in a PDF.
+    
+    Args:
+        pdf_path: Path to PDF file, PDF bytes, or a binary file-like object
+        backend: Extraction backend name (see extract_backends)
+        
+    Yields:
+        tuple: (page_num, text) with 1-indexed page numbers
+    """
+    extractor = get_extract_backend(backend)
+    with _pdf_stream(pdf_path) as file:
+        yield from extractor.pages(file)
+
+def _init_extract_worker(pdf_bytes):
+    """Pool initializer: keep this worker's copy of an in-memory PDF."""
+    global _worker_pdf
+    _worker_pdf = pdf_bytes
+
+def _extract_page_range(pdf_path, start, stop, backend):
+    """
+    Worker: open the PDF independently and extract pages [start, stop).
+    
+    pdf_path is None for in-memory PDFs, which arrive once per worker via
+    _init_extract_worker() instead of once per task.
+    """
+    with _pdf_stream(_worker_pdf if pdf_path is None else pdf_path) as file:
+        return list(get_extract_backend(backend).pages(file, start, stop))
+
+def iter_pages_parallel(pdf_path, workers=None, pages_per_task=None, backend=None):
+    """
+    Yield (page_num, text) in page order, extracting across a process pool.
+    
+    Args:
+        pdf_path: Path to PDF file, PDF bytes, or a binary file-like object
+        workers: Number of worker processes (defaults to the CPU count)
+        pages_per_task: Pages per shard; by default each worker gets ~4 shards
+                        so uneven pages still balance out
+        backend: Extraction backend name (see extract_backends)
+    """
+    workers = workers or os.cpu_count() or 1
+    extractor = get_extract_backend(backend)
+    
+    with _pdf_stream(pdf_path) as file:
+        page_count = extractor.page_count(file)
+    
+    if not pages_per_task:
+        pages_per_task = max(1, -(-page_count // (workers * 4)))
+    
+    ranges = [
+        (start, min(start + pages_per_task, page_count))
+        for start in range(0, page_count, pages_per_task)
+    ]
+    
+    if _is_path(pdf_path):
+        task_source, pool_args = str(pdf_path), {}
+    else:
+        task_source = None
+        pool_args = {'initializer': _init_extract_worker, 'initargs': (_pdf_bytes(pdf_path),)}
+    
+    with ProcessPoolExecutor(max_workers=workers, **pool_args) as executor:
+        # map() returns shards in submission order, so pages stay in order
+        shards = executor.map(
+            _extract_page_range,
+            [task_source] * len(ranges),
+            [start for start, _ in ranges],
+            [stop for _, stop in ranges],
+            [extractor.name] * len(ranges)
+        )
+        for shard in shards:
+            yield from shard
+
+class SpilledPageMap(Mapping):
+    """
+    {page_num: text} mapping backed by a memory-mapped file.
+    
+    Page text is written to disk as it is extracted, so large handbooks
+    don't keep a second copy of every page in RAM. Pages are append-only:
+    assign each page once, then call finalize() before reading.
+    """
+    
+    def __init__(self, spill_path):
+        self.path = Path(spill_path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'w+b')
+        self._offsets = {}
+        self._mmap = None
+    
+    def __setitem__(self, page_num, text):
+        data = text.encode('utf-8')
+        start = self._file.tell()
+        self._file.write(data)
+        self._offsets[page_num] = (start, len(data))
+    
+    def finalize(self):
+        """Flush the spill file and map it for reading."""
+        self._file.flush()
+        if self._file.tell():
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    def __getitem__(self, page_num):
+        start, length = self._offsets[page_num]
+        if not length:
+            return ""
+        return self._mmap[start:start + length].decode('utf-8')
+    
+    def __iter__(self):
+        return iter(self._offsets)
+    
+    def __len__(self):
+        return len(self._offsets)
+    
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+def assemble_text(pages, page_map=None):
+    """
+    Join (page_num, text) pairs into the marked-up full text.
+    
+    Args:
+        pages: Iterable of (page_num, text), e.g. from iter_pages()
+        page_map: Optional mapping to fill; a plain dict is used by default
+        
+    Returns:
+        tuple: (full_text, page_map)
+    """
+    if page_map is None:
+        page_map = {}
+    
+    # Collect parts and join once instead of growing a string page by page
+    parts = []
+    for page_num, page_text in pages:
+        page_map[page_num] = page_text
+        parts.append(page_marker(page_num))
+        parts.append(page_text)
+    
+    return "".join(parts), page_map
+
+def _ocr_stream(source):
+    """A separate stream for reading page images, so it never shares a file position with extraction."""
+    if _is_path(source):
+        return open(source, 'rb')
+    return io.BytesIO(_pdf_bytes(source))
+
+def extract_text_from_pdf(pdf_path, spill_path=None, workers=1, ocr=None, ocr_workers=None, ocr_cache=None,
+                          backend=None, store=None):
     """
     Extract all text from a PDF file with page tracking.
     
     Args:
-        pdf_path: Path to PDF file
+        pdf_path: Path to PDF file, PDF bytes, or a binary file-like object
+                  such as an upload, so uploads never have to touch disk
+        spill_path: Optional file to spill page text to; the returned
+                    page_map is then a memory-mapped SpilledPageMap
+        workers: Worker processes for extraction; 1 extracts serially in
+                 this process, None uses every CPU
+        ocr: OCR pages with no usable text layer (scans): True uses the
+             default backend if one is installed, a string names a backend,
+             False turns OCR off. Off by default unless $OCR_BACKEND names
+             a backend
+        ocr_workers: Worker processes for OCR (defaults to every CPU)
+        ocr_cache: OcrCache for recognized pages (defaults to the shared one);
+                   False doesn't cache them
+        backend: Extraction backend name, e.g. "pdfium" (defaults to
+                 $EXTRACT_BACKEND, else PyPDF2; see extract_backends)
+        store: TextStore of previously extracted documents (defaults to the
+               shared one); False always re-parses the PDF
         
     Returns:
-        tuple: (full_text, page_map) where page_map is dict of {page_num: text}
+        tuple: (full_text, page_map) where page_map is dict of {page_num: text},
+               or a memory-mapped mapping when spilled or served from the store
     """
-    try:
-        with open(pdf_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            full_text = ""
-            page_map = {}
+    page_map = SpilledPageMap(spill_path) if spill_path else None
+    if ocr is None:
+        ocr = os.getenv("OCR_BACKEND") or False
+    
+    with span('extract', workers=workers, backend=backend) as s, ExitStack() as stack:
+        try:
+            # The same PDF extracted the same way always yields the same text
+            ocr_backend = get_backend(ocr if isinstance(ocr, str) else None) if ocr else None
+            if store is not False:
+                store = TextStore() if store is None else store
+                variant = f"{get_extract_backend(backend).name}|{ocr_backend.version if ocr_backend else 'none'}"
+                store_key = TextStore.make_key(pdf_digest(pdf_path), variant)
+                stored = store.get(store_key)
+                if stored is not None:
+                    if isinstance(page_map, SpilledPageMap):
+                        page_map.close()
+                    # Pages stay compressed in the mapped file; only the full text is rebuilt
+                    full_text = "".join(page_marker(page_num) + text for page_num, text in stored.items())
+                    page_map = stored
+                    s.set(pages=len(page_map), chars=len(full_text), store_hit=True)
+                    return full_text, page_map
+            
+            if workers == 1:
+                pages = iter_pages(pdf_path, backend)
+            else:
+                pages = iter_pages_parallel(pdf_path, workers=workers, backend=backend)
+            
+            # Only pages without a usable text layer are sent to OCR
+            if ocr_backend:
+                if ocr_cache is None:
+                    ocr_cache = OcrCache()
+                pages = with_ocr(
+                    pages, stack.enter_context(_ocr_stream(pdf_path)), ocr_backend,
+                    ocr_cache if ocr_cache is not False else None, ocr_workers
+                )
+            
+            full_text, page_map = assemble_text(pages, page_map)
+            if isinstance(page_map, SpilledPageMap):
+                page_map.finalize()
             
-            # Extract text from each page
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                page_text = page.extract_text()
-                
-                # Store in page map (1-indexed for user display)
-                page_map[page_num + 1] = page_text
-                
-                # Add to full text with page marker
-                full_text += f"\n\n[PAGE {page_num + 1}]\n\n"
-                full_text += page_text
+            if ocr and not ocr_backend:
+                scanned = sum(1 for text in page_map.values() if needs_ocr(text))
+                if scanned:
+                    print(f"⚠️ {scanned} pages have little or no text (scanned?); "
+                          f"install Tesseract and pytesseract to OCR them")
             
+            # A failed store write only costs the next run a re-parse
+            if store is not False:
+                try:
+                    store.put(store_key, page_map.items())
+                except (OSError, sqlite3.Error) as e:
+                    s.set(store_error=type(e).__name__)
+                    print(f"⚠️ Could not save extracted text to the store: {e}")
+            
+            s.set(pages=len(page_map), chars=len(full_text), store_hit=False)
             return full_text, page_map
-    
-    except Exception as e:
-        print(f"Error extracting PDF: {e}")
-        return None, None
+        
+        except Exception as e:
+            if isinstance(page_map, SpilledPageMap):
+                page_map.close()
+            s.set(error=type(e).__name__)
+            print(f"Error extracting PDF: {e}")
+            return None, None
 
 # Test function
 if __name__ == "__main__":
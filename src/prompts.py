@@ -1,26 +1,7 @@
-def get_compliance_prompt(handbook_text, checklist_items):
-    """
-    Generate the prompt for Claude to analyze handbook compliance.
-    """
-    
-    prompt = f"""You are a California employment law expert specializing in employee handbook compliance.
-
-Analyze the following employee handbook for compliance with California law.
-
-IMPORTANT: The handbook text includes [PAGE X] markers showing which page each section is on. When you identify a policy, please note which page(s) it appears on.
-
-HANDBOOK TEXT:
-{handbook_text}
-
----
-
-Check for the following required policies and provisions:
+COMPLIANCE_TOOL_NAME = "record_compliance_analysis"
 
-{checklist_items}
-
----
-
-CRITICAL: You MUST format your response EXACTLY as shown below. Use this format for EACH item:
+# Output format for the markdown analysis that analysis_parser reads back
+MARKDOWN_FORMAT = """CRITICAL: You MUST format your response EXACTLY as shown below. Use this format for EACH item:
 
 ### 1. At-Will Employment Disclaimer (Labor Code §2922)
 - **Status**: Present
@@ -64,5 +45,159 @@ At the end, provide a summary section:
 
 DO NOT deviate from this format. The output will be parsed by software that expects this exact structure.
 """
+
+STRUCTURED_FORMAT = """Record your findings by calling the record_compliance_analysis tool exactly once. Do not reply with prose.
+
+- Include one entry in "items" for EVERY checklist item, using the checklist's item numbers.
+- "pages" must list the page numbers (integers from the [PAGE X] markers) where the policy appears; use an empty list if it is not found.
+- "critical_issues" lists only the High risk problems, most serious first.
+"""
+
+def get_instructions(checklist_items, structured=False):
+    """
+    Static part of the prompt: role, checklist and formatting rules.
+    
+    This is identical for every handbook checked against the same checklist,
+    so it is sent as a cacheable system prefix. With structured=True the
+    markdown rules are replaced by instructions to call the results tool.
+    """
+    
+    output_format = STRUCTURED_FORMAT if structured else MARKDOWN_FORMAT
+    
+    return f"""You are a California employment law expert specializing in employee handbook compliance.
+
+You will be given an employee handbook and must analyze it for compliance with California law.
+
+IMPORTANT: The handbook text includes [PAGE X] markers showing which page each section is on. When you identify a policy, please note which page(s) it appears on.
+
+Check for the following required policies and provisions:
+
+{checklist_items}
+
+---
+
+{output_format}"""
+
+def get_handbook_message(handbook_text):
+    """
+    Per-handbook part of the prompt, sent as the user message.
+    """
+    
+    return f"""Analyze the following employee handbook for compliance with California law.
+
+HANDBOOK TEXT:
+{handbook_text}
+"""
+
+def get_excerpt_message(excerpt_text, first_page, last_page):
+    """
+    User message for one chunk of a handbook too large for a single request.
+    """
+    
+    return f"""The following is an EXCERPT (pages {first_page}-{last_page}) of a longer employee handbook. Other pages are being reviewed separately.
+
+Analyze ONLY what appears in this excerpt. Report every checklist item. If an item is not covered anywhere in this excerpt, mark its Status as Missing and its Pages as Not found; do not guess about the rest of the handbook.
+
+HANDBOOK EXCERPT:
+{excerpt_text}
+"""
+
+def get_selected_pages_message(excerpt_text, pages):
+    """
+    User message for retrieval mode, where only the pages most relevant to
+    the checklist items were selected from the handbook.
+    """
     
-    return prompt
\ No newline at end of file
+    page_list = ", ".join(str(page) for page in pages)
+    return f"""The following pages ({page_list}) were selected from a longer employee handbook as the most relevant to the checklist items you were given. Other pages were not included.
+
+Analyze ONLY the checklist items listed in your instructions, keeping their numbers. Cite pages using the [PAGE X] markers. If an item is not covered in these pages, mark its Status as Missing and its Pages as Not found.
+
+HANDBOOK PAGES:
+{excerpt_text}
+"""
+
+def get_system_blocks(checklist_items, structured=False):
+    """
+    Build the system prompt as content blocks with a prompt-cache breakpoint.
+    
+    Everything up to the breakpoint is cached by the API, so repeat analyses
+    only pay full price for the handbook text itself.
+    """
+    
+    return [
+        {
+            "type": "text",
+            "text": get_instructions(checklist_items, structured),
+            "cache_control": {"type": "ephemeral"}
+        }
+    ]
+
+def get_compliance_tool():
+    """
+    Tool definition whose input schema is the structured analysis result.
+    
+    Forcing this tool makes the model return validated JSON (integer pages,
+    fixed status and risk values) instead of markdown to be scraped.
+    """
+    
+    return {
+        "name": COMPLIANCE_TOOL_NAME,
+        "description": "Record the compliance analysis of the employee handbook.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "items": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "number": {"type": "integer", "description": "Checklist item number"},
+                            "title": {"type": "string"},
+                            "code": {"type": "string", "description": "Statute from the checklist, e.g. Labor Code §2922"},
+                            "status": {"type": "string", "enum": ["Present", "Partially Present", "Missing"]},
+                            "compliance": {"type": "string", "enum": ["Compliant", "Partially Compliant", "Non-Compliant"]},
+                            "pages": {"type": "array", "items": {"type": "integer"}},
+                            "assessment": {"type": "string"},
+                            "risk_level": {"type": "string", "enum": ["Low", "Medium", "High"]},
+                            "recommendation": {"type": "string"},
+                            "legal_citation": {"type": "string"}
+                        },
+                        "required": [
+                            "number", "title", "code", "status", "compliance", "pages",
+                            "assessment", "risk_level", "recommendation", "legal_citation"
+                        ]
+                    }
+                },
+                "critical_issues": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "title": {"type": "string"},
+                            "description": {"type": "string"}
+                        },
+                        "required": ["title", "description"]
+                    }
+                },
+                "overall_grade": {"type": "string", "enum": ["A", "B", "C", "D", "F"]}
+            },
+            "required": ["items", "critical_issues", "overall_grade"]
+        }
+    }
+
+def get_compliance_prompt(handbook_text, checklist_items):
+    """
+    Generate the prompt for Claude to analyze handbook compliance.
+    
+    Flat, single-string form of get_system_blocks() + get_handbook_message(),
+    for callers that need the whole prompt as text (e.g. cache keys).
+    """
+    
+    return get_instructions(checklist_items) + "\n---\n\n" + get_handbook_message(handbook_text)
+
+def estimate_tokens(text):
+    """
+    Rough token count for pacing and budgeting (~4 characters per token).
+    """
+    return len(text) // 4 + 1
@@ -4,226 +4,331 @@ from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
 from datetime import datetime
+from io import BytesIO, StringIO
+from pathlib import Path
+from models import ComplianceResult, Risk
+from tracing import span
+import os
 import re
+import tempfile
+import threading
+import time
+
+_styles = None
+_styles_lock = threading.Lock()
+
+def get_styles():
+    """
+    Return the shared report stylesheet, building it on first use.
+    
+    The styles are only read while rendering, so one stylesheet serves every
+    ReportGenerator (and every thread) in the process.
+    """
+    global _styles
+    if _styles is None:
+        with _styles_lock:
+            if _styles is None:
+                _styles = _build_styles()
+    return _styles
+
+def _build_styles():
+    """getSampleStyleSheet() plus the report's custom paragraph styles."""
+    
+    styles = getSampleStyleSheet()
+    
+    # Title style
+    styles.add(ParagraphStyle(
+        name='CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=28,
+        textColor=colors.HexColor('#1a1a1a'),
+        spaceAfter=12,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Bold'
+    ))
+    
+    # Section header
+    styles.add(ParagraphStyle(
+        name='SectionHeader',
+        parent=styles['Heading2'],
+        fontSize=18,
+        textColor=colors.HexColor('#2c5aa0'),
+        spaceBefore=24,
+        spaceAfter=12,
+        fontName='Helvetica-Bold'
+    ))
+    
+    # Item header
+    styles.add(ParagraphStyle(
+        name='ItemHeader',
+        parent=styles['Heading3'],
+        fontSize=12,
+        textColor=colors.HexColor('#1a1a1a'),
+        spaceBefore=16,
+        spaceAfter=8,
+        fontName='Helvetica-Bold'
+    ))
+    
+    # Body text
+    styles.add(ParagraphStyle(
+        name='CustomBody',
+        parent=styles['Normal'],
+        fontSize=10,
+        textColor=colors.HexColor('#333333'),
+        spaceAfter=6,
+        alignment=TA_JUSTIFY,
+        fontName='Helvetica'
+    ))
+    
+    # Executive summary style
+    styles.add(ParagraphStyle(
+        name='ExecutiveSummary',
+        parent=styles['Normal'],
+        fontSize=11,
+        textColor=colors.HexColor('#333333'),
+        spaceAfter=10,
+        alignment=TA_JUSTIFY,
+        fontName='Helvetica',
+        leading=16
+    ))
+    
+    # Table cell text (for wrapping in tables)
+    styles.add(ParagraphStyle(
+        name='TableCell',
+        parent=styles['Normal'],
+        fontSize=10,
+        textColor=colors.HexColor('#333333'),
+        fontName='Helvetica',
+        alignment=TA_LEFT
+    ))
+    
+    # Table cell label (bold)
+    styles.add(ParagraphStyle(
+        name='TableCellBold',
+        parent=styles['Normal'],
+        fontSize=10,
+        textColor=colors.HexColor('#555555'),
+        fontName='Helvetica-Bold',
+        alignment=TA_LEFT
+    ))
+    
+    # Risk level styles for table cells
+    styles.add(ParagraphStyle(
+        name='RiskHigh',
+        parent=styles['Normal'],
+        fontSize=10,
+        textColor=colors.red,
+        fontName='Helvetica-Bold',
+        alignment=TA_LEFT
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='RiskMedium',
+        parent=styles['Normal'],
+        fontSize=10,
+        textColor=colors.orange,
+        fontName='Helvetica-Bold',
+        alignment=TA_LEFT
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='RiskLow',
+        parent=styles['Normal'],
+        fontSize=10,
+        textColor=colors.green,
+        fontName='Helvetica-Bold',
+        alignment=TA_LEFT
+    ))
+    
+    # Risk level styles for critical issues section
+    styles.add(ParagraphStyle(
+        name='HighRisk',
+        parent=styles['Normal'],
+        textColor=colors.red,
+        fontSize=11,
+        fontName='Helvetica-Bold',
+        leftIndent=20
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='MediumRisk',
+        parent=styles['Normal'],
+        textColor=colors.orange,
+        fontSize=11,
+        fontName='Helvetica-Bold',
+        leftIndent=20
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='LowRisk',
+        parent=styles['Normal'],
+        textColor=colors.green,
+        fontSize=11,
+        fontName='Helvetica-Bold',
+        leftIndent=20
+    ))
+    
+    return styles
+
+# Table styles, built once and shared; Table.setStyle() only reads them
+INFO_TABLE_STYLE = TableStyle([
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+    ('TOPPADDING', (0, 0), (-1, -1), 4),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+])
+
+SUMMARY_TABLE_STYLE = TableStyle([
+    ('FONTSIZE', (0, 0), (-1, -1), 12),
+    ('PADDING', (0, 0), (-1, -1), 10),
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#e8f4ea')),
+    ('BACKGROUND', (0, 1), (-1, 1), colors.HexColor('#fff4e6')),
+    ('BACKGROUND', (0, 2), (-1, 2), colors.HexColor('#fce8e8')),
+    ('BACKGROUND', (0, 3), (-1, 3), colors.HexColor('#e6f2ff')),
+    ('ALIGN', (1, 0), (1, -1), 'CENTER'),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#cccccc')),
+])
+
+ITEM_TABLE_STYLE = TableStyle([
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ('TOPPADDING', (0, 0), (-1, -1), 6),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('LINEBELOW', (0, 0), (-1, 2), 0.5, colors.HexColor('#e0e0e0')),
+])
+
+# Single label/text rows (assessment, recommendation)
+TEXT_ROW_TABLE_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('TOPPADDING', (0, 0), (-1, -1), 4),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+])
+
+BASIC_INFO_TABLE_STYLE = TableStyle([
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+])
+
+def _write_atomic(path, data):
+    """Write data to path via a unique temp file in the same directory and os.replace()."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def _init_render_worker():
+    """Pool initializer: build this worker's stylesheet before its first report."""
+    get_styles()
+
+def _render_report_file(handbook_name, analysis, output_path):
+    """
+    Worker: render one report to output_path.
+    
+    Returns:
+        tuple: (seconds, error message or None)
+    """
+    start = time.perf_counter()
+    try:
+        # Per-report progress lines from every worker would interleave
+        with redirect_stdout(StringIO()):
+            if isinstance(analysis, ComplianceResult):
+                ReportGenerator().generate_report(handbook_name=handbook_name, output_path=output_path, result=analysis)
+            else:
+                ReportGenerator().generate_report(analysis_text=analysis, handbook_name=handbook_name, output_path=output_path)
+    except Exception as e:
+        return time.perf_counter() - start, str(e)
+    return time.perf_counter() - start, None
 
 class ReportGenerator:
     def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self._add_custom_styles()
+        self.styles = get_styles()
     
-    def _add_custom_styles(self):
-        """Add custom paragraph styles."""
-        
-        # Title style
-        self.styles.add(ParagraphStyle(
-            name='CustomTitle',
-            parent=self.styles['Heading1'],
-            fontSize=28,
-            textColor=colors.HexColor('#1a1a1a'),
-            spaceAfter=12,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold'
-        ))
-        
-        # Section header
-        self.styles.add(ParagraphStyle(
-            name='SectionHeader',
-            parent=self.styles['Heading2'],
-            fontSize=18,
-            textColor=colors.HexColor('#2c5aa0'),
-            spaceBefore=24,
-            spaceAfter=12,
-            fontName='Helvetica-Bold'
-        ))
-        
-        # Item header
-        self.styles.add(ParagraphStyle(
-            name='ItemHeader',
-            parent=self.styles['Heading3'],
-            fontSize=12,
-            textColor=colors.HexColor('#1a1a1a'),
-            spaceBefore=16,
-            spaceAfter=8,
-            fontName='Helvetica-Bold'
-        ))
-        
-        # Body text
-        self.styles.add(ParagraphStyle(
-            name='CustomBody',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            textColor=colors.HexColor('#333333'),
-            spaceAfter=6,
-            alignment=TA_JUSTIFY,
-            fontName='Helvetica'
-        ))
-        
-        # Executive summary style
-        self.styles.add(ParagraphStyle(
-            name='ExecutiveSummary',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            textColor=colors.HexColor('#333333'),
-            spaceAfter=10,
-            alignment=TA_JUSTIFY,
-            fontName='Helvetica',
-            leading=16
-        ))
-        
-        # Table cell text (for wrapping in tables)
-        self.styles.add(ParagraphStyle(
-            name='TableCell',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            textColor=colors.HexColor('#333333'),
-            fontName='Helvetica',
-            alignment=TA_LEFT
-        ))
-        
-        # Table cell label (bold)
-        self.styles.add(ParagraphStyle(
-            name='TableCellBold',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            textColor=colors.HexColor('#555555'),
-            fontName='Helvetica-Bold',
-            alignment=TA_LEFT
-        ))
-        
-        # Risk level styles for table cells
-        self.styles.add(ParagraphStyle(
-            name='RiskHigh',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            textColor=colors.red,
-            fontName='Helvetica-Bold',
-            alignment=TA_LEFT
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='RiskMedium',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            textColor=colors.orange,
-            fontName='Helvetica-Bold',
-            alignment=TA_LEFT
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='RiskLow',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            textColor=colors.green,
-            fontName='Helvetica-Bold',
-            alignment=TA_LEFT
-        ))
-        
-        # Risk level styles for critical issues section
-        self.styles.add(ParagraphStyle(
-            name='HighRisk',
-            parent=self.styles['Normal'],
-            textColor=colors.red,
-            fontSize=11,
-            fontName='Helvetica-Bold',
-            leftIndent=20
-        ))
+    @staticmethod
+    def render_many(results, out_dir, workers=None):
+        """
+        Render many reports in parallel across a process pool.
+        
+        Platypus layout is pure Python and CPU-bound, so threads don't help;
+        each worker process builds its stylesheet once and then renders
+        reports back to back.
+        
+        Args:
+            results: {handbook_name: ComplianceResult or markdown analysis},
+                     or an iterable of (handbook_name, analysis) pairs
+            out_dir: Directory for "<handbook_name>_compliance_report.pdf" files
+            workers: Worker processes (defaults to the CPU count); 1 renders
+                     in this process
+            
+        Returns:
+            list: One dict per report, in input order, with 'handbook',
+                  'path', 'seconds' and 'error' (None on success)
+        """
+        
+        jobs = list(results.items() if isinstance(results, dict) else results)
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+        
+        rendered = [
+            {'handbook': name, 'path': str(out_dir / f"{name}_compliance_report.pdf"), 'seconds': None, 'error': None}
+            for name, _ in jobs
+        ]
+        print(f"🖨️  Rendering {len(jobs)} reports with {workers} worker(s)...")
         
-        self.styles.add(ParagraphStyle(
-            name='MediumRisk',
-            parent=self.styles['Normal'],
-            textColor=colors.orange,
-            fontSize=11,
-            fontName='Helvetica-Bold',
-            leftIndent=20
-        ))
+        def record(index, outcome):
+            report = rendered[index]
+            report['seconds'], report['error'] = outcome
+            if report['error']:
+                print(f"❌ {report['handbook']}: {report['error']}")
+            else:
+                print(f"✅ {report['handbook']}: {report['seconds']:.2f}s → {report['path']}")
         
-        self.styles.add(ParagraphStyle(
-            name='LowRisk',
-            parent=self.styles['Normal'],
-            textColor=colors.green,
-            fontSize=11,
-            fontName='Helvetica-Bold',
-            leftIndent=20
-        ))
+        start = time.perf_counter()
+        if workers == 1:
+            _init_render_worker()
+            for index, (name, analysis) in enumerate(jobs):
+                record(index, _render_report_file(name, analysis, rendered[index]['path']))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker) as executor:
+                futures = {
+                    executor.submit(_render_report_file, name, analysis, rendered[index]['path']): index
+                    for index, (name, analysis) in enumerate(jobs)
+                }
+                for future in as_completed(futures):
+                    record(futures[future], future.result())
+        
+        elapsed = time.perf_counter() - start
+        failed = sum(1 for report in rendered if report['error'])
+        print(f"📊 {len(jobs) - failed}/{len(jobs)} reports in {elapsed:.1f}s "
+              f"({len(jobs) / elapsed if elapsed else 0:.1f} reports/s)")
+        return rendered
     
     def _parse_analysis(self, analysis_text):
-        """Parse the Claude analysis into structured data."""
-        
-        # Pattern to match the exact format Claude is outputting
-        item_pattern = r'###\s*(\d+)\.\s*(.+?)\s*\((.+?)\)\s*-\s*\*\*Status\*\*:\s*(.+?)\s*-\s*\*\*Pages\*\*:\s*(.+?)\s*-\s*\*\*Assessment\*\*:\s*(.+?)\s*-\s*\*\*Risk Level\*\*:\s*(.+?)\s*-\s*\*\*Recommendation\*\*:\s*(.+?)\s*-\s*\*\*Legal Citation\*\*:\s*(.+?)(?=\n###|\n---|\n##|\Z)'
-        
-        items = []
-        for match in re.finditer(item_pattern, analysis_text, re.DOTALL):
-            items.append({
-                'number': match.group(1).strip(),
-                'title': match.group(2).strip(),
-                'code': match.group(3).strip(),
-                'status': match.group(4).strip(),
-                'pages': match.group(5).strip(),
-                'assessment': match.group(6).strip(),
-                'risk': match.group(7).strip(),
-                'recommendation': match.group(8).strip(),
-                'citation': match.group(9).strip()
-            })
-        
-        # Calculate accurate counts from parsed items
-        compliant_count = 0
-        partial_count = 0
-        noncompliant_count = 0
-        
-        for item in items:
-            status_lower = item['status'].lower()
-            assessment_lower = item['assessment'].lower()
-            
-            # Check status and assessment for compliance
-            if 'present' in status_lower and 'compliant' in assessment_lower and 'non-compliant' not in assessment_lower and 'partially' not in assessment_lower:
-                compliant_count += 1
-            elif 'missing' in status_lower or 'non-compliant' in assessment_lower:
-                noncompliant_count += 1
-            else:
-                partial_count += 1
-        
-        # Try to extract grade from analysis
-        grade_match = re.search(r'(?:Overall Compliance Grade|Grade)[:\s]*\*?\*?\s*([A-F])', analysis_text, re.IGNORECASE)
-        if not grade_match:
-            grade_match = re.search(r'OVERALL COMPLIANCE GRADE:\s*([A-F])', analysis_text, re.IGNORECASE)
-        
-        summary = {
-            'compliant': str(compliant_count),
-            'partial': str(partial_count),
-            'noncompliant': str(noncompliant_count),
-            'total': str(len(items)),
-            'grade': grade_match.group(1) if grade_match else 'N/A'
-        }
-        
-        # Extract critical issues
-        critical_section = re.search(r'##\s*SUMMARY OF CRITICAL ISSUES.*?\n(.*?)(?=\n##|\Z)', analysis_text, re.DOTALL | re.IGNORECASE)
-        critical_issues = []
-        if critical_section:
-            for match in re.finditer(r'\d+\.\s*\*\*(.+?)\*\*\s*[-:]?\s*(.+?)(?=\n\d+\.|\n##|\Z)', critical_section.group(1), re.DOTALL):
-                critical_issues.append({
-                    'title': match.group(1).strip(),
-                    'description': match.group(2).strip()
-                })
-        
-        return {
-            'items': items,
-            'summary': summary,
-            'critical_issues': critical_issues
-        }
+        """Parse the Claude analysis into a ComplianceResult."""
+        
+        result = ComplianceResult.from_markdown(analysis_text)
+        for error in result.errors:
+            print(f"⚠️ Item {error['number']}: {error['message']}")
+        return result
     
-    def _generate_executive_summary(self, parsed):
-        """Generate executive summary text based on parsed data."""
+    def _generate_executive_summary(self, result):
+        """Generate executive summary text based on the analysis result."""
         
-        total = int(parsed['summary']['total'])
-        compliant = int(parsed['summary']['compliant'])
-        noncompliant = int(parsed['summary']['noncompliant'])
-        partial = int(parsed['summary']['partial'])
-        grade = parsed['summary']['grade']
+        total = result.total
+        compliant = result.compliant
+        noncompliant = result.noncompliant
+        partial = result.partial
+        grade = result.grade
         
         # Calculate compliance percentage
-        compliance_rate = int((compliant / total * 100)) if total > 0 else 0
+        compliance_rate = result.compliance_rate
         
         # Determine overall assessment
         if compliance_rate >= 90:
@@ -249,8 +354,8 @@ The handbook demonstrates {overall} compliance with an overall grade of {grade}.
             summary_text += f"{noncompliant} items are non-compliant and require immediate attention to avoid legal exposure. "
         
         # Add critical issues mention
-        if parsed['critical_issues']:
-            critical_count = len(parsed['critical_issues'])
+        if result.critical_issues:
+            critical_count = len(result.critical_issues)
             summary_text += f"""
 
 There are {critical_count} critical issues that pose high legal risk and should be addressed as a priority. 
@@ -258,24 +363,64 @@ These issues are detailed in the Critical Issues section below."""
         
         return summary_text
     
-    def generate_report(self, analysis_text, handbook_name, output_path):
-        """Generate a professional PDF report from the analysis."""
+    def generate_report(self, analysis_text=None, handbook_name="Employee Handbook", output_path=None, result=None):
+        """
+        Generate a professional PDF report from the analysis.
+        
+        Args:
+            analysis_text: Markdown analysis from Claude (parsed if result is None)
+            handbook_name: Name shown on the report
+            output_path: Where to write the PDF (a path or a writable binary file)
+            result: Optional ComplianceResult, e.g. from a structured analysis;
+                    used directly without any parsing
+        """
+        
+        if isinstance(output_path, (str, os.PathLike)):
+            # Render in memory, then swap the finished file into place, so
+            # concurrent runs writing the same report never interleave
+            buffer = BytesIO()
+            with span('render', output='file') as s:
+                kind = self._render(buffer, analysis_text, handbook_name, result)
+                _write_atomic(output_path, buffer.getvalue())
+                s.set(kind=kind, bytes=buffer.tell())
+        else:
+            with span('render', output='stream') as s:
+                kind = self._render(output_path, analysis_text, handbook_name, result)
+                s.set(kind=kind)
+        print(f"✅ {kind} PDF report generated: {output_path}")
+    
+    def generate_report_bytes(self, analysis_text=None, handbook_name="Employee Handbook", result=None):
+        """
+        Render the report in memory and return the PDF bytes.
+        
+        Same arguments as generate_report(), minus output_path; nothing is
+        written to disk, so the bytes can go straight to a download or store.
+        """
+        
+        buffer = BytesIO()
+        with span('render', output='bytes') as s:
+            kind = self._render(buffer, analysis_text, handbook_name, result)
+            s.set(kind=kind, bytes=buffer.tell())
+        return buffer.getvalue()
+    
+    def _render(self, target, analysis_text, handbook_name, result):
+        """Build the report into target; returns "Professional" or "Basic"."""
         
         # Parse the analysis
-        parsed = self._parse_analysis(analysis_text)
+        parsed = result if result is not None else self._parse_analysis(analysis_text)
         
-        if not parsed or not parsed['items']:
-            print(f"⚠️ Could not parse analysis structure. Items found: {len(parsed['items']) if parsed else 0}")
+        if not parsed.items:
+            print(f"⚠️ Could not parse analysis structure. Items found: {parsed.total}")
             print("Generating basic report...")
-            self._generate_basic_report(analysis_text, handbook_name, output_path)
-            return
+            self._generate_basic_report(analysis_text or parsed.to_markdown(), handbook_name, target)
+            return "Basic"
         
-        print(f"✅ Parsed {len(parsed['items'])} compliance items")
-        print(f"   Compliant: {parsed['summary']['compliant']}, Partial: {parsed['summary']['partial']}, Non-compliant: {parsed['summary']['noncompliant']}")
+        print(f"✅ Parsed {parsed.total} compliance items")
+        print(f"   Compliant: {parsed.compliant}, Partial: {parsed.partial}, Non-compliant: {parsed.noncompliant}")
         
         # Create PDF
         doc = SimpleDocTemplate(
-            output_path,
+            target,
             pagesize=letter,
             rightMargin=0.75*inch,
             leftMargin=0.75*inch,
@@ -308,16 +453,11 @@ These issues are detailed in the Critical Issues section below."""
             [Paragraph('Generated By:', self.styles['TableCellBold']), 
              Paragraph('Axiom Legal Workflow', self.styles['TableCell'])],
             [Paragraph('Compliance Grade:', self.styles['TableCellBold']), 
-             Paragraph(parsed['summary']['grade'], self.styles['TableCell'])],
+             Paragraph(parsed.grade, self.styles['TableCell'])],
         ]
         
         t = Table(info_data, colWidths=[2.2*inch, 4*inch])
-        t.setStyle(TableStyle([
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-            ('TOPPADDING', (0, 0), (-1, -1), 4),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ]))
+        t.setStyle(INFO_TABLE_STYLE)
         
         story.append(t)
         story.append(Spacer(1, 0.4*inch))
@@ -332,9 +472,9 @@ These issues are detailed in the Critical Issues section below."""
         story.append(Paragraph("Compliance Score", self.styles['SectionHeader']))
         
         # Big compliance score display
-        total = int(parsed['summary']['total'])
-        compliant = int(parsed['summary']['compliant'])
-        compliance_rate = int((compliant / total * 100)) if total > 0 else 0
+        total = parsed.total
+        compliant = parsed.compliant
+        compliance_rate = parsed.compliance_rate
         
         score_text = f"<b>{compliant} out of {total} items compliant ({compliance_rate}%)</b>"
         story.append(Paragraph(score_text, self.styles['ExecutiveSummary']))
@@ -343,41 +483,32 @@ These issues are detailed in the Critical Issues section below."""
         # Detailed breakdown table
         summary_data = [
             [Paragraph('Compliant Items', self.styles['TableCell']), 
-             Paragraph(parsed['summary']['compliant'], self.styles['TableCellBold'])],
+             Paragraph(str(parsed.compliant), self.styles['TableCellBold'])],
             [Paragraph('Partially Compliant Items', self.styles['TableCell']), 
-             Paragraph(parsed['summary']['partial'], self.styles['TableCellBold'])],
+             Paragraph(str(parsed.partial), self.styles['TableCellBold'])],
             [Paragraph('Non-Compliant Items', self.styles['TableCell']), 
-             Paragraph(parsed['summary']['noncompliant'], self.styles['TableCellBold'])],
+             Paragraph(str(parsed.noncompliant), self.styles['TableCellBold'])],
             [Paragraph('Total Items Reviewed', self.styles['TableCell']), 
-             Paragraph(parsed['summary']['total'], self.styles['TableCellBold'])]
+             Paragraph(str(parsed.total), self.styles['TableCellBold'])]
         ]
         
         st = Table(summary_data, colWidths=[4*inch, 1.5*inch])
-        st.setStyle(TableStyle([
-            ('FONTSIZE', (0, 0), (-1, -1), 12),
-            ('PADDING', (0, 0), (-1, -1), 10),
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#e8f4ea')),
-            ('BACKGROUND', (0, 1), (-1, 1), colors.HexColor('#fff4e6')),
-            ('BACKGROUND', (0, 2), (-1, 2), colors.HexColor('#fce8e8')),
-            ('BACKGROUND', (0, 3), (-1, 3), colors.HexColor('#e6f2ff')),
-            ('ALIGN', (1, 0), (1, -1), 'CENTER'),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#cccccc')),
-        ]))
+        st.setStyle(SUMMARY_TABLE_STYLE)
         
         story.append(st)
         story.append(Spacer(1, 0.3*inch))
         
         # ============ CRITICAL ISSUES ============
-        if parsed['critical_issues']:
+        if parsed.critical_issues:
             story.append(Paragraph("⚠️ Critical Issues Requiring Immediate Attention", self.styles['SectionHeader']))
             
             story.append(Paragraph(
-                f"The following {len(parsed['critical_issues'])} high-risk items require immediate remediation to avoid potential legal liability:",
+                f"The following {len(parsed.critical_issues)} high-risk items require immediate remediation to avoid potential legal liability:",
                 self.styles['CustomBody']
             ))
             story.append(Spacer(1, 0.1*inch))
             
-            for idx, issue in enumerate(parsed['critical_issues'], 1):
+            for idx, issue in enumerate(parsed.critical_issues, 1):
                 story.append(Paragraph(
                     f"<b>{idx}. {issue['title']}</b>",
                     self.styles['HighRisk']
@@ -400,15 +531,15 @@ These issues are detailed in the Critical Issues section below."""
         story.append(Paragraph("Detailed Compliance Analysis", self.styles['SectionHeader']))
         story.append(Spacer(1, 0.2*inch))
         
-        for item in parsed['items']:
+        for item in parsed.items:
             # Item header
-            header_text = f"{item['number']}. {item['title']}"
+            header_text = f"{item.number}. {item.title}"
             story.append(Paragraph(header_text, self.styles['ItemHeader']))
             
             # Determine risk level style for color coding
-            if 'High' in item['risk']:
+            if item.risk is Risk.HIGH:
                 risk_style = self.styles['RiskHigh']
-            elif 'Medium' in item['risk']:
+            elif item.risk is Risk.MEDIUM:
                 risk_style = self.styles['RiskMedium']
             else:
                 risk_style = self.styles['RiskLow']
@@ -416,26 +547,17 @@ These issues are detailed in the Critical Issues section below."""
             # Create a clean info table with color-coded risk level
             item_data = [
                 [Paragraph('Legal Citation:', self.styles['TableCellBold']), 
-                 Paragraph(item['citation'], self.styles['TableCell'])],
+                 Paragraph(item.citation, self.styles['TableCell'])],
                 [Paragraph('Status:', self.styles['TableCellBold']), 
-                 Paragraph(item['status'], self.styles['TableCell'])],
+                 Paragraph(item.status.value, self.styles['TableCell'])],
                 [Paragraph('Found on Pages:', self.styles['TableCellBold']), 
-                 Paragraph(item['pages'], self.styles['TableCell'])],
+                 Paragraph(item.pages_text, self.styles['TableCell'])],
                 [Paragraph('Risk Level:', self.styles['TableCellBold']), 
-                 Paragraph(item['risk'], risk_style)],  # Use colored style here
+                 Paragraph(item.risk.value, risk_style)],  # Use colored style here
             ]
             
             item_table = Table(item_data, colWidths=[1.5*inch, 4.8*inch])
-            
-            # Base table style
-            base_style = TableStyle([
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                ('TOPPADDING', (0, 0), (-1, -1), 6),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('LINEBELOW', (0, 0), (-1, 2), 0.5, colors.HexColor('#e0e0e0')),
-            ])
-            
-            item_table.setStyle(base_style)
+            item_table.setStyle(ITEM_TABLE_STYLE)
             
             story.append(item_table)
             story.append(Spacer(1, 10))
@@ -443,15 +565,11 @@ These issues are detailed in the Critical Issues section below."""
             # Assessment section
             assessment_data = [
                 [Paragraph('Assessment:', self.styles['TableCellBold']), 
-                 Paragraph(item['assessment'], self.styles['TableCell'])],
+                 Paragraph(item.assessment, self.styles['TableCell'])],
             ]
             
             assessment_table = Table(assessment_data, colWidths=[1.5*inch, 4.8*inch])
-            assessment_table.setStyle(TableStyle([
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('TOPPADDING', (0, 0), (-1, -1), 4),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-            ]))
+            assessment_table.setStyle(TEXT_ROW_TABLE_STYLE)
             
             story.append(assessment_table)
             story.append(Spacer(1, 6))
@@ -459,15 +577,11 @@ These issues are detailed in the Critical Issues section below."""
             # Recommendation section
             recommendation_data = [
                 [Paragraph('Recommendation:', self.styles['TableCellBold']), 
-                 Paragraph(item['recommendation'], self.styles['TableCell'])],
+                 Paragraph(item.recommendation, self.styles['TableCell'])],
             ]
             
             recommendation_table = Table(recommendation_data, colWidths=[1.5*inch, 4.8*inch])
-            recommendation_table.setStyle(TableStyle([
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('TOPPADDING', (0, 0), (-1, -1), 4),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-            ]))
+            recommendation_table.setStyle(TEXT_ROW_TABLE_STYLE)
             
             story.append(recommendation_table)
             story.append(Spacer(1, 18))
@@ -482,14 +596,13 @@ These issues are detailed in the Critical Issues section below."""
         
         # Build PDF
         doc.build(story)
-        
-        print(f"✅ Professional PDF report generated: {output_path}")
+        return "Professional"
     
-    def _generate_basic_report(self, analysis_text, handbook_name, output_path):
+    def _generate_basic_report(self, analysis_text, handbook_name, target):
         """Fallback: Generate a basic report if parsing fails."""
         
         doc = SimpleDocTemplate(
-            output_path,
+            target,
             pagesize=letter,
             rightMargin=72,
             leftMargin=72,
@@ -515,9 +628,7 @@ These issues are detailed in the Critical Issues section below."""
         ]
         
         t = Table(metadata, colWidths=[2*inch, 4*inch])
-        t.setStyle(TableStyle([
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-        ]))
+        t.setStyle(BASIC_INFO_TABLE_STYLE)
         
         story.append(t)
         story.append(PageBreak())
@@ -532,7 +643,6 @@ These issues are detailed in the Critical Issues section below."""
                 story.append(Spacer(1, 0.1*inch))
         
         doc.build(story)
-        print(f"✅ Basic PDF report generated: {output_path}")
 
 # Test function
 if __name__ == "__main__":
@@ -0,0 +1,140 @@
+import math
+import re
+from collections import Counter
+from checklist import get_checklist_items
+
+TOKEN = re.compile(r"[a-z0-9§]+")
+
+STOPWORDS = {
+    'a', 'an', 'and', 'any', 'are', 'as', 'at', 'be', 'by', 'can', 'for', 'from',
+    'in', 'is', 'it', 'its', 'may', 'must', 'no', 'not', 'of', 'on', 'or', 'our',
+    'per', 'such', 'that', 'the', 'their', 'this', 'to', 'will', 'with', 'you',
+    'your', 'all', 'each', 'other', 'only', 'which', 'who', 'we', 'us',
+    'code', 'labor', 'gov', 'policy', 'requirement', 'requirements', 'employee',
+    'employees', 'employer', 'employment', 'company'
+}
+
+# Handbook wording that the checklist bullets don't use verbatim
+EXPANSIONS = {
+    'at-will': ['will', 'terminate', 'termination', 'cause', 'notice'],
+    'equal': ['discrimination', 'protected', 'race', 'religion', 'disability'],
+    'harassment': ['harass', 'sexual', 'offensive', 'hostile'],
+    'complaint': ['report', 'investigation', 'retaliation', 'hotline'],
+    'meal': ['lunch', 'meal', 'period', 'waive', 'premium'],
+    'rest': ['rest', 'break', 'minute', 'premium'],
+    'overtime': ['overtime', 'double', 'workweek', 'workday', 'seventh'],
+    'sick': ['sick', 'accrue', 'accrual', 'psl', 'illness'],
+    'cfra': ['cfra', 'family', 'medical', 'leave', 'bonding', 'fmla'],
+    'pregnancy': ['pregnancy', 'pdl', 'childbirth', 'pregnant'],
+    'wage statement': ['paycheck', 'paystub', 'stub', 'payroll', 'itemized'],
+    'personnel': ['personnel', 'file', 'records', 'inspect', 'copy'],
+    'expense': ['reimburse', 'reimbursement', 'mileage', 'expense'],
+    'paga': ['paga', 'private', 'attorneys', 'general', 'representative'],
+    'lactation': ['lactation', 'breastfeeding', 'nursing', 'milk', 'pump'],
+    'whistleblower': ['whistleblower', 'whistleblowing', 'disclose', 'violation', 'agency'],
+    'retaliation': ['retaliate', 'retaliation', 'reprisal'],
+    'ai': ['artificial', 'intelligence', 'automated', 'algorithm', 'ai'],
+    'emergency contact': ['emergency', 'contact', 'notify', 'designate'],
+    "workers' rights": ['rights', 'notice', 'immigration', 'union', 'know'],
+}
+
+def _stem(token):
+    """Very light suffix stripping so 'breaks'/'break' and 'accrued'/'accrue' meet."""
+    for suffix in ('ing', 'ed', 'es', 's'):
+        if len(token) > len(suffix) + 3 and token.endswith(suffix):
+            return token[:-len(suffix)]
+    return token
+
+def tokenize(text):
+    """Lowercase, split on non-word characters, drop stopwords and stem."""
+    return [_stem(token) for token in TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+def item_query(item):
+    """
+    Build the search terms for one checklist item.
+
+    Terms come from the title and bullet points, plus handbook wording from
+    EXPANSIONS for any expansion key found in the title.
+    """
+    text = " ".join([item['title']] + item['bullets'])
+    terms = tokenize(text)
+
+    title_lower = item['title'].lower()
+    for key, words in EXPANSIONS.items():
+        if re.search(rf"\b{re.escape(key)}\b", title_lower):
+            terms.extend(_stem(word) for word in words)
+    return terms
+
+class PageIndex:
+    """
+    BM25 index over handbook pages.
+
+    Built once per handbook from the page_map returned by
+    extract_text_from_pdf(); scoring a query is a pass over its terms'
+    postings, not over the whole document.
+    """
+
+    def __init__(self, page_map, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.lengths = {}
+
+        for page_num, text in page_map.items():
+            counts = Counter(tokenize(text))
+            self.lengths[page_num] = sum(counts.values())
+            for term, count in counts.items():
+                self.postings.setdefault(term, {})[page_num] = count
+
+        self.page_count = len(self.lengths)
+        self.avg_length = (sum(self.lengths.values()) / self.page_count) if self.page_count else 0
+
+    def score(self, terms):
+        """Return {page_num: BM25 score} for the given query terms."""
+        scores = {}
+        for term, query_count in Counter(terms).items():
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+
+            df = len(postings)
+            idf = math.log(1 + (self.page_count - df + 0.5) / (df + 0.5))
+            for page_num, tf in postings.items():
+                norm = 1 - self.b + self.b * self.lengths[page_num] / (self.avg_length or 1)
+                weight = idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+                scores[page_num] = scores.get(page_num, 0.0) + weight * query_count
+        return scores
+
+    def top_pages(self, terms, k=5):
+        """Return the k highest-scoring page numbers, best first."""
+        scores = self.score(terms)
+        return sorted(scores, key=lambda page_num: (-scores[page_num], page_num))[:k]
+
+def select_pages(index, items, k=5):
+    """
+    Pick the pages to send for a group of checklist items.
+
+    Returns:
+        list: Sorted union of each item's top-k pages
+    """
+    pages = set()
+    for item in items:
+        pages.update(index.top_pages(item_query(item), k))
+    return sorted(pages)
+
+# Test function
+if __name__ == "__main__":
+    import sys
+    from pdf_extractor import extract_text_from_pdf
+
+    pdf_path = sys.argv[1] if len(sys.argv) > 1 else "data/handbook1.pdf"
+    text, page_map = extract_text_from_pdf(pdf_path)
+    if not text:
+        sys.exit(1)
+
+    index = PageIndex(page_map)
+    print(f"📚 Indexed {index.page_count} pages, {len(index.postings)} terms\n")
+
+    for item in get_checklist_items():
+        pages = index.top_pages(item_query(item), k=3)
+        print(f"{item['number']:>3}. {item['title'][:45]:<46} → pages {pages}")
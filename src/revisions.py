@@ -0,0 +1,257 @@
+"""
+Incremental re-analysis of revised handbooks.
+
+Each analyzed handbook's page fingerprints and result are stored. When a
+new revision arrives, its pages are diffed against the stored version by
+content, and only the checklist items whose evidence could have changed
+are sent back to Claude; every other finding is reused with its page
+citations renumbered.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import replace
+from pathlib import Path
+from analysis_parser import compliance_grade
+from analyzer import RETRIEVAL_TOP_K, estimate_analysis
+from budget import BudgetExceededError, format_estimate
+from checklist import load_checklist
+from models import ComplianceResult, Risk, ResultValidationError
+from pdf_extractor import assemble_text
+from retrieval import PageIndex, item_query
+
+DEFAULT_STORE_PATH = "output/revisions.db"
+
+WHITESPACE = re.compile(r'\s+')
+
+def fingerprint_page(text):
+    """Content hash of one page, ignoring whitespace-only reflow."""
+    normalized = WHITESPACE.sub(" ", text).strip()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+def page_fingerprints(page_map):
+    """Return {page_num: fingerprint} for a page_map."""
+    return {page_num: fingerprint_page(text) for page_num, text in page_map.items()}
+
+def diff_pages(old, new):
+    """
+    Diff two {page_num: fingerprint} maps by content.
+
+    Pages are matched on fingerprint rather than number, so inserting a
+    page early in the handbook doesn't mark every later page as changed.
+
+    Returns:
+        dict: 'moved' maps old page numbers to the new number of the same
+              content, 'changed' lists new pages with no old match, and
+              'removed' lists old pages with no new match
+    """
+    old_by_fingerprint = {}
+    for page_num in sorted(old):
+        old_by_fingerprint.setdefault(old[page_num], []).append(page_num)
+
+    moved = {}
+    for page_num in sorted(new):
+        candidates = old_by_fingerprint.get(new[page_num])
+        if candidates:
+            moved[candidates.pop(0)] = page_num
+
+    return {
+        'moved': moved,
+        'changed': sorted(set(new) - set(moved.values())),
+        'removed': sorted(set(old) - set(moved)),
+    }
+
+def affected_items(prior, diff, page_map, items, top_k=RETRIEVAL_TOP_K):
+    """
+    Pick the checklist items that need re-analysis after a revision.
+
+    An item is affected when a page it cited was edited or removed, when
+    one of its top-k retrieved pages in the new revision is new or edited
+    (so a previously missing policy may now be present), or when the prior
+    result has no finding for it.
+
+    Returns:
+        list: Affected checklist items (dicts from Checklist.items)
+    """
+    prior_items = {item.number: item for item in prior.items}
+    removed = set(diff['removed'])
+    changed = set(diff['changed'])
+    index = PageIndex(page_map) if changed else None
+
+    affected = []
+    for item in items:
+        finding = prior_items.get(item['number'])
+        if (finding is None
+                or removed.intersection(finding.pages)
+                or (index and changed.intersection(index.top_pages(item_query(item), top_k)))):
+            affected.append(item)
+    return affected
+
+class RevisionStore:
+    """
+    SQLite store of the latest analyzed revision of each handbook.
+
+    Keyed by a caller-chosen handbook id (e.g. the client's handbook name)
+    and the versioned checklist key, so v2, v3, ... of the same handbook
+    diff against each other and results for different checklists don't
+    replace one another.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS checklist_revisions (
+                    handbook_id TEXT NOT NULL,
+                    checklist TEXT NOT NULL,
+                    fingerprints TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    updated REAL NOT NULL,
+                    PRIMARY KEY (handbook_id, checklist)
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, handbook_id, checklist_key):
+        """Return (fingerprints, ComplianceResult) for the stored revision, or None."""
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT fingerprints, result FROM checklist_revisions WHERE handbook_id = ? AND checklist = ?",
+                (handbook_id, checklist_key)
+            ).fetchone()
+        if row is None:
+            return None
+
+        try:
+            fingerprints = {int(page_num): fp for page_num, fp in json.loads(row[0]).items()}
+            return fingerprints, ComplianceResult.from_json(row[1])
+        except (ResultValidationError, ValueError, KeyError):
+            return None  # written by an older result schema
+
+    def put(self, handbook_id, checklist_key, fingerprints, result):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO checklist_revisions (handbook_id, checklist, fingerprints, result, updated) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (handbook_id, checklist_key, json.dumps(fingerprints), result.to_json(), time.time())
+            )
+
+def _full_items(checklist):
+    """Every item of the registered checklist a (possibly subset) checklist came from."""
+    try:
+        return list(load_checklist(checklist.key).items)
+    except ValueError:
+        return list(checklist.items)  # not from the registry
+
+def _summarize(items):
+    """ComplianceResult over items with its grade and critical issues recomputed."""
+    result = ComplianceResult(items=sorted(items, key=lambda item: item.number))
+    result.grade = compliance_grade(result.compliant, result.total)
+    result.critical_issues = [
+        {'title': item.title, 'description': item.recommendation}
+        for item in result.items if item.risk is Risk.HIGH
+    ]
+    return result
+
+def analyze_revision(analyzer, store, handbook_id, page_map, top_k=RETRIEVAL_TOP_K):
+    """
+    Analyze a handbook revision, re-running only the items it affects.
+
+    The first revision of a handbook gets a full structured analysis. Later
+    revisions are diffed against the stored one; affected items are
+    re-analyzed with page retrieval and every other finding is carried over
+    with its pages renumbered. The new revision then becomes the baseline.
+
+    A checklist subset (e.g. --items 18-20) is merged into the stored result
+    for the whole checklist: findings for other items are kept, except those
+    the revision affects, which are dropped so the next run re-analyzes them.
+
+    Args:
+        analyzer: HandbookAnalyzer
+        store: RevisionStore
+        handbook_id: Stable id shared by all revisions of this handbook
+        page_map: {page_num: text} from extract_text_from_pdf()
+        top_k: Pages retrieved per re-analyzed item
+
+    Returns:
+        ComplianceResult for the analyzer's checklist items, or None if the
+        analysis failed
+
+    Raises:
+        BudgetExceededError: The analysis needed is over the analyzer's budget
+    """
+
+    checklist_key = analyzer.checklist.key
+    fingerprints = page_fingerprints(page_map)
+    previous = store.get(handbook_id, checklist_key)
+    items = list(analyzer.checklist.items)
+    wanted = {item['number'] for item in items}
+
+    if previous is None:
+        print(f"🆕 No stored revision of '{handbook_id}' for {checklist_key}; running a full analysis")
+        handbook_text, _ = assemble_text(sorted(page_map.items()))
+        plan = analyzer.plan(handbook_text, page_map, structured=True)
+        print(f"💰 Estimate: {format_estimate(plan)}")
+        if not plan['allowed']:
+            raise BudgetExceededError(plan['reason'])
+        if plan['reason']:
+            print(f"✂️  {plan['reason']}")
+
+        if plan['mode'] != 'retrieval':
+            result = analyzer.analyze_handbook_structured(handbook_text)
+        else:
+            analysis = analyzer.analyze_handbook_retrieval(page_map, top_k=top_k)
+            result = ComplianceResult.from_markdown(analysis) if analysis else None
+        if result:
+            store.put(handbook_id, checklist_key, fingerprints, result)
+        return result
+
+    old_fingerprints, prior = previous
+    diff = diff_pages(old_fingerprints, fingerprints)
+    stale = {item['number'] for item in affected_items(prior, diff, page_map, _full_items(analyzer.checklist), top_k)}
+    affected = [item for item in items if item['number'] in stale]
+
+    print(f"📝 Revision diff: {len(diff['changed'])} new/edited pages, {len(diff['removed'])} removed; "
+          f"re-analyzing {len(affected)} of {len(items)} items")
+
+    fresh = {}
+    if affected:
+        estimate = estimate_analysis(None, analyzer.checklist, 'retrieval', page_map, top_k, items=affected)
+        print(f"💰 Estimate: {format_estimate(estimate)}")
+        analysis = analyzer.analyze_handbook_retrieval(page_map, top_k=top_k, items=affected)
+        if analysis is None:
+            return None
+        fresh = {item.number: item for item in ComplianceResult.from_markdown(analysis).items}
+
+    renumbered = {
+        item.number: replace(item, pages=sorted(diff['moved'][page] for page in item.pages if page in diff['moved']))
+        for item in prior.items
+    }
+    kept = [item for number, item in renumbered.items() if number not in stale]
+
+    if not stale:
+        # Same findings, at most renumbered pages: keep the prior grade and issues
+        stored = replace(prior, items=kept)
+    else:
+        stored = _summarize(kept + list(fresh.values()))
+    store.put(handbook_id, checklist_key, fingerprints, stored)
+
+    # Items the response left out fall back to their previous finding; they
+    # stay out of the stored result, so the next revision retries them
+    omitted = [item['number'] for item in affected if item['number'] not in fresh]
+    if omitted:
+        print(f"⚠️  No finding returned for item(s) {omitted}; keeping their previous findings")
+
+    results = [item for item in stored.items if item.number in wanted]
+    results += [renumbered[number] for number in omitted if number in renumbered]
+    if not omitted and len(results) == len(stored.items):
+        return stored
+    return _summarize(results)
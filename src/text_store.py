@@ -0,0 +1,259 @@
+"""
+Persistent store of extracted page text, keyed by the PDF's SHA-256.
+
+Re-analyzing a handbook (a new checklist, a revision diff, a regenerated
+report) reuses the text extracted the first time instead of re-parsing
+the PDF. Each document is one file of individually zlib-compressed pages
+behind a small index; reads memory-map the file and decompress only the
+pages asked for. An SQLite index tracks sizes, hits and misses, and evicts
+least recently used documents past a size cap.
+
+File layout (little-endian):
+    b"HBTX" | version u16 | page count u32
+    page count x (page_num u32, offset u64, length u32)
+    compressed page blobs
+"""
+
+import hashlib
+import mmap
+import os
+import sqlite3
+import struct
+import tempfile
+import time
+import zlib
+from contextlib import closing
+from collections.abc import Mapping
+from pathlib import Path
+from tracing import span
+
+DEFAULT_STORE_DIR = "output/text_store"
+
+MAGIC = b"HBTX"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHI")
+INDEX_ENTRY = struct.Struct("<IQI")
+COMPRESSION_LEVEL = 6
+
+def pdf_digest(source):
+    """SHA-256 of a PDF given as a path, bytes or a binary file-like object."""
+    digest = hashlib.sha256()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as file:
+            for block in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(block)
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+    else:
+        source.seek(0)
+        for block in iter(lambda: source.read(1024 * 1024), b""):
+            digest.update(block)
+        source.seek(0)
+    return digest.hexdigest()
+
+class StoredPageMap(Mapping):
+    """
+    Read-only {page_num: text} over a memory-mapped store file.
+
+    Pages are decompressed on access. Pickles as a plain dict, so it can
+    be returned from st.cache_data or sent to another process.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._mmap.close()
+            raise ValueError(f"{path}: not a version {FORMAT_VERSION} text store file")
+
+        self._offsets = {}
+        for i in range(count):
+            page_num, offset, length = INDEX_ENTRY.unpack_from(self._mmap, HEADER.size + i * INDEX_ENTRY.size)
+            self._offsets[page_num] = (offset, length)
+
+    def __getitem__(self, page_num):
+        offset, length = self._offsets[page_num]
+        return zlib.decompress(self._mmap[offset:offset + length]).decode('utf-8')
+
+    def __iter__(self):
+        return iter(self._offsets)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __reduce__(self):
+        return dict, (dict(self.items()),)
+
+    def close(self):
+        self._mmap.close()
+
+def write_store_file(path, pages):
+    """Write (page_num, text) pairs in the store format, atomically."""
+    blobs = [(page_num, zlib.compress((text or "").encode('utf-8'), COMPRESSION_LEVEL)) for page_num, text in pages]
+
+    offset = HEADER.size + len(blobs) * INDEX_ENTRY.size
+    index = []
+    for page_num, blob in blobs:
+        index.append(INDEX_ENTRY.pack(page_num, offset, len(blob)))
+        offset += len(blob)
+
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(blobs)))
+            file.writelines(index)
+            file.writelines(blob for _, blob in blobs)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return offset
+
+class TextStore:
+    """
+    Directory of extracted documents with an SQLite index for LRU and stats.
+
+    Keys combine the PDF digest with the extraction variant (backend and
+    OCR engine), since both change the text.
+    """
+
+    def __init__(self, directory=DEFAULT_STORE_DIR, max_bytes=500 * 1024 * 1024):
+        """
+        Args:
+            directory: Where store files and the index live
+            max_bytes: Total size of stored documents before LRU eviction kicks in
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    key TEXT PRIMARY KEY,
+                    pages INTEGER NOT NULL,
+                    text_bytes INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS stats (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.directory / "index.db", timeout=30)
+
+    @staticmethod
+    def make_key(digest, variant):
+        """Filename-safe key for a PDF digest and an extraction variant string."""
+        return f"{digest}-{hashlib.sha256(variant.encode('utf-8')).hexdigest()[:12]}"
+
+    def _path(self, key):
+        return self.directory / f"{key}.pages"
+
+    def get(self, key):
+        """Return a StoredPageMap for key, or None on a miss."""
+        with span('text_store', cache_hit=False) as s, closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT pages FROM documents WHERE key = ?", (key,)).fetchone()
+            if row:
+                try:
+                    page_map = StoredPageMap(self._path(key))
+                except (OSError, ValueError, struct.error):
+                    conn.execute("DELETE FROM documents WHERE key = ?", (key,))
+                else:
+                    conn.execute("UPDATE documents SET accessed = ? WHERE key = ?", (time.time(), key))
+                    self._bump(conn, "hits")
+                    s.set(cache_hit=True, pages=len(page_map))
+                    return page_map
+
+            self._bump(conn, "misses")
+            return None
+
+    def put(self, key, pages):
+        """Store (page_num, text) pairs under key and evict past max_bytes."""
+        pages = list(pages)
+        size = write_store_file(self._path(key), pages)
+        text_bytes = sum(len((text or "").encode('utf-8')) for _, text in pages)
+
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO documents (key, pages, text_bytes, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, len(pages), text_bytes, size, now, now)
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        """Drop least recently used documents until under max_bytes."""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM documents").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM documents ORDER BY accessed ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            try:
+                self._path(key).unlink(missing_ok=True)
+            except OSError:
+                continue  # still mapped by a reader (Windows); try again next time
+            conn.execute("DELETE FROM documents WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+
+        if evicted:
+            self._bump(conn, "evictions", evicted)
+
+    @staticmethod
+    def _bump(conn, name, amount=1):
+        conn.execute(
+            "INSERT INTO stats (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount)
+        )
+
+    def stats(self):
+        """Return hit/miss/eviction counters plus document count, sizes and compression ratio."""
+        with closing(self._connect()) as conn, conn:
+            counters = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+            documents, pages, text_bytes, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(pages), 0), COALESCE(SUM(text_bytes), 0), "
+                "COALESCE(SUM(size), 0) FROM documents"
+            ).fetchone()
+
+        return {
+            'hits': counters.get('hits', 0),
+            'misses': counters.get('misses', 0),
+            'evictions': counters.get('evictions', 0),
+            'documents': documents,
+            'pages': pages,
+            'text_bytes': text_bytes,
+            'bytes': size,
+            'compression': text_bytes / size if size else 0.0,
+        }
+
+    def clear(self):
+        """Remove all stored documents (counters are kept)."""
+        with closing(self._connect()) as conn, conn:
+            for (key,) in conn.execute("SELECT key FROM documents").fetchall():
+                self._path(key).unlink(missing_ok=True)
+            conn.execute("DELETE FROM documents")
+
+# Test function
+if __name__ == "__main__":
+    store = TextStore()
+    stats = store.stats()
+
+    print(f"📦 Text store: {store.directory}")
+    print(f"   Documents: {stats['documents']} ({stats['pages']} pages, {stats['bytes'] / 1024:.1f} KB on disk, "
+          f"{stats['compression']:.1f}x compression)")
+    print(f"   Hits: {stats['hits']}, Misses: {stats['misses']}, Evictions: {stats['evictions']}")
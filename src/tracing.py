@@ -0,0 +1,385 @@
+"""
+Lightweight per-stage tracing and metrics for the analysis pipeline.
+
+Wrap a stage in span() to record its duration and attributes (pages,
+tokens, retries, cache hits, ...):
+
+    with span('extract', workers=4) as s:
+        text, page_map = ...
+        s.set(pages=len(page_map))
+
+Finished spans are appended as JSON lines to TRACE_PATH (default
+output/traces.jsonl; set it to an empty string to turn tracing off). Every
+process (CLI, app, job workers) appends to the same file; past
+TRACE_MAX_BYTES (default 50 MB) it is rotated to traces.jsonl.1, so at
+most twice that is kept on disk. The metrics endpoint folds lines
+appended since it started into Prometheus-style counters and histograms
+on each scrape:
+
+    METRICS_PORT=9464 streamlit run app.py
+    curl localhost:9464/metrics
+
+The endpoint is unauthenticated, so it listens on 127.0.0.1 only; set
+METRICS_HOST (e.g. 0.0.0.0) to let a Prometheus on another host scrape it.
+
+Summarize a trace file (p50/p95 per stage):
+    python src/tracing.py output/traces.jsonl
+"""
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+DEFAULT_TRACE_PATH = "output/traces.jsonl"
+DEFAULT_TRACE_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_METRICS_HOST = "127.0.0.1"
+METRIC_PREFIX = "handbook"
+
+# Histogram buckets (seconds): stages range from milliseconds (parse) to
+# minutes (a long API call)
+DURATION_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Span attributes summed into counters
+TOKEN_ATTRS = ('input_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens', 'output_tokens')
+COUNTER_ATTRS = ('pages', 'retries')
+
+_current = contextvars.ContextVar('current_span', default=None)
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str = None
+    start: float = 0.0
+    duration_s: float = 0.0
+    attrs: dict = field(default_factory=dict)
+
+    def set(self, **attrs):
+        """Attach attributes, e.g. token counts once the response arrives."""
+        self.attrs.update(attrs)
+
+    def to_record(self):
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': round(self.start, 6),
+            'duration_s': round(self.duration_s, 6),
+            'pid': os.getpid(),
+            **self.attrs,
+        }
+
+def rotated_path(path):
+    """Where a full trace file is moved on rotation."""
+    path = Path(path)
+    return path.with_name(path.name + ".1")
+
+class _Exporter:
+    """Appends span records to a JSON-lines file, one write per span, rotating it past max_bytes."""
+
+    def __init__(self, path, max_bytes=None):
+        self.path = Path(path) if path else None
+        self.max_bytes = max_bytes or int(os.getenv("TRACE_MAX_BYTES") or DEFAULT_TRACE_MAX_BYTES)
+        self._lock = threading.Lock()
+        self._file = None
+
+    def export(self, record):
+        if self.path is None:
+            return
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                # Line-buffered append: each span lands as one whole line,
+                # even with several processes writing
+                self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+            self._file.write(line)
+            if self._file.tell() > self.max_bytes:
+                self._rotate()
+
+    def _rotate(self):
+        """Move the full file aside and start a new one (called with the lock held)."""
+        try:
+            # Another process may have rotated it already; then only reopen
+            if os.path.samestat(os.fstat(self._file.fileno()), os.stat(self.path)):
+                os.replace(self.path, rotated_path(self.path))
+        except OSError:
+            return  # e.g. open in another process on Windows; try again on a later span
+        self._file.close()
+        self._file = None
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+def _get_exporter():
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                _exporter = _Exporter(os.getenv("TRACE_PATH", DEFAULT_TRACE_PATH))
+    return _exporter
+
+def configure(path):
+    """Send spans to path instead of $TRACE_PATH (None or "" disables export)."""
+    global _exporter
+    with _exporter_lock:
+        _exporter = _Exporter(path)
+
+def current_span():
+    """The innermost open span in this thread/task, or None."""
+    return _current.get()
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Time a pipeline stage.
+
+    Spans opened inside another span (in the same thread or asyncio task)
+    share its trace id, so one job's extract/analyze/render spans can be
+    grouped. An exception is recorded as an 'error' attribute and re-raised.
+    """
+    parent = _current.get()
+    record = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+        span_id=uuid.uuid4().hex[:16],
+        parent_id=parent.span_id if parent else None,
+        start=time.time(),
+        attrs=attrs,
+    )
+    token = _current.set(record)
+    started = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record.attrs['error'] = type(e).__name__
+        raise
+    finally:
+        record.duration_s = time.perf_counter() - started
+        _current.reset(token)
+        _get_exporter().export(record.to_record())
+
+def traced(name, **attrs):
+    """Decorator form of span() for a whole function."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, **attrs):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def propagate(func):
+    """
+    Wrap func so spans it opens on a pool thread join the caller's trace.
+
+    Thread pools don't inherit context variables; each call runs in its own
+    copy of the context captured here.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
+
+class MetricsRegistry:
+    """Prometheus-style counters and duration histograms built from span records."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations = {}  # stage -> [bucket counts..., sum, count]
+        self.counters = {}   # (metric, labels) -> value
+
+    def _add(self, metric, labels, value):
+        key = (metric, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, record):
+        stage = record['name']
+        duration = record.get('duration_s', 0.0)
+        with self._lock:
+            histogram = self.durations.setdefault(stage, [0] * len(DURATION_BUCKETS) + [0.0, 0])
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    histogram[i] += 1
+            histogram[-2] += duration
+            histogram[-1] += 1
+
+            for attr in TOKEN_ATTRS:
+                if record.get(attr):
+                    self._add('tokens_total', (('stage', stage), ('kind', attr)), record[attr])
+            for attr in COUNTER_ATTRS:
+                if record.get(attr):
+                    self._add(f'{attr}_total', (('stage', stage),), record[attr])
+            if 'cache_hit' in record:
+                result = 'hit' if record['cache_hit'] else 'miss'
+                self._add('cache_lookups_total', (('stage', stage), ('result', result)), 1)
+            if record.get('error'):
+                self._add('stage_errors_total', (('stage', stage), ('error', record['error'])), 1)
+
+    def render(self):
+        """Prometheus text exposition format."""
+
+        def labels(pairs):
+            return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+        lines = [
+            f"# HELP {METRIC_PREFIX}_stage_duration_seconds Wall time per pipeline stage",
+            f"# TYPE {METRIC_PREFIX}_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            for stage in sorted(self.durations):
+                histogram = self.durations[stage]
+                for bound, count in zip(DURATION_BUCKETS, histogram):
+                    lines.append(f"{METRIC_PREFIX}_stage_duration_seconds_bucket"
+                                 f"{labels((('stage', stage), ('le', bound)))} {count}")
+                lines.append(f"{METRIC_PREFIX}_stage_duration_seconds_bucket"
+                             f"{labels((('stage', stage), ('le', '+Inf')))} {histogram[-1]}")
+                lines.append(f"{METRIC_PREFIX}_stage_duration_seconds_sum{labels((('stage', stage),))} "
+                             f"{histogram[-2]:.6f}")
+                lines.append(f"{METRIC_PREFIX}_stage_duration_seconds_count{labels((('stage', stage),))} "
+                             f"{histogram[-1]}")
+
+            declared = set()
+            for (metric, pairs), value in sorted(self.counters.items()):
+                if metric not in declared:
+                    declared.add(metric)
+                    lines.append(f"# TYPE {METRIC_PREFIX}_{metric} counter")
+                lines.append(f"{METRIC_PREFIX}_{metric}{labels(pairs)} {value}")
+        return "\n".join(lines) + "\n"
+
+class TraceFollower:
+    """
+    Feeds lines appended to a trace file since the last call into a registry.
+
+    Starts at the end of the file, so a restart doesn't re-read (and
+    re-count) the whole history. A rotated file is finished from the
+    rotated copy before the new one is read from the start.
+    """
+
+    def __init__(self, path, registry=None):
+        self.path = Path(path)
+        self.registry = registry or MetricsRegistry()
+        self._lock = threading.Lock()
+        try:
+            stat = self.path.stat()
+            self._file_id, self._offset = (stat.st_dev, stat.st_ino), stat.st_size
+        except OSError:
+            self._file_id, self._offset = None, 0
+
+    def poll(self):
+        with self._lock:
+            try:
+                stat = self.path.stat()
+            except OSError:
+                return
+            file_id = (stat.st_dev, stat.st_ino)
+            if file_id != self._file_id:
+                if self._file_id is not None:
+                    self._finish_rotated()
+                self._file_id, self._offset = file_id, 0
+            elif stat.st_size < self._offset:
+                self._offset = 0  # truncated
+            self._offset = self._read(self.path, self._offset)
+
+    def _finish_rotated(self):
+        """Read what was appended to the previous file before it was rotated away."""
+        try:
+            stat = rotated_path(self.path).stat()
+        except OSError:
+            return
+        if (stat.st_dev, stat.st_ino) == self._file_id:
+            self._read(rotated_path(self.path), self._offset)
+
+    def _read(self, path, offset):
+        """Observe whole lines of path from offset on; return the offset after the last one."""
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # partially written; read it next time
+                offset += len(line)
+                try:
+                    self.registry.observe(json.loads(line))
+                except (ValueError, KeyError):
+                    continue
+        return offset
+
+def start_metrics_server(port, trace_path=None, host=None):
+    """
+    Serve /metrics for the trace file on a background thread.
+
+    Binds to `host`, else $METRICS_HOST, else localhost only.
+
+    Returns:
+        ThreadingHTTPServer: Call shutdown() to stop it
+    """
+    follower = TraceFollower(trace_path or os.getenv("TRACE_PATH") or DEFAULT_TRACE_PATH)
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            follower.poll()
+            body = follower.registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass  # scrapes would flood the app's console
+
+    server = ThreadingHTTPServer((host or os.getenv("METRICS_HOST") or DEFAULT_METRICS_HOST, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def summarize(path):
+    """Return {stage: {'count', 'p50', 'p95', 'max', 'total'}} from a trace file."""
+    durations = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            durations.setdefault(record['name'], []).append(record['duration_s'])
+
+    summary = {}
+    for stage, values in durations.items():
+        values.sort()
+        summary[stage] = {
+            'count': len(values),
+            'p50': values[len(values) // 2],
+            'p95': values[min(len(values) - 1, int(len(values) * 0.95))],
+            'max': values[-1],
+            'total': sum(values),
+        }
+    return summary
+
+if __name__ == "__main__":
+    import sys
+
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_TRACE_PATH
+    if not Path(path).exists():
+        print(f"❌ No trace file at {path}")
+        sys.exit(1)
+
+    print(f"{'Stage':<16}{'Count':>7}{'p50':>10}{'p95':>10}{'Max':>10}{'Total':>11}")
+    print("-" * 64)
+    for stage, row in sorted(summarize(path).items(), key=lambda item: -item[1]['p95']):
+        print(f"{stage:<16}{row['count']:>7}{row['p50']:>9.3f}s{row['p95']:>9.3f}s"
+              f"{row['max']:>9.3f}s{row['total']:>10.1f}s")